@@ -0,0 +1,76 @@
+"""Multi-account fan-out: posting throughput as the number of accounts grows.
+
+Imports --posts-per-account posts for each of N accounts (front matter
+`account:`) and publishes them from one process through a PosterPool of
+AsyncBlueskyPosters against a fake PDS with --latency seconds per request.
+Every account is paced by its own limiter at --rate posts/s, so with enough
+concurrency throughput should grow close to linearly with N.
+
+    python benchmarks/bench_accounts.py --accounts 1 10 50 --posts-per-account 20 --rate 5
+"""
+import argparse
+import asyncio
+import shutil
+import time
+
+import common
+from bluesky_poster import AsyncBlueskyPoster, BlueskyCredentials
+from post_manager import PostManager
+from poster_pool import PosterPool
+from rate_limiter import TokenBucket
+from fake_pds import FakePDS
+from worker import AsyncPostWorker
+
+
+def run(pds, accounts, posts_per_account, rate, concurrency):
+    db_path = common.fresh_database(f"accounts-{accounts}")
+    ready_dir = common.BENCH_ROOT / f"accounts-{accounts}" / "ready"
+    shutil.rmtree(ready_dir.parent, ignore_errors=True)
+    ready_dir.mkdir(parents=True)
+    (ready_dir.parent / "processed").mkdir()
+    # Interleaved like a real schedule, so each batch spans all accounts
+    for i in range(posts_per_account):
+        for account in range(accounts):
+            (ready_dir / f"{i:04d}-a{account:03d}.md").write_text(
+                f"---\naccount: brand{account}.bench.test\n---\nPost {i} from brand {account}", encoding='utf-8'
+            )
+
+    def make_poster(credentials):
+        # Burst of 1 so every account really is held to `rate`
+        return AsyncBlueskyPoster(credentials, base_url=pds.url, rate_limiter=TokenBucket(rate, 1))
+
+    pool = PosterPool(make_poster, [
+        BlueskyCredentials(f"brand{account}.bench.test", "bench-password") for account in range(accounts)
+    ])
+    with PostManager(db_path, ready_dir, ready_dir.parent / "processed") as post_manager:
+        post_manager.import_new_files()
+        worker = AsyncPostWorker(post_manager, pool, batch_size=500, max_concurrent=concurrency)
+        before = len(pds.records)
+        start = time.perf_counter()
+        asyncio.run(worker.run(exit_when_idle=True))
+        elapsed = time.perf_counter() - start
+        posted = len(pds.records) - before
+    return posted, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--accounts', type=int, nargs='+', default=[1, 10, 50])
+    parser.add_argument('--posts-per-account', type=int, default=20)
+    parser.add_argument('--rate', type=float, default=5.0, help="posts/s allowed per account")
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--concurrency', type=int, default=8, help="posts in flight per account")
+    args = parser.parse_args()
+
+    baseline = None
+    with FakePDS(latency=args.latency) as pds:
+        for accounts in args.accounts:
+            posted, elapsed = run(pds, accounts, args.posts_per_account, args.rate, args.concurrency)
+            throughput = posted / elapsed
+            baseline = baseline or throughput / accounts
+            print(f"{accounts:>4} accounts: {posted} posts in {elapsed:6.2f}s = {throughput:7.1f} posts/s "
+                  f"({throughput / (baseline * accounts):.0%} of linear)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""Archiving old history: content.db size and query cost before and after.
+
+Builds a history of --rows posts (90% posted, spread over two years), then
+times the archiver moving everything older than --days into monthly archive
+databases, and compares content.db's size, get_queue_status/dequeue latency
+and the import duplicate check (a chunk of known and new hashes) before and
+after.
+
+    python benchmarks/bench_archive.py --rows 1000000 --days 90
+"""
+import argparse
+import json
+import os
+import sqlite3
+import statistics
+from datetime import datetime, timedelta
+
+import common
+from archiver import Archiver, archived_hashes
+from dedup import content_hash
+from post_manager import PostManager
+
+
+def file_mb(path):
+    files = [f"{path}{suffix}" for suffix in ("", "-wal")]
+    return sum(os.path.getsize(file) for file in files if os.path.exists(file)) / 2**20
+
+
+def dedup_check(post_manager, digests, repeats):
+    """Milliseconds to look up one import chunk's hashes, live table plus archives"""
+    conn = post_manager._get_db_connection()
+    samples = []
+    for _ in range(repeats):
+        _, elapsed = common.timed(lambda: (
+            {row[0] for row in conn.execute(
+                'SELECT content_hash FROM posts WHERE content_hash IN (SELECT value FROM json_each(?))',
+                (json.dumps(digests),)
+            )} | archived_hashes(conn, post_manager.archive_dir, digests)
+        ))
+        samples.append(elapsed * 1000)
+    return statistics.median(samples)
+
+
+def measure(label, post_manager, digests, repeats):
+    status = statistics.median(
+        common.timed(post_manager.get_queue_status)[1] * 1000 for _ in range(repeats)
+    )
+    dequeue = statistics.median(
+        common.timed(post_manager.get_next_ready_post)[1] * 1000 for _ in range(repeats)
+    )
+    print(f"{label:>7}: content.db {file_mb(post_manager.db_path):8.1f} MiB, queue status {status:7.3f} ms, "
+          f"dequeue {dequeue:7.3f} ms, dedup check of {len(digests)} {dedup_check(post_manager, digests, repeats):7.3f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--repeats', type=int, default=20)
+    args = parser.parse_args()
+
+    db_path = common.fresh_database("archive")
+    now = datetime.now()
+    with sqlite3.connect(db_path) as conn:
+        common.populate_posts(conn, args.rows)
+        conn.execute(
+            "UPDATE posts SET content_hash = lower(hex(randomblob(32))), "
+            # Oldest first, like a real history
+            "posted_at = CASE WHEN status = 'posted' THEN datetime(?, '-' || ((? - id) * 730 / ?) || ' days') END",
+            (now, args.rows, args.rows)
+        )
+    # Half of an import chunk repeats archived text, half is new
+    with sqlite3.connect(db_path) as conn:
+        known = [row[0] for row in conn.execute(
+            "SELECT content_hash FROM posts WHERE status = 'posted' AND posted_at < ? LIMIT 250",
+            (now - timedelta(days=args.days),)
+        )]
+    digests = known + [content_hash(f"brand new post {i}") for i in range(250)]
+
+    archive_dir = common.BENCH_ROOT / "archive"
+    ready_dir = common.BENCH_ROOT / "posts" / "ready"
+    with PostManager(db_path, ready_dir, ready_dir.parent / "processed", archive_dir=archive_dir) as post_manager:
+        measure("before", post_manager, digests, args.repeats)
+        with Archiver(db_path, archive_dir) as archiver:
+            moved, elapsed = common.timed(archiver.archive, now - timedelta(days=args.days))
+            total = sum(moved.values())
+            print(f"archived {total} posts into {len(moved)} monthly databases in {elapsed:.1f}s "
+                  f"({total / elapsed:.0f} posts/s)")
+            _, elapsed = common.timed(archiver.vacuum)
+            print(f"vacuum: {elapsed:.1f}s")
+        post_manager.close()
+        measure("after", post_manager, digests, args.repeats)
+        found = archived_hashes(post_manager._get_db_connection(), archive_dir, digests)
+        assert found == set(known), "archived duplicates must still be found"
+
+
+if __name__ == "__main__":
+    main()
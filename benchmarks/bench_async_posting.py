@@ -0,0 +1,69 @@
+"""Posting throughput: sequential BlueskyPoster vs the async pipeline.
+
+Publishes --posts posts through a local fake PDS that sleeps --latency seconds
+per createRecord, once with the blocking worker and once with AsyncPostWorker
+at each --concurrency level.
+
+    python benchmarks/bench_async_posting.py --posts 200 --latency 0.2 --concurrency 4 16 64
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+
+import common
+from bluesky_poster import AsyncBlueskyPoster, BlueskyCredentials, BlueskyPoster
+from post_manager import PostManager
+from fake_pds import FakePDS
+from worker import AsyncPostWorker, PostWorker
+
+CREDENTIALS = BlueskyCredentials(username="bench.test", password="bench-password")
+
+
+def prepare(name, posts):
+    db_path = common.fresh_database(name)
+    with sqlite3.connect(db_path) as conn:
+        common.populate_posts(conn, posts, ready_fraction=1.0)
+    return PostManager(db_path, common.BENCH_ROOT / "posts" / "ready", common.BENCH_ROOT / "posts" / "processed")
+
+
+def run_sync(pds, posts, batch_size):
+    with prepare("async-sequential", posts) as post_manager:
+        worker = PostWorker(post_manager, BlueskyPoster(CREDENTIALS, base_url=pds.url), batch_size=batch_size)
+        start = time.perf_counter()
+        worker.run(exit_when_idle=True)
+        return time.perf_counter() - start
+
+
+def run_async(pds, posts, batch_size, concurrency):
+    with prepare(f"async-{concurrency}", posts) as post_manager:
+        worker = AsyncPostWorker(
+            post_manager,
+            AsyncBlueskyPoster(CREDENTIALS, base_url=pds.url),
+            batch_size=batch_size,
+            max_concurrent=concurrency
+        )
+        start = time.perf_counter()
+        asyncio.run(worker.run(exit_when_idle=True))
+        return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--latency', type=float, default=0.2)
+    parser.add_argument('--batch-size', type=int, default=50)
+    parser.add_argument('--concurrency', type=int, nargs='+', default=[4, 16, 64])
+    args = parser.parse_args()
+
+    with FakePDS(latency=args.latency) as pds:
+        elapsed = run_sync(pds, args.posts, args.batch_size)
+        print(f"  sequential: {args.posts / elapsed:7.1f} posts/s")
+        for concurrency in args.concurrency:
+            elapsed = run_async(pds, args.posts, args.batch_size, concurrency)
+            print(f"async x{concurrency:<4}: {args.posts / elapsed:7.1f} posts/s")
+        print(f"fake PDS recorded {len(pds.records)} records")
+
+
+if __name__ == "__main__":
+    main()
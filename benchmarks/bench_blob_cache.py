@@ -0,0 +1,76 @@
+"""Posting with images: uploads every time vs the content-addressed blob cache.
+
+Posts --posts posts that each embed the same --image-kb logo (plus, with
+--unique, one image of their own) against a fake PDS with --latency seconds
+per request, once without and once with the blob cache, and reports per-post
+time, uploads and bytes sent. Also reports the peak Python memory of
+streaming the upload, which stays flat regardless of file size.
+
+    python benchmarks/bench_blob_cache.py --posts 200 --image-kb 900 --latency 0.05
+"""
+import argparse
+import os
+import shutil
+import time
+import tracemalloc
+
+import common
+from blob_cache import BlobCache
+from bluesky_poster import BlueskyCredentials, BlueskyPoster
+from fake_pds import FakePDS
+
+CREDENTIALS = BlueskyCredentials(username="bench.test", password="bench-password")
+
+
+def write_image(path, kb):
+    # Incompressible bytes stand in for an already compressed PNG
+    path.write_bytes(b"\x89PNG\r\n\x1a\n" + os.urandom(kb * 1024 - 8))
+    return str(path)
+
+
+def measure(label, pds, blob_cache, posts, images):
+    poster = BlueskyPoster(CREDENTIALS, base_url=pds.url, blob_cache=blob_cache)
+    poster.post_content("warm up")
+    uploads, sent = pds.blobs_uploaded, pds.blob_bytes
+    start = time.perf_counter()
+    for i in range(posts):
+        result = poster.post_content(f"Post {i} with our logo", images=images(i))
+        assert result.success, result.message
+    elapsed = time.perf_counter() - start
+    print(f"{label:>10}: {elapsed / posts * 1000:7.1f} ms/post, {pds.blobs_uploaded - uploads} uploads, "
+          f"{(pds.blob_bytes - sent) / 2**20:.1f} MiB sent")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=200)
+    parser.add_argument('--image-kb', type=int, default=900)
+    parser.add_argument('--latency', type=float, default=0.05, help="seconds per request")
+    parser.add_argument('--unique', action='store_true', help="also attach a distinct image to every post")
+    args = parser.parse_args()
+
+    media_dir = common.BENCH_ROOT / "media"
+    shutil.rmtree(media_dir, ignore_errors=True)
+    media_dir.mkdir(parents=True)
+    logo = write_image(media_dir / "logo.png", args.image_kb)
+    unique = [write_image(media_dir / f"photo-{i}.png", 64) for i in range(args.posts)] if args.unique else []
+
+    def images(i):
+        return [(logo, "Logo")] + ([(unique[i], f"Photo {i}")] if unique else [])
+
+    blob_cache = BlobCache(common.BENCH_ROOT / "blobs")
+    with FakePDS(latency=args.latency) as pds:
+        measure("no cache", pds, None, args.posts, images)
+        measure("blob cache", pds, blob_cache, args.posts, images)
+
+        poster = BlueskyPoster(CREDENTIALS, base_url=pds.url)
+        tracemalloc.start()
+        result = poster.post_content("memory probe", images=[(logo, "Logo")])
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        assert result.success, result.message
+        print(f"streamed {args.image_kb} KiB upload: peak {peak / 1024:.0f} KiB Python memory")
+
+
+if __name__ == "__main__":
+    main()
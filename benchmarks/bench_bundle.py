@@ -0,0 +1,82 @@
+"""Importing one large bundle file: time, throughput and peak RSS.
+
+Writes a JSONL (or, with --format md, a .bundle.md) bundle of about
+--size-mb MiB of generated posts into the ready directory and imports it
+with PostManager.import_new_files, reporting the import's wall time, posts
+per second and the process's peak RSS against its RSS beforehand.
+
+    python benchmarks/bench_bundle.py --size-mb 1024
+    python benchmarks/bench_bundle.py --size-mb 1024 --format md
+"""
+import argparse
+import json
+import random
+import resource
+import sys
+
+import common
+from post_manager import PostManager
+
+WORDS = "the quick brown fox jumps over a lazy dog while sqlite keeps every post in order".split()
+
+
+def rss_mb(who=resource.RUSAGE_SELF):
+    peak = resource.getrusage(who).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def current_rss_mb():
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * resource.getpagesize() / 2**20
+    except OSError:
+        return rss_mb()
+
+
+def write_bundle(path, size_mb, markdown):
+    """Generate posts until the bundle reaches size_mb; returns how many"""
+    rng = random.Random(size_mb)
+    limit = size_mb * 2**20
+    written = posts = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        while written < limit:
+            body = f"Bundle post {posts}: " + " ".join(rng.choices(WORDS, k=rng.randint(8, 40)))
+            if posts % 4 == 0:
+                body += f" #bench https://example.com/{posts}"
+            if markdown:
+                record = f"{body}\n---\n"
+            else:
+                record = json.dumps({'content': body, 'priority': posts % 3}) + "\n"
+            written += f.write(record)
+            posts += 1
+    return posts
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--size-mb', type=int, default=1024)
+    parser.add_argument('--format', choices=('jsonl', 'md'), default='jsonl')
+    parser.add_argument('--batch-size', type=int, default=2000, help="posts inserted per transaction")
+    args = parser.parse_args()
+
+    import config
+
+    db_path = common.fresh_database("content")
+    config.READY_DIR.mkdir(parents=True, exist_ok=True)
+    config.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    name = "bench.jsonl" if args.format == 'jsonl' else "bench.bundle.md"
+    posts, elapsed = common.timed(write_bundle, config.READY_DIR / name, args.size_mb, args.format == 'md')
+    print(f"wrote {posts} posts ({args.size_mb} MiB) in {elapsed:.1f}s")
+
+    with PostManager(db_path, config.READY_DIR, config.PROCESSED_DIR, import_batch_size=args.batch_size) as post_manager:
+        before = current_rss_mb()
+        imported, elapsed = common.timed(post_manager.import_new_files)
+    assert imported == posts, (imported, posts)
+    print(f"imported {imported} posts in {elapsed:.1f}s ({imported / elapsed:.0f} posts/s, "
+          f"{args.size_mb / elapsed:.1f} MiB/s)")
+    print(f"RSS before import {before:.1f} MiB, peak {rss_mb():.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""Per-post overhead of cron one-shot runs vs the long-running daemon.
+
+Posts --runs batches of --per-run posts against the in-process fake PDS
+(no network latency, so only our own overhead is measured): once as cron
+would, starting `python main.py` for every batch, and once through a single
+Daemon calling run_cycle() for every batch.
+
+    python benchmarks/bench_daemon.py --runs 20 --per-run 10
+"""
+import argparse
+import contextlib
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import common
+
+ENV = {
+    'BLUESKY_BACKEND': 'fake',
+    'BLUESKY_USERNAME': 'bench.test',
+    'BLUESKY_PASSWORD': 'bench-password',
+    'TEST_MODE': 'false',
+    'FAKE_PDS_LATENCY': '0',
+    'RATE_LIMIT_POSTS_PER_SECOND': '0',
+    'RESOLVE_MENTIONS': 'false',
+    # Each cron run's fake PDS listens on a new port, so cached sessions never apply
+    'SESSION_CACHE_ENABLED': 'false',
+}
+
+
+def write_posts(root, count):
+    ready_dir = Path(root) / "posts" / "ready"
+    ready_dir.mkdir(parents=True, exist_ok=True)
+    for i in range(count):
+        (ready_dir / f"post-{i:06d}.md").write_text(f"Daemon benchmark post {i}", encoding='utf-8')
+
+
+def cron(runs, per_run):
+    root = common.BENCH_ROOT / "cron"
+    write_posts(root, runs * per_run)
+    env = dict(os.environ, **ENV, PROJECT_ROOT=str(root), POSTS_PER_RUN=str(per_run))
+    start = time.perf_counter()
+    for _ in range(runs):
+        subprocess.run([sys.executable, str(common.SRC_DIR / "main.py")], env=env, check=True,
+                       stdout=subprocess.DEVNULL, cwd=common.SRC_DIR)
+    return time.perf_counter() - start
+
+
+def daemon(runs, per_run):
+    root = common.BENCH_ROOT / "daemon"
+    write_posts(root, runs * per_run)
+    # config reads the environment once, on first import
+    os.environ.update(ENV, PROJECT_ROOT=str(root), POSTS_PER_RUN=str(per_run))
+    from daemon import Daemon
+
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        instance = Daemon().start()
+        start = time.perf_counter()
+        for _ in range(runs):
+            instance.run_cycle()
+        elapsed = time.perf_counter() - start
+        instance.shutdown()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--per-run', type=int, default=10)
+    args = parser.parse_args()
+
+    posts = args.runs * args.per_run
+    results = {'cron': cron(args.runs, args.per_run), 'daemon': daemon(args.runs, args.per_run)}
+    for mode, elapsed in results.items():
+        print(f"{mode:>6}: {elapsed / args.runs * 1000:8.1f} ms/run, {elapsed / posts * 1000:7.2f} ms/post")
+    saved = (results['cron'] - results['daemon']) / args.runs
+    print(f"daemon saves {saved * 1000:.0f} ms of startup per run ({results['cron'] / results['daemon']:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Per-cycle DB latency: connect-per-call vs the pooled PostManager connection.
+
+Simulates one main() cycle (import check, POSTS_PER_RUN dequeue/update pairs
+and a queue status read) against a posts table of --rows rows.
+
+    python benchmarks/bench_db_connection.py --rows 100000 --cycles 20
+"""
+import argparse
+import sqlite3
+import statistics
+from datetime import datetime
+
+import common
+from post_manager import PostManager
+
+
+class ConnectPerCallPostManager(PostManager):
+    """The pre-pooling behaviour: a fresh connection for every method call"""
+
+    def _get_db_connection(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def run_cycle(post_manager, posts_per_run):
+    post_manager.import_new_files()
+    for _ in range(posts_per_run):
+        post = post_manager.get_next_ready_post()
+        if not post:
+            break
+        post_manager.update_post_status(post.id, 'posted', datetime.now())
+    post_manager.get_queue_status()
+
+
+def measure(manager_cls, rows, cycles, posts_per_run):
+    db_path = common.fresh_database(f"connection-{manager_cls.__name__}")
+    with sqlite3.connect(db_path) as conn:
+        common.populate_posts(conn, rows, ready_fraction=0.5)
+    ready_dir = common.BENCH_ROOT / "posts" / "ready"
+    processed_dir = common.BENCH_ROOT / "posts" / "processed"
+    samples = []
+    with manager_cls(db_path, ready_dir, processed_dir) as post_manager:
+        for _ in range(cycles):
+            _, elapsed = common.timed(run_cycle, post_manager, posts_per_run)
+            samples.append(elapsed * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000)
+    parser.add_argument('--cycles', type=int, default=20)
+    parser.add_argument('--posts-per-run', type=int, default=50)
+    args = parser.parse_args()
+
+    for label, manager_cls in (("connect-per-call", ConnectPerCallPostManager), ("pooled", PostManager)):
+        samples = measure(manager_cls, args.rows, args.cycles, args.posts_per_run)
+        print(
+            f"{label:>17}: median {statistics.median(samples):8.2f} ms/cycle, "
+            f"p99 {common.percentile(samples, 99):8.2f} ms/cycle"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Duplicate detection cost on import against a large post history.
+
+Fills a database with --rows historical posts (content hashes included), then
+imports --files files of which half repeat historical posts, timing exact
+dedup. With --near-rows N, also indexes N posts for near-duplicate detection
+and times the same import with the MinHash/LSH check enabled.
+
+    python benchmarks/bench_dedup.py --rows 1000000 --files 2000 --near-rows 50000
+"""
+import argparse
+import random
+import shutil
+import time
+
+import common
+from dedup import content_hash
+from post_manager import PostManager
+
+
+VOCABULARY = [f"w{n}" for n in range(5000)]
+
+
+def body(i):
+    words = random.Random(i).choices(VOCABULARY, k=16)
+    return f"Historical post {i}: " + " ".join(words)
+
+
+def populate(db_path, rows):
+    with PostManager(db_path, None, None) as post_manager:
+        conn = post_manager._get_db_connection()
+        with conn:
+            conn.executemany(
+                'INSERT INTO posts (content, created_at, posted_at, status, content_hash) '
+                'VALUES (?, datetime(\'now\'), datetime(\'now\'), \'posted\', ?)',
+                ((body(i), content_hash(body(i))) for i in range(rows))
+            )
+
+
+def measure(label, db_path, rows, files, threshold=None):
+    ready_dir = common.BENCH_ROOT / f"dedup-{label}" / "ready"
+    shutil.rmtree(ready_dir.parent, ignore_errors=True)
+    ready_dir.mkdir(parents=True)
+    (ready_dir.parent / "processed").mkdir()
+    for i in range(files):
+        # Even files repeat a historical post, odd ones are new
+        content = body(i * (rows // files)) if i % 2 == 0 else f"Fresh {label} post {i}: " + " ".join(random.Random(f"fresh-{i}").choices(VOCABULARY, k=16))
+        (ready_dir / f"post-{i:06d}.md").write_text(content, encoding='utf-8')
+    with PostManager(db_path, ready_dir, ready_dir.parent / "processed",
+                     near_duplicate_threshold=threshold) as post_manager:
+        if threshold is not None:
+            _, elapsed = common.timed(post_manager.index_near_duplicates)
+            print(f"  indexed signatures in {elapsed:.2f}s")
+        start = time.perf_counter()
+        imported = post_manager.import_new_files()
+        elapsed = time.perf_counter() - start
+    print(f"{label:>6}: {files} files, {imported} new, {files - imported} duplicates in {elapsed:.2f}s "
+          f"({elapsed / files * 1e6:.0f} us/file)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--files', type=int, default=2000)
+    parser.add_argument('--near-rows', type=int, default=0)
+    args = parser.parse_args()
+
+    import builtins
+    quiet_print = builtins.print
+    builtins.print = lambda *a, **k: None if str(a[0] if a else "").startswith("Skipping") else quiet_print(*a, **k)
+
+    db_path = common.fresh_database("dedup")
+    _, elapsed = common.timed(populate, db_path, args.rows)
+    print(f"populated {args.rows} posts in {elapsed:.1f}s")
+    with PostManager(db_path, None, None) as post_manager:
+        plan = post_manager._get_db_connection().execute(
+            'EXPLAIN QUERY PLAN SELECT content_hash FROM posts '
+            'WHERE content_hash IN (SELECT value FROM json_each(?))', ('[]',)
+        ).fetchall()
+    print("lookup plan:", "; ".join(row['detail'] for row in plan))
+    measure("exact", db_path, args.rows, args.files)
+
+    if args.near_rows:
+        near_db = common.fresh_database("dedup-near")
+        populate(near_db, args.near_rows)
+        measure("near", near_db, args.near_rows, args.files, threshold=0.8)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Dequeue query latency with and without the ready-queue index.
+
+Times PostManager.get_next_ready_post against posts tables of increasing size.
+
+    python benchmarks/bench_dequeue.py --sizes 10000 100000 1000000
+"""
+import argparse
+import sqlite3
+import statistics
+
+import common
+from post_manager import PostManager
+
+READY_QUEUE_INDEXES = (
+    'idx_posts_status_scheduled_for_priority',
+    'idx_posts_status_priority_scheduled_for',
+)
+
+
+def measure(rows, with_index, repeats):
+    db_path = common.fresh_database(f"dequeue-{rows}-{'indexed' if with_index else 'scan'}")
+    with sqlite3.connect(db_path) as conn:
+        if not with_index:
+            for index in READY_QUEUE_INDEXES:
+                conn.execute(f'DROP INDEX {index}')
+        common.populate_posts(conn, rows)
+    samples = []
+    with PostManager(db_path, common.BENCH_ROOT / "posts" / "ready", common.BENCH_ROOT / "posts" / "processed") as post_manager:
+        for _ in range(repeats):
+            _, elapsed = common.timed(post_manager.get_next_ready_post)
+            samples.append(elapsed * 1000)
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    for rows in args.sizes:
+        for with_index in (False, True):
+            samples = measure(rows, with_index, args.repeats)
+            print(
+                f"{rows:>9} rows, {'indexed' if with_index else 'no index':>8}: "
+                f"median {statistics.median(samples):9.3f} ms, p99 {common.percentile(samples, 99):9.3f} ms"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+"""Import throughput: per-file insert + move vs the chunked bulk importer.
+
+Generates --files small markdown files in a fresh ready directory and times
+PostManager.import_new_files, then the original one-INSERT-one-move loop.
+
+    python benchmarks/bench_import.py --files 100000
+"""
+import argparse
+import shutil
+import time
+from datetime import datetime
+
+import common
+from post_manager import PostManager
+
+
+class PerFilePostManager(PostManager):
+    """The original importer: one INSERT and one shutil.move per file"""
+
+    def import_files(self, files):
+        imported_count = 0
+        with self._get_db_connection() as conn:
+            for file in files:
+                content = file.read_text(encoding='utf-8')
+                conn.execute(
+                    'INSERT INTO posts (content, created_at, status) VALUES (?, ?, ?)',
+                    (content, datetime.now(), 'ready')
+                )
+                shutil.move(str(file), str(self.processed_dir / file.name))
+                imported_count += 1
+        return imported_count
+
+
+def generate(ready_dir, files):
+    shutil.rmtree(ready_dir.parent, ignore_errors=True)
+    ready_dir.mkdir(parents=True)
+    (ready_dir.parent / "processed").mkdir()
+    for i in range(files):
+        (ready_dir / f"post-{i:07d}.md").write_text(
+            f"Post number {i}. " + "Short markdown body with a #hashtag and a link https://example.com. " * 2,
+            encoding='utf-8'
+        )
+
+
+def measure(label, manager_cls, files):
+    db_path = common.fresh_database(f"import-{label}")
+    ready_dir = common.BENCH_ROOT / f"import-{label}" / "ready"
+    generate(ready_dir, files)
+    with manager_cls(db_path, ready_dir, ready_dir.parent / "processed") as post_manager:
+        start = time.perf_counter()
+        imported = post_manager.import_new_files()
+        elapsed = time.perf_counter() - start
+    print(f"{label:>9}: {imported} files in {elapsed:7.2f}s ({imported / elapsed:9.0f} files/s)")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=100_000)
+    args = parser.parse_args()
+
+    measure("bulk", PostManager, args.files)
+    measure("per-file", PerFilePostManager, args.files)
+
+
+if __name__ == "__main__":
+    main()
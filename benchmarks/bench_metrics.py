@@ -0,0 +1,79 @@
+"""Cost of the metrics instrumentation on the posting hot path.
+
+Times the raw recording calls, then drains --posts posts through a PostWorker
+with an instant fake poster twice, with the per-post instrumentation on and
+stubbed out, so the difference is what metrics cost each post.
+
+    python benchmarks/bench_metrics.py --posts 20000
+"""
+import argparse
+import sqlite3
+import time
+
+import common
+import metrics
+import worker
+from bluesky_poster import PostResult
+from post_manager import PostManager
+
+
+class InstantPoster:
+    def for_account(self, username):
+        return self
+
+    def post_content(self, content, record=None, reply=None, images=None):
+        return PostResult(True, "Posted successfully", uri="at://fake/post", cid="cid")
+
+
+def per_call(func, calls):
+    start = time.perf_counter()
+    for _ in range(calls):
+        func()
+    return (time.perf_counter() - start) / calls * 1e9
+
+
+def drain(posts, instrumented):
+    db_path = common.fresh_database(f"metrics-{'on' if instrumented else 'off'}")
+    with sqlite3.connect(db_path) as conn:
+        common.populate_posts(conn, posts, ready_fraction=1.0)
+    observe = worker.observe
+    if not instrumented:
+        worker.observe = lambda entry, elapsed: None
+    try:
+        with PostManager(db_path, common.BENCH_ROOT / "posts" / "ready", common.BENCH_ROOT / "posts" / "processed") as post_manager:
+            post_worker = worker.PostWorker(post_manager, InstantPoster(), batch_size=500)
+            start = time.perf_counter()
+            post_worker.run(exit_when_idle=True)
+            return (time.perf_counter() - start) / posts * 1e6
+    finally:
+        worker.observe = observe
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=20_000)
+    parser.add_argument('--calls', type=int, default=1_000_000)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"Counter.inc:            {per_call(metrics.RATE_LIMITED.inc, args.calls):6.0f} ns")
+    print(f"Histogram.observe:      {per_call(lambda: metrics.RATE_LIMIT_WAIT.observe(0.01), args.calls):6.0f} ns")
+    print(f"labelled observe:       "
+          f"{per_call(lambda: metrics.POST_DURATION.observe(0.2, outcome='posted'), args.calls):6.0f} ns")
+
+    def timed_block():
+        with metrics.DEQUEUE_DURATION.time():
+            pass
+    print(f"Histogram.time block:   {per_call(timed_block, args.calls):6.0f} ns")
+
+    # print() per post dominates a real run's overhead; keep it out of the numbers
+    worker.print = lambda *args, **kwargs: None
+    # Best of several runs, as run-to-run noise is larger than the difference
+    off = min(drain(args.posts, instrumented=False) for _ in range(args.repeats))
+    on = min(drain(args.posts, instrumented=True) for _ in range(args.repeats))
+    print(f"worker, metrics off:    {off:6.1f} µs/post")
+    print(f"worker, metrics on:     {on:6.1f} µs/post ({on - off:+.1f} µs)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""Import throughput with 1..N file-reading threads.
+
+Generates --files markdown files and times PostManager.import_new_files with
+each --workers setting. --latency adds a per-file delay to every read to stand
+in for NFS/EBS round trips; with --latency 0 the numbers reflect local disk.
+Also checks that posts come out in filename order regardless of pool size.
+
+    python benchmarks/bench_parallel_read.py --files 20000 --latency 0.002
+"""
+import argparse
+import time
+
+import common
+from bench_import import generate
+from post_manager import PostManager
+
+
+def manager_cls(latency):
+    if not latency:
+        return PostManager
+
+    class SlowStoragePostManager(PostManager):
+        @staticmethod
+        def _read_file(file):
+            time.sleep(latency)
+            return PostManager._read_file(file)
+
+    return SlowStoragePostManager
+
+
+def measure(workers, files, latency):
+    label = f"read-{workers}"
+    db_path = common.fresh_database(f"import-{label}")
+    ready_dir = common.BENCH_ROOT / f"import-{label}" / "ready"
+    generate(ready_dir, files)
+    with manager_cls(latency)(db_path, ready_dir, ready_dir.parent / "processed",
+                              import_read_workers=workers) as post_manager:
+        start = time.perf_counter()
+        imported = post_manager.import_new_files()
+        elapsed = time.perf_counter() - start
+        rows = post_manager._get_db_connection().execute(
+            'SELECT content FROM posts ORDER BY created_at, id'
+        ).fetchall()
+    in_order = [int(row['content'].split()[2].rstrip('.')) for row in rows] == list(range(files))
+    print(f"{workers:>3} readers: {imported} files in {elapsed:7.2f}s "
+          f"({imported / elapsed:8.0f} files/s) ordered={in_order}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--files', type=int, default=20_000)
+    parser.add_argument('--latency', type=float, default=0.002,
+                        help="simulated seconds per file read (0 for local disk only)")
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 4, 8, 16, 32])
+    args = parser.parse_args()
+
+    for workers in args.workers:
+        measure(workers, args.files, args.latency)
+
+
+if __name__ == "__main__":
+    main()
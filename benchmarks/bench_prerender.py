@@ -0,0 +1,47 @@
+"""Client-side cost of publishing: send_post on raw text vs a pre-rendered record.
+
+Posts --posts times against a zero-latency fake PDS, once through the plain
+send_post path and once with the record rendered at import (facets included),
+and reports per-post wall time. Also times the import-time rendering itself.
+
+    python benchmarks/bench_prerender.py --posts 2000
+"""
+import argparse
+import time
+
+import common
+from bluesky_poster import BlueskyCredentials, BlueskyPoster
+from rich_text import detect_facets, render_record
+from fake_pds import FakePDS
+
+TEXT = ("New write-up on queue design with @alice.bsky.social: "
+        "https://example.com/posts/queues?ref=bsky #sqlite #python")
+DIDS = {"alice.bsky.social": "did:plc:ewvi7nxzyoun6zhxrhs64oiz"}
+
+
+def measure(label, poster, posts, record):
+    start = time.perf_counter()
+    for _ in range(posts):
+        result = poster.post_content(TEXT, record=record)
+        assert result.success, result.message
+    elapsed = time.perf_counter() - start
+    print(f"{label:>12}: {elapsed / posts * 1e6:7.0f} us/post")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000)
+    args = parser.parse_args()
+
+    _, elapsed = common.timed(lambda: [render_record(TEXT, detect_facets(TEXT), DIDS) for _ in range(args.posts)])
+    print(f"   rendering: {elapsed / args.posts * 1e6:7.0f} us/post (at import)")
+    record = render_record(TEXT, detect_facets(TEXT), DIDS)
+    with FakePDS(latency=0) as pds:
+        poster = BlueskyPoster(BlueskyCredentials("bench.test", "password"), base_url=pds.url)
+        poster.post_content("warm up")
+        measure("send_post", poster, args.posts, None)
+        measure("pre-rendered", poster, args.posts, record)
+
+
+if __name__ == "__main__":
+    main()
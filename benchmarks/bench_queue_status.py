@@ -0,0 +1,67 @@
+"""Queue status counts: GROUP BY over posts vs the trigger-maintained queue_stats.
+
+Times get_queue_status both ways against posts tables of increasing size,
+and what the triggers add to writes: bulk inserts and single status updates
+with and without them.
+
+    python benchmarks/bench_queue_status.py --sizes 10000 100000 1000000
+"""
+import argparse
+import sqlite3
+import statistics
+from datetime import datetime
+
+import common
+from post_manager import PostManager
+
+QUEUE_STATS_TRIGGERS = ('queue_stats_insert', 'queue_stats_delete', 'queue_stats_update')
+
+
+class GroupByPostManager(PostManager):
+    """get_queue_status as it was: a GROUP BY over the whole posts table"""
+
+    def get_queue_status(self):
+        return self._get_db_connection().execute(
+            'SELECT status, COUNT(*) as count FROM posts GROUP BY status'
+        ).fetchall()
+
+
+def measure(rows, repeats, triggers):
+    db_path = common.fresh_database(f"queue-status-{rows}-{'triggers' if triggers else 'plain'}")
+    with sqlite3.connect(db_path) as conn:
+        if not triggers:
+            for trigger in QUEUE_STATS_TRIGGERS:
+                conn.execute(f'DROP TRIGGER {trigger}')
+        _, populate = common.timed(common.populate_posts, conn, rows)
+    manager_cls = PostManager if triggers else GroupByPostManager
+    ready_dir = common.BENCH_ROOT / "posts" / "ready"
+    with manager_cls(db_path, ready_dir, ready_dir.parent / "processed") as post_manager:
+        reads = [common.timed(post_manager.get_queue_status)[1] * 1000 for _ in range(repeats)]
+        ids = [row[0] for row in post_manager._get_db_connection().execute(
+            "SELECT id FROM posts WHERE status = 'ready' LIMIT ?", (repeats,)
+        )]
+        writes = [
+            common.timed(post_manager.update_post_status, post_id, 'posted', datetime.now())[1] * 1000
+            for post_id in ids
+        ]
+    return populate, reads, writes
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[10_000, 100_000, 1_000_000])
+    parser.add_argument('--repeats', type=int, default=50)
+    args = parser.parse_args()
+
+    for rows in args.sizes:
+        for triggers in (False, True):
+            populate, reads, writes = measure(rows, args.repeats, triggers)
+            print(
+                f"{rows:>9} rows, {'queue_stats' if triggers else 'GROUP BY':>11}: "
+                f"status median {statistics.median(reads):9.3f} ms, p99 {common.percentile(reads, 99):9.3f} ms; "
+                f"update median {statistics.median(writes):6.3f} ms; insert {rows / populate:9.0f} rows/s"
+            )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Sustained throughput against a rate-limited fake PDS.
+
+The stub allows --limit write points (3 per createRecord) per --window
+seconds. Posts go
+through the async pipeline once without a client-side limiter (429s surface
+as failed posts) and once with TokenBucket tuned to the same budget.
+
+    python benchmarks/bench_rate_limit.py --posts 300 --limit 150 --window 5
+"""
+import argparse
+import asyncio
+import sqlite3
+import time
+
+import common
+from bluesky_poster import AsyncBlueskyPoster, BlueskyCredentials
+from post_manager import PostManager
+from rate_limiter import CREATE_RECORD_POINTS, TokenBucket
+from fake_pds import FakePDS
+from worker import AsyncPostWorker
+
+CREDENTIALS = BlueskyCredentials(username="bench.test", password="bench-password")
+
+
+def run(posts, limit, window, rate_limiter, concurrency):
+    db_path = common.fresh_database(f"ratelimit-{'bucket' if rate_limiter else 'none'}")
+    with sqlite3.connect(db_path) as conn:
+        common.populate_posts(conn, posts, ready_fraction=1.0)
+    with FakePDS(latency=0.05, rate_limit=limit, window=window) as pds, \
+            PostManager(db_path, common.BENCH_ROOT / "posts" / "ready", common.BENCH_ROOT / "posts" / "processed") as post_manager:
+        poster = AsyncBlueskyPoster(CREDENTIALS, base_url=pds.url, rate_limiter=rate_limiter)
+        worker = AsyncPostWorker(post_manager, poster, batch_size=posts, max_concurrent=concurrency)
+        start = time.perf_counter()
+        asyncio.run(worker.run(exit_when_idle=True))
+        elapsed = time.perf_counter() - start
+        counts = dict(post_manager.get_queue_status())
+    return elapsed, counts.get('posted', 0), counts.get('failed', 0), pds.rejected
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=300)
+    parser.add_argument('--limit', type=int, default=150, help="write points per window")
+    parser.add_argument('--window', type=int, default=5)
+    parser.add_argument('--concurrency', type=int, default=16)
+    args = parser.parse_args()
+
+    budget = args.limit / CREATE_RECORD_POINTS / args.window
+    for label, limiter in (
+        ("no limiter", None),
+        ("token bucket", TokenBucket(budget, capacity=budget * args.window / 2)),
+    ):
+        elapsed, posted, failed, rejected = run(args.posts, args.limit, args.window, limiter, args.concurrency)
+        print(
+            f"{label:>12}: {posted / elapsed:6.1f} posts/s sustained "
+            f"(budget {budget:.1f}/s), posted {posted}, failed {failed}, 429s {rejected}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+"""Ingest latency and CPU cost: polling import loop vs ReadyDirWatcher.
+
+The ready directory is seeded with --noise non-markdown files (images and
+other assets that sit next to posts), then --files posts are written at
+--rate per second. Reports the delay from each file being written to its
+row appearing in the database, and the CPU time the process used.
+
+    python benchmarks/bench_ready_dir_watch.py --noise 50000 --files 100 --rate 10
+"""
+import argparse
+import shutil
+import statistics
+import threading
+import time
+from datetime import datetime
+
+import common
+from file_watcher import ReadyDirWatcher
+from post_manager import PostManager
+
+
+def prepare(name, noise):
+    db_path = common.fresh_database(f"watch-{name}")
+    ready_dir = common.BENCH_ROOT / f"watch-{name}" / "ready"
+    processed_dir = common.BENCH_ROOT / f"watch-{name}" / "processed"
+    shutil.rmtree(ready_dir.parent, ignore_errors=True)
+    ready_dir.mkdir(parents=True)
+    processed_dir.mkdir()
+    for i in range(noise):
+        (ready_dir / f"asset-{i:06d}.png").write_bytes(b"")
+    return PostManager(db_path, ready_dir, processed_dir)
+
+
+def write_posts(ready_dir, files, rate, written):
+    for i in range(files):
+        name = f"post-{i:05d}"
+        tmp = ready_dir / f".{name}.tmp"
+        tmp.write_text(f"{name}\n" + "Lorem ipsum dolor sit amet. " * 8, encoding='utf-8')
+        tmp.rename(ready_dir / f"{name}.md")
+        written[name] = datetime.now()
+        time.sleep(1 / rate)
+
+
+def run(name, noise, files, rate, start_ingest):
+    with prepare(name, noise) as post_manager:
+        written = {}
+        stop = start_ingest(post_manager)
+        cpu_start = time.process_time()
+        wall_start = time.perf_counter()
+        write_posts(post_manager.ready_dir, files, rate, written)
+        deadline = time.monotonic() + 30
+        conn = post_manager._get_db_connection()
+        while conn.execute("SELECT COUNT(*) FROM posts").fetchone()[0] < files and time.monotonic() < deadline:
+            time.sleep(0.05)
+        cpu = time.process_time() - cpu_start
+        wall = time.perf_counter() - wall_start
+        stop()
+        latencies = [
+            (datetime.fromisoformat(created_at) - written[content.split("\n", 1)[0]]).total_seconds()
+            for content, created_at in conn.execute("SELECT content, created_at FROM posts")
+        ]
+    print(
+        f"{name:>16}: ingest latency median {statistics.median(latencies) * 1000:8.1f} ms, "
+        f"max {max(latencies) * 1000:8.1f} ms, CPU {cpu:6.2f}s over {wall:5.1f}s ({len(latencies)}/{files} imported)"
+    )
+
+
+def polling_loop(interval):
+    def start(post_manager):
+        stop_event = threading.Event()
+
+        def loop():
+            while not stop_event.is_set():
+                post_manager.import_new_files()
+                stop_event.wait(interval)
+
+        thread = threading.Thread(target=loop, daemon=True)
+        thread.start()
+        return lambda: (stop_event.set(), thread.join())
+    return start
+
+
+def watcher(use_inotify, debounce, poll_interval):
+    def start(post_manager):
+        ready_watcher = ReadyDirWatcher(
+            post_manager.ready_dir, post_manager.import_files,
+            debounce=debounce, poll_interval=poll_interval, use_inotify=use_inotify
+        )
+        ready_watcher.start()
+        return ready_watcher.stop
+    return start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--noise', type=int, default=50_000)
+    parser.add_argument('--files', type=int, default=100)
+    parser.add_argument('--rate', type=float, default=10)
+    parser.add_argument('--interval', type=float, default=5, help="polling loop interval (posting_interval)")
+    parser.add_argument('--debounce', type=float, default=0.2)
+    args = parser.parse_args()
+
+    run("glob every cycle", args.noise, args.files, args.rate, polling_loop(args.interval))
+    run("watcher/polling", args.noise, args.files, args.rate, watcher(False, args.debounce, 2.0))
+    run("watcher/inotify", args.noise, args.files, args.rate, watcher(None, args.debounce, 2.0))
+
+
+if __name__ == "__main__":
+    main()
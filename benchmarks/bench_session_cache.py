@@ -0,0 +1,54 @@
+"""Startup-to-first-post latency with and without the session cache.
+
+Each run builds a fresh BlueskyPoster, as a new cron invocation would, and
+times it until its first post is accepted by a local fake PDS whose
+createSession takes --session-latency seconds.
+
+    python benchmarks/bench_session_cache.py --runs 5 --session-latency 0.5
+"""
+import argparse
+import statistics
+import time
+
+import common
+from bluesky_poster import BlueskyCredentials, BlueskyPoster
+from session_cache import SessionCache
+from fake_pds import FakePDS
+
+CREDENTIALS = BlueskyCredentials(username="bench.test", password="bench-password")
+
+
+def first_post_latency(pds, session_cache):
+    start = time.perf_counter()
+    poster = BlueskyPoster(CREDENTIALS, base_url=pds.url, session_cache=session_cache)
+    result = poster.post_content("Benchmark post")
+    if not result.success:
+        raise RuntimeError(result.message)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--latency', type=float, default=0.1, help="seconds per createRecord")
+    parser.add_argument('--session-latency', type=float, default=0.5, help="seconds per createSession")
+    args = parser.parse_args()
+
+    session_cache = SessionCache(common.BENCH_ROOT / "sessions")
+    session_cache.clear(CREDENTIALS.username)
+    with FakePDS(latency=args.latency, session_latency=args.session_latency) as pds:
+        for label, cache in (("password login", None), ("session cache", session_cache)):
+            before = pds.sessions_created
+            samples = [first_post_latency(pds, cache) for _ in range(args.runs)]
+            print(
+                f"{label:>15}: median {statistics.median(samples) * 1000:7.1f} ms to first post, "
+                f"createSession calls {pds.sessions_created - before}/{args.runs}"
+            )
+
+        session_cache.save(CREDENTIALS.username, "not-a-session")
+        first_post_latency(pds, session_cache)
+        print(f"corrupt cache fell back to password login; cache repaired: {session_cache.load(CREDENTIALS.username) != 'not-a-session'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cold start of an idle one-shot `python main.py`, and what its imports cost.
+
+Sets up a migrated content.db with nothing due and an empty ready
+directory, then times --runs idle runs of main.py against --runs of a bare
+`python -c pass` (the interpreter's own floor, site packages included), and
+lists the slowest imports of one run under `python -X importtime`.
+
+    python benchmarks/bench_startup.py --runs 20 --top 10
+"""
+import argparse
+import os
+import sqlite3
+import statistics
+import subprocess
+import sys
+
+import common
+
+
+def wall_ms(command, env, runs):
+    samples = []
+    for _ in range(runs):
+        _, elapsed = common.timed(subprocess.run, command, env=env, check=True, cwd=common.SRC_DIR)
+        samples.append(elapsed * 1000)
+    return statistics.median(samples)
+
+
+def slowest_imports(command, env, top):
+    """(cumulative ms, module) of the top-level imports a run makes, slowest first"""
+    result = subprocess.run([sys.executable, '-X', 'importtime', *command[1:]], env=env, check=True,
+                            cwd=common.SRC_DIR, capture_output=True, text=True)
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, module = line[len('import time:'):].split('|')
+        # Only modules imported directly, not their dependencies
+        if not module.startswith('  '):
+            imports.append((int(cumulative) / 1000, module.strip()))
+    return sorted(imports, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help="posts in the (all posted) history")
+    parser.add_argument('--runs', type=int, default=20)
+    parser.add_argument('--top', type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+
+    import config
+
+    with sqlite3.connect(common.fresh_database("content")) as conn:
+        common.populate_posts(conn, args.rows, ready_fraction=0)
+    config.READY_DIR.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, TEST_MODE='false')
+    command = [sys.executable, str(common.SRC_DIR / "main.py")]
+
+    bare = wall_ms([sys.executable, '-c', 'pass'], env, args.runs)
+    idle = wall_ms(command, env, args.runs)
+    print(f"python -c pass: {bare:7.1f} ms")
+    print(f"idle main.py:   {idle:7.1f} ms ({idle - bare:.1f} ms over the bare interpreter)")
+    print("slowest imports:")
+    for cumulative, module in slowest_imports(command, env, args.top):
+        print(f"  {cumulative:7.1f} ms  {module}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,68 @@
+"""Cost of splitting long posts into threads, and of importing and claiming them.
+
+Splits --posts generated texts of mixed length (mostly short, some long
+enough to need a thread, some non-ASCII) and reports per-post split time,
+then imports --files long posts and claims every part through claim_batch.
+
+    python benchmarks/bench_thread_split.py --posts 100000 --files 2000
+"""
+import argparse
+import random
+import shutil
+
+import common
+from post_manager import PostManager
+from thread_splitter import split_thread
+
+SENTENCES = [
+    "Queues are easy until two workers want the same row.",
+    "SQLite handles this fine with a single writer and short transactions.",
+    "Leases mean a crashed worker never strands a post forever!",
+    "Does anyone still read long posts?",
+    "Café culture meets naïve benchmarking — résumé attached 👩‍💻.",
+]
+
+
+def text(i):
+    rng = random.Random(f"thread-{i}")
+    # One post in ten is long enough to become a thread
+    count = rng.randint(8, 40) if i % 10 == 0 else rng.randint(1, 4)
+    paragraphs = [" ".join(rng.choices(SENTENCES, k=rng.randint(1, 4))) for _ in range(max(1, count // 4))]
+    return f"Post {i}. " + "\n\n".join(paragraphs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=100000)
+    parser.add_argument('--files', type=int, default=2000)
+    args = parser.parse_args()
+
+    texts = [text(i) for i in range(args.posts)]
+    parts, elapsed = common.timed(lambda: [split_thread(t) for t in texts])
+    threads = sum(1 for p in parts if len(p) > 1)
+    print(f"split: {args.posts} posts ({threads} threads, {sum(map(len, parts))} parts) in {elapsed:.2f}s "
+          f"({elapsed / args.posts * 1e6:.1f} us/post)")
+
+    db_path = common.fresh_database("thread_split")
+    ready_dir = common.BENCH_ROOT / "thread-split" / "ready"
+    shutil.rmtree(ready_dir.parent, ignore_errors=True)
+    ready_dir.mkdir(parents=True)
+    (ready_dir.parent / "processed").mkdir()
+    for i in range(args.files):
+        (ready_dir / f"post-{i:06d}.md").write_text(text(i * 10), encoding='utf-8')
+    with PostManager(db_path, ready_dir, ready_dir.parent / "processed") as post_manager:
+        imported, elapsed = common.timed(post_manager.import_new_files)
+        print(f"import: {imported} long posts in {elapsed:.2f}s ({elapsed / args.files * 1e6:.0f} us/file)")
+        claimed = 0
+        elapsed = 0.0
+        while True:
+            batch, took = common.timed(post_manager.claim_batch, 50, "bench")
+            if not batch:
+                break
+            claimed += len(batch)
+            elapsed += took
+        print(f"claim: {claimed} parts in {elapsed:.2f}s ({elapsed / max(claimed, 1) * 1e6:.0f} us/part)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Shared helpers for the benchmark scripts.
+
+Benchmarks run against a throwaway PROJECT_ROOT so they never touch a real
+content.db. Import this module before anything from src/.
+"""
+import os
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from pathlib import Path
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+BENCH_ROOT = Path(os.environ.setdefault('PROJECT_ROOT', tempfile.mkdtemp(prefix="bsky-bench-")))
+os.environ.setdefault('TEST_INTERVAL', '0')
+os.environ.setdefault('PRODUCTION_INTERVAL', '0')
+os.environ.setdefault('POSTS_PER_RUN', '50')
+
+
+def fresh_database(name: str) -> Path:
+    """Create an empty, fully migrated database and return its path"""
+    import config
+    from db_setup import setup_database
+
+    db_path = BENCH_ROOT / "database" / f"{name}.db"
+    db_path.parent.mkdir(parents=True, exist_ok=True)
+    for suffix in ("", "-wal", "-shm"):
+        Path(f"{db_path}{suffix}").unlink(missing_ok=True)
+    config.DB_PATH = db_path
+    setup_database(db_path)
+    return db_path
+
+
+def populate_posts(conn, rows: int, ready_fraction: float = 0.1):
+    """Fill the posts table with a history of mostly posted rows"""
+    start = datetime(2024, 1, 1)
+    ready_from = int(rows * (1 - ready_fraction))
+    conn.executemany(
+        'INSERT INTO posts (content, created_at, posted_at, status) VALUES (?, ?, ?, ?)',
+        (
+            (
+                f"Synthetic post {i}",
+                (start + timedelta(seconds=i)).isoformat(" "),
+                None if i >= ready_from else (start + timedelta(seconds=i, minutes=5)).isoformat(" "),
+                'ready' if i >= ready_from else 'posted'
+            )
+            for i in range(rows)
+        )
+    )
+    conn.commit()
+
+
+def timed(func, *args, **kwargs):
+    """Run func once and return (result, elapsed seconds)"""
+    start = time.perf_counter()
+    result = func(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def percentile(samples, pct: float) -> float:
+    """Nearest-rank percentile of a list of samples"""
+    ordered = sorted(samples)
+    if not ordered:
+        return 0.0
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
@@ -0,0 +1,69 @@
+"""End-to-end load test of main() against the in-process fake PDS.
+
+Writes --posts ready files, then runs main() the way cron would (one
+production pass of --per-run posts per invocation) with BLUESKY_BACKEND=fake,
+until the queue is empty. Reports wall time, posts/s and the final queue
+state, so throughput problems can be reproduced offline.
+
+    python benchmarks/load_test_main.py --posts 500 --per-run 100 --latency 0.05 --error-rate 0.02
+"""
+import argparse
+import os
+import sqlite3
+import time
+
+import common
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=500)
+    parser.add_argument('--per-run', type=int, default=100)
+    parser.add_argument('--latency', type=float, default=0.05)
+    parser.add_argument('--error-rate', type=float, default=0.0)
+    parser.add_argument('--async-posting', action='store_true')
+    args = parser.parse_args()
+
+    # config reads the environment once, on first import
+    os.environ.update({
+        'BLUESKY_BACKEND': 'fake',
+        'BLUESKY_USERNAME': 'load.test',
+        'BLUESKY_PASSWORD': 'load-test',
+        'TEST_MODE': 'false',
+        'POSTS_PER_RUN': str(args.per_run),
+        'FAKE_PDS_LATENCY': str(args.latency),
+        'FAKE_PDS_ERROR_RATE': str(args.error_rate),
+        'RATE_LIMIT_POSTS_PER_SECOND': '0',
+        'RETRY_BASE_DELAY': '0',
+        'RESOLVE_MENTIONS': 'false',
+        # Each run's fake PDS listens on a new port, so cached sessions never apply
+        'SESSION_CACHE_ENABLED': 'false',
+        'ASYNC_POSTING': 'true' if args.async_posting else 'false',
+    })
+    import config
+    import main as app
+
+    config.READY_DIR.mkdir(parents=True, exist_ok=True)
+    for i in range(args.posts):
+        (config.READY_DIR / f"load-{i:06d}.md").write_text(f"Load test post {i}", encoding='utf-8')
+
+    runs = 0
+    start = time.perf_counter()
+    while True:
+        app.main()
+        runs += 1
+        with sqlite3.connect(config.DB_PATH) as conn:
+            waiting = conn.execute(
+                "SELECT COUNT(*) FROM posts WHERE status IN ('ready', 'retry', 'pending', 'in_progress')"
+            ).fetchone()[0]
+        if not waiting or runs > 10 * (args.posts // args.per_run + 1):
+            break
+    elapsed = time.perf_counter() - start
+    with sqlite3.connect(config.DB_PATH) as conn:
+        counts = dict(conn.execute('SELECT status, COUNT(*) FROM posts GROUP BY status').fetchall())
+    posted = counts.get('posted', 0)
+    print(f"{runs} runs, {posted} posted in {elapsed:.2f}s = {posted / elapsed:.1f} posts/s; queue {counts}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,283 @@
+"""Benchmark suite for the import -> dequeue -> post pipeline, as comparable JSON.
+
+Each case runs in its own process against a fresh PROJECT_ROOT with a
+synthetic content.db history of --rows posts (10% still ready) and, where it
+imports, --files generated ready files:
+
+    import        PostManager.import_new_files, in rounds of --import-batch files
+    dequeue       PostManager.get_next_ready_post
+    update        PostManager.update_post_status
+    queue_status  PostManager.get_queue_status
+    main_cycle    one cron run of main.main() against the fake PDS
+    startup       a whole `python main.py` process finding nothing to do
+
+and reports ops, throughput, p50/p99 latency and the process's peak RSS.
+Save a run with --output and pass it to a later run with --compare to flag
+cases whose throughput or p99 got more than --threshold worse.
+
+    python benchmarks/run.py --rows 100000 --output before.json
+    python benchmarks/run.py --rows 100000 --compare before.json
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import random
+import resource
+import sqlite3
+import subprocess
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+import common
+
+CASES = ('import', 'dequeue', 'update', 'queue_status', 'main_cycle', 'startup')
+WORDS = "the quick brown fox jumps over a lazy dog while sqlite keeps every post in order".split()
+
+
+def write_ready_files(ready_dir, files, prefix="post"):
+    """Markdown files shaped like real ones: some with front matter, tags and links"""
+    ready_dir.mkdir(parents=True, exist_ok=True)
+    rng = random.Random(files)
+    for i in range(files):
+        body = f"Post {prefix} {i}: " + " ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 40)))
+        if i % 4 == 0:
+            body += " #bench https://example.com/" + str(i)
+        if i % 5 == 0:
+            body = f"---\npriority: {i % 3}\n---\n{body}"
+        (ready_dir / f"{prefix}-{i:07d}.md").write_text(body, encoding='utf-8')
+
+
+def history(args):
+    """A migrated content.db holding --rows synthetic posts, and a PostManager on it"""
+    import config
+    from post_manager import PostManager
+
+    db_path = common.fresh_database("content")
+    with sqlite3.connect(db_path) as conn:
+        common.populate_posts(conn, args.rows)
+    config.PROCESSED_DIR.mkdir(parents=True, exist_ok=True)
+    return PostManager(db_path, config.READY_DIR, config.PROCESSED_DIR)
+
+
+def sample(func, repeats):
+    """Latencies in seconds of repeats calls to func"""
+    samples = []
+    for _ in range(repeats):
+        _, elapsed = common.timed(func)
+        samples.append(elapsed)
+    return samples
+
+
+def bench_import(args):
+    import config
+
+    with history(args) as post_manager:
+        rounds = max(1, args.files // args.import_batch)
+        samples = []
+        for r in range(rounds):
+            write_ready_files(config.READY_DIR, args.import_batch, prefix=f"r{r:04d}")
+            imported, elapsed = common.timed(post_manager.import_new_files)
+            assert imported == args.import_batch, imported
+            samples.append(elapsed)
+    return rounds * args.import_batch, samples
+
+
+def bench_dequeue(args):
+    with history(args) as post_manager:
+        return args.samples, sample(post_manager.get_next_ready_post, args.samples)
+
+
+def bench_update(args):
+    with history(args) as post_manager:
+        with post_manager._get_db_connection() as conn:
+            ids = [row[0] for row in conn.execute(
+                "SELECT id FROM posts WHERE status = 'ready' LIMIT ?", (args.samples,)
+            )]
+        pending = iter(ids)
+        samples = sample(lambda: post_manager.update_post_status(next(pending), 'posted', datetime.now()), len(ids))
+    return len(ids), samples
+
+
+def bench_queue_status(args):
+    with history(args) as post_manager:
+        repeats = max(1, args.samples // 10)
+        return repeats, sample(post_manager.get_queue_status, repeats)
+
+
+def bench_main_cycle(args):
+    # config reads the environment once, on first import
+    os.environ.update({
+        'BLUESKY_BACKEND': 'fake',
+        'BLUESKY_USERNAME': 'bench.test',
+        'BLUESKY_PASSWORD': 'bench-password',
+        'TEST_MODE': 'false',
+        'POSTS_PER_RUN': str(args.per_run),
+        'FAKE_PDS_LATENCY': '0',
+        'RATE_LIMIT_POSTS_PER_SECOND': '0',
+        'RESOLVE_MENTIONS': 'false',
+        'SESSION_CACHE_ENABLED': 'false',
+    })
+    import config
+
+    history(args).close()
+    write_ready_files(config.READY_DIR, args.files)
+    import main as app
+
+    posted_before = count_posted(config.DB_PATH)
+    samples = []
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(args.cycles):
+            samples.append(common.timed(app.main)[1])
+    return count_posted(config.DB_PATH) - posted_before, samples
+
+
+def bench_startup(args):
+    import config
+
+    # Nothing ready and nothing due: the idle cron run
+    with sqlite3.connect(common.fresh_database("content")) as conn:
+        common.populate_posts(conn, args.rows, ready_fraction=0)
+    config.READY_DIR.mkdir(parents=True, exist_ok=True)
+    env = dict(os.environ, TEST_MODE='false')
+    command = [sys.executable, str(common.SRC_DIR / "main.py")]
+    samples = sample(lambda: subprocess.run(command, env=env, check=True, cwd=common.SRC_DIR), args.cycles)
+    return args.cycles, samples
+
+
+def count_posted(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return conn.execute("SELECT COUNT(*) FROM posts WHERE status = 'posted'").fetchone()[0]
+
+
+BENCHES = {
+    'import': bench_import,
+    'dequeue': bench_dequeue,
+    'update': bench_update,
+    'queue_status': bench_queue_status,
+    'main_cycle': bench_main_cycle,
+    'startup': bench_startup,
+}
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / 2**20 if sys.platform == 'darwin' else peak / 1024
+
+
+def run_case(case, args) -> dict:
+    """Run one case in this process and summarize it"""
+    ops, samples = BENCHES[case](args)
+    seconds = sum(samples)
+    return {
+        'ops': ops,
+        'seconds': round(seconds, 6),
+        'ops_per_sec': round(ops / seconds, 2) if seconds else None,
+        'p50_ms': round(common.percentile(samples, 50) * 1000, 4),
+        'p99_ms': round(common.percentile(samples, 99) * 1000, 4),
+        'peak_rss_mb': round(peak_rss_mb(), 1),
+    }
+
+
+def spawn_case(case, argv) -> dict:
+    """Run one case in a child process, so its RSS and caches are its own"""
+    env = dict(os.environ, PROJECT_ROOT=str(common.BENCH_ROOT / case))
+    result = subprocess.run(
+        [sys.executable, __file__, *argv, '--case', case],
+        env=env, capture_output=True, text=True
+    )
+    if result.returncode:
+        raise RuntimeError(f"{case} failed:\n{result.stderr}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], cwd=common.SRC_DIR,
+            capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold) -> list:
+    """Print case-by-case changes against baseline and return the regressions"""
+    regressions = []
+    for case, current in results['cases'].items():
+        previous = baseline['cases'].get(case)
+        if not previous:
+            continue
+        # Throughput should not fall and p99 should not grow
+        changes = {
+            'ops_per_sec': (previous['ops_per_sec'] - current['ops_per_sec']) / previous['ops_per_sec']
+            if previous['ops_per_sec'] and current['ops_per_sec'] else 0.0,
+            'p99_ms': (current['p99_ms'] - previous['p99_ms']) / previous['p99_ms'] if previous['p99_ms'] else 0.0,
+        }
+        worse = [metric for metric, change in changes.items() if change > threshold]
+        regressions.extend(f"{case}.{metric}" for metric in worse)
+        print(
+            f"{case:>12}: {previous['ops_per_sec']:>10} -> {current['ops_per_sec']:>10} ops/s, "
+            f"p99 {previous['p99_ms']:>9} -> {current['p99_ms']:>9} ms"
+            + (f"  REGRESSION ({', '.join(worse)})" if worse else ""),
+            file=sys.stderr
+        )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100_000, help="posts in the synthetic history")
+    parser.add_argument('--files', type=int, default=2_000, help="ready files to import")
+    parser.add_argument('--import-batch', type=int, default=200, help="files per import round")
+    parser.add_argument('--samples', type=int, default=500, help="calls timed per query case")
+    parser.add_argument('--cycles', type=int, default=10, help="main() runs in main_cycle and startup")
+    parser.add_argument('--per-run', type=int, default=50, help="POSTS_PER_RUN for main_cycle")
+    parser.add_argument('--cases', nargs='+', choices=CASES, default=list(CASES))
+    parser.add_argument('--output', type=Path, help="write the results JSON here")
+    parser.add_argument('--compare', type=Path, help="a previous results JSON to compare against")
+    parser.add_argument('--threshold', type=float, default=0.10, help="relative change counted as a regression")
+    parser.add_argument('--case', choices=CASES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.case:
+        print(json.dumps(run_case(args.case, args)))
+        return
+
+    params = {name: getattr(args, name) for name in ('rows', 'files', 'import_batch', 'samples', 'cycles', 'per_run')}
+    argv = [f"--{name.replace('_', '-')}={value}" for name, value in params.items()]
+    results = {
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'sqlite': sqlite3.sqlite_version,
+        'platform': platform.platform(),
+        'params': params,
+        'cases': {},
+    }
+    for case in args.cases:
+        start = time.perf_counter()
+        results['cases'][case] = spawn_case(case, argv)
+        print(f"{case:>12}: {results['cases'][case]} ({time.perf_counter() - start:.1f}s)", file=sys.stderr)
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        args.output.write_text(output + "\n", encoding='utf-8')
+    print(output)
+
+    if args.compare:
+        baseline = json.loads(args.compare.read_text(encoding='utf-8'))
+        if baseline.get('params') != params:
+            print(f"warning: baseline was run with {baseline.get('params')}", file=sys.stderr)
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"{len(regressions)} regression(s) over {args.threshold:.0%}: {', '.join(regressions)}", file=sys.stderr)
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
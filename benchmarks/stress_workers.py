@@ -0,0 +1,102 @@
+"""Stress test for lease-based multi-worker posting.
+
+Runs N worker processes against one database and a fake poster that sleeps
+to simulate network latency, then checks that every post was published
+exactly once and reports throughput per worker count.
+
+    python benchmarks/stress_workers.py --posts 2000 --workers 1 2 4 8
+"""
+import argparse
+import multiprocessing
+import sqlite3
+import sys
+import time
+from collections import Counter
+
+import common
+from bluesky_poster import PostResult
+from post_manager import PostManager
+from worker import PostWorker
+
+
+class FakePoster:
+    """Records what it publishes instead of talking to Bluesky"""
+
+    def __init__(self, latency, published):
+        self.latency = latency
+        self.published = published
+
+    def for_account(self, username):
+        return self
+
+    def post_content(self, content, record=None, reply=None, images=None):
+        time.sleep(self.latency)
+        self.published.append(content)
+        return PostResult(True, "Posted successfully", uri=f"at://stress/{len(self.published)}", cid="stress")
+
+
+def worker_process(db_path, batch_size, latency, lease_seconds, results):
+    published = []
+    ready_dir = common.BENCH_ROOT / "posts" / "ready"
+    with PostManager(db_path, ready_dir, common.BENCH_ROOT / "posts" / "processed") as post_manager:
+        worker = PostWorker(
+            post_manager,
+            FakePoster(latency, published),
+            batch_size=batch_size,
+            lease_seconds=lease_seconds,
+            heartbeat_seconds=max(lease_seconds / 3, 0.1)
+        )
+        worker.run(exit_when_idle=True)
+    results.put(published)
+
+
+def run(workers, posts, batch_size, latency, lease_seconds):
+    db_path = common.fresh_database(f"workers-{workers}")
+    with sqlite3.connect(db_path) as conn:
+        common.populate_posts(conn, posts, ready_fraction=1.0)
+
+    results = multiprocessing.Queue()
+    processes = [
+        multiprocessing.Process(target=worker_process, args=(db_path, batch_size, latency, lease_seconds, results))
+        for _ in range(workers)
+    ]
+    start = time.perf_counter()
+    for process in processes:
+        process.start()
+    published = []
+    for _ in processes:
+        published.extend(results.get())
+    for process in processes:
+        process.join()
+    elapsed = time.perf_counter() - start
+
+    duplicates = sum(count - 1 for count in Counter(published).values() if count > 1)
+    with sqlite3.connect(db_path) as conn:
+        posted = conn.execute("SELECT COUNT(*) FROM posts WHERE status = 'posted'").fetchone()[0]
+    return elapsed, len(published), duplicates, posted
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--posts', type=int, default=2000)
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    parser.add_argument('--batch-size', type=int, default=10)
+    parser.add_argument('--latency', type=float, default=0.01, help="simulated seconds per post")
+    parser.add_argument('--lease-seconds', type=int, default=5)
+    args = parser.parse_args()
+
+    ok = True
+    for workers in args.workers:
+        elapsed, published, duplicates, posted = run(
+            workers, args.posts, args.batch_size, args.latency, args.lease_seconds
+        )
+        ok &= duplicates == 0 and posted == args.posts
+        print(
+            f"{workers:>3} workers: {published / elapsed:8.1f} posts/s, "
+            f"published {published}, duplicates {duplicates}, posted rows {posted}/{args.posts}"
+        )
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
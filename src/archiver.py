@@ -0,0 +1,211 @@
+import argparse
+import json
+import sqlite3
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set
+
+# Statuses a post never leaves; only these are archived
+FINISHED_STATUSES = ('posted', 'dead', 'failed')
+DEFAULT_ARCHIVE_BATCH_SIZE = 5000
+
+def archive_key(digest: str) -> int:
+    """archive_index key of a content hash: its first 60 bits"""
+    return int(digest[:15], 16)
+
+def archive_path(archive_dir: Path, month: str) -> Path:
+    """The archive database holding posts finished in month (YYYY-MM)"""
+    return archive_dir / f"posts-{month}.db"
+
+def archived_hashes(conn, archive_dir: Optional[Path], hashes: Iterable[str]) -> Set[str]:
+    """Those of the given content hashes that belong to archived posts
+
+    archive_index narrows them down in the hot database; only a hit opens the
+    month's archive to confirm the full hash. Without archive_dir, index hits
+    are trusted as is.
+    """
+    by_key: Dict[int, List[str]] = {}
+    for digest in hashes:
+        by_key.setdefault(archive_key(digest), []).append(digest)
+    if not by_key:
+        return set()
+    candidates: Dict[str, List[str]] = {}
+    for key, month in conn.execute(
+        'SELECT hash_key, month FROM archive_index WHERE hash_key IN (SELECT value FROM json_each(?))',
+        (json.dumps(list(by_key)),)
+    ):
+        candidates.setdefault(month, []).extend(by_key[key])
+    if archive_dir is None:
+        return {digest for digests in candidates.values() for digest in digests}
+
+    found = set()
+    for month, digests in candidates.items():
+        path = archive_path(archive_dir, month)
+        if not path.exists():
+            print(f"Archive {path} is missing; trusting archive_index")
+            found.update(digests)
+            continue
+        archive = sqlite3.connect(f"{path.as_uri()}?mode=ro", uri=True)
+        try:
+            found.update(row[0] for row in archive.execute(
+                'SELECT content_hash FROM posts WHERE content_hash IN (SELECT value FROM json_each(?))',
+                (json.dumps(digests),)
+            ))
+        finally:
+            archive.close()
+    return found
+
+class Archiver:
+    """Moves finished posts out of content.db into monthly archive databases.
+
+    Posted, dead and failed posts whose posting (or, if never posted,
+    creation) time is older than the cutoff go to
+    archive_dir/posts-YYYY-MM.db, attached only while its month is copied.
+    A thread is only archived once none of its parts are still queued, so
+    replies can always find their parents.
+
+    Each batch is first committed to the archive and only then deleted from
+    content.db, along with adding its hashes to archive_index, in a second
+    transaction. A crash in between leaves copies in both places, which the
+    next run overwrites, never a post in neither.
+    """
+
+    def __init__(self, db_path: Path, archive_dir: Path, batch_size: int = DEFAULT_ARCHIVE_BATCH_SIZE):
+        self.db_path = db_path
+        self.archive_dir = archive_dir
+        self.batch_size = batch_size
+        self._conn = sqlite3.connect(db_path, timeout=30.0, isolation_level=None)
+        self._attached = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self._conn.close()
+
+    def _candidates(self, cutoff: datetime, after_id: int) -> List[tuple]:
+        """The next batch of archivable (id, month, content_hash) rows, in id order"""
+        placeholders = ", ".join("?" * len(FINISHED_STATUSES))
+        return self._conn.execute(f'''
+            SELECT id, strftime('%Y-%m', COALESCE(posted_at, created_at)), content_hash
+            FROM posts AS p
+            -- Walk the primary key; the status indexes would rescan every batch
+            WHERE id > ?
+            AND +status IN ({placeholders})
+            AND COALESCE(posted_at, created_at) < ?
+            AND NOT EXISTS (
+                SELECT 1 FROM posts AS part
+                WHERE (part.id = COALESCE(p.thread_root_id, p.id)
+                       OR part.thread_root_id = COALESCE(p.thread_root_id, p.id))
+                AND part.status NOT IN ({placeholders})
+            )
+            ORDER BY id
+            LIMIT ?
+        ''', (after_id, *FINISHED_STATUSES, cutoff, *FINISHED_STATUSES, self.batch_size)).fetchall()
+
+    def _attach(self, month: str):
+        """Attach month's archive as `archive`, creating or widening its posts table"""
+        if self._attached == month:
+            return
+        if self._attached:
+            self._conn.execute('DETACH DATABASE archive')
+            self._attached = None
+        self.archive_dir.mkdir(parents=True, exist_ok=True)
+        self._conn.execute('ATTACH DATABASE ? AS archive', (str(archive_path(self.archive_dir, month)),))
+        self._attached = month
+        columns = [(row[1], row[2]) for row in self._conn.execute('PRAGMA main.table_info(posts)')]
+        existing = {row[1] for row in self._conn.execute('PRAGMA archive.table_info(posts)')}
+        if not existing:
+            definitions = ", ".join(
+                "id INTEGER PRIMARY KEY" if name == "id" else f"{name} {declared}" for name, declared in columns
+            )
+            self._conn.execute(f'CREATE TABLE archive.posts ({definitions})')
+            self._conn.execute('CREATE INDEX archive.idx_posts_content_hash ON posts (content_hash)')
+        else:
+            # Columns added to content.db since this archive was created
+            for name, declared in columns:
+                if name not in existing:
+                    self._conn.execute(f'ALTER TABLE archive.posts ADD COLUMN {name} {declared}')
+
+    def _move(self, month: str, rows: List[tuple]):
+        """Copy one month's rows of a batch into its archive, then drop them from content.db"""
+        ids = json.dumps([row[0] for row in rows])
+        self._attach(month)
+        columns = ", ".join(row[1] for row in self._conn.execute('PRAGMA main.table_info(posts)'))
+        self._conn.execute('BEGIN')
+        try:
+            self._conn.execute(f'''
+                INSERT OR REPLACE INTO archive.posts ({columns})
+                SELECT {columns} FROM main.posts WHERE id IN (SELECT value FROM json_each(?))
+            ''', (ids,))
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+
+        self._conn.execute('BEGIN IMMEDIATE')
+        try:
+            self._conn.executemany(
+                'INSERT OR IGNORE INTO main.archive_index (hash_key, month) VALUES (?, ?)',
+                [(archive_key(digest), month) for _, _, digest in rows if digest]
+            )
+            self._conn.execute('''
+                DELETE FROM main.posts WHERE id IN (SELECT value FROM json_each(?))
+            ''', (ids,))
+            self._conn.execute('COMMIT')
+        except Exception:
+            self._conn.execute('ROLLBACK')
+            raise
+
+    def archive(self, older_than: datetime) -> Dict[str, int]:
+        """Archive every finished post older than older_than; returns posts moved per month"""
+        moved: Dict[str, int] = {}
+        after_id = 0
+        try:
+            while True:
+                rows = self._candidates(older_than, after_id)
+                if not rows:
+                    break
+                after_id = rows[-1][0]
+                by_month: Dict[str, List[tuple]] = {}
+                for row in rows:
+                    by_month.setdefault(row[1], []).append(row)
+                for month, month_rows in sorted(by_month.items()):
+                    self._move(month, month_rows)
+                    moved[month] = moved.get(month, 0) + len(month_rows)
+        finally:
+            if self._attached:
+                self._conn.execute('DETACH DATABASE archive')
+                self._attached = None
+        return moved
+
+    def vacuum(self):
+        """Shrink content.db to its live rows after a large archive run"""
+        self._conn.execute('VACUUM')
+
+def main():
+    from config import DB_PATH, ARCHIVE_DIR, ARCHIVE_AFTER_DAYS
+    from db_setup import setup_database
+
+    parser = argparse.ArgumentParser(description="Move old posted and dead posts into monthly archive databases")
+    parser.add_argument('--days', type=int, default=ARCHIVE_AFTER_DAYS, help="archive posts older than this")
+    parser.add_argument('--vacuum', action='store_true', help="compact content.db afterwards")
+    args = parser.parse_args()
+
+    setup_database()
+    cutoff = datetime.now() - timedelta(days=args.days)
+    with Archiver(DB_PATH, ARCHIVE_DIR) as archiver:
+        moved = archiver.archive(cutoff)
+        for month, count in sorted(moved.items()):
+            print(f"Archived {count} posts to {archive_path(ARCHIVE_DIR, month)}")
+        if not moved:
+            print(f"No finished posts older than {args.days} days")
+        elif args.vacuum:
+            archiver.vacuum()
+            print(f"Compacted {DB_PATH}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,50 @@
+from typing import Optional, Protocol
+
+class PostingBackend(Protocol):
+    """The XRPC service posters talk to
+
+    Posters only need its base url, so a backend swaps out everything behind
+    the client while the client code path itself stays the real one.
+    """
+    url: Optional[str]
+
+    def start(self) -> "PostingBackend": ...
+
+    def stop(self) -> None: ...
+
+    def summary(self) -> Optional[str]: ...
+
+class BlueskyBackend:
+    """A real PDS: url, or bsky.social when None"""
+
+    def __init__(self, url: Optional[str] = None):
+        self.url = url
+
+    def start(self) -> "BlueskyBackend":
+        return self
+
+    def stop(self):
+        pass
+
+    def summary(self) -> Optional[str]:
+        return None
+
+def configured_backend() -> PostingBackend:
+    """The backend chosen by BLUESKY_BACKEND, not yet started"""
+    from config import (
+        BLUESKY_BACKEND, BLUESKY_PDS_URL,
+        FAKE_PDS_LATENCY, FAKE_PDS_JITTER, FAKE_PDS_ERROR_RATE, FAKE_PDS_RATE_LIMIT, FAKE_PDS_RATE_WINDOW
+    )
+
+    if BLUESKY_BACKEND == "fake":
+        from fake_pds import FakePDS
+        return FakePDS(
+            latency=FAKE_PDS_LATENCY,
+            jitter=FAKE_PDS_JITTER,
+            error_rate=FAKE_PDS_ERROR_RATE,
+            rate_limit=FAKE_PDS_RATE_LIMIT or None,
+            window=FAKE_PDS_RATE_WINDOW
+        )
+    if BLUESKY_BACKEND != "bluesky":
+        raise ValueError(f"BLUESKY_BACKEND must be 'bluesky' or 'fake', not {BLUESKY_BACKEND!r}")
+    return BlueskyBackend(BLUESKY_PDS_URL)
@@ -0,0 +1,46 @@
+import json
+import os
+import re
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+class BlobCache:
+    """Remembers uploaded image blobs, one JSON file per account and image hash.
+
+    Blobs belong to the account that uploaded them, so entries are keyed by
+    username and the sha256 of the original file. An entry holds the blob ref
+    returned by uploadBlob (plus the aspect ratio, when known) and is all a
+    post needs to embed the image again without uploading it.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+        self._entries: Dict[Tuple[str, str], dict] = {}
+
+    def _path(self, username: str, digest: str) -> Path:
+        return self.directory / re.sub(r'[^A-Za-z0-9._-]', '_', username) / f"{digest}.json"
+
+    def load(self, username: str, digest: str) -> Optional[dict]:
+        """Return the cached entry for an image, if it was uploaded before"""
+        entry = self._entries.get((username, digest))
+        if entry is None:
+            try:
+                entry = json.loads(self._path(username, digest).read_text(encoding='utf-8'))
+            except (FileNotFoundError, ValueError):
+                return None
+            self._entries[(username, digest)] = entry
+        return entry
+
+    def save(self, username: str, digest: str, entry: dict):
+        """Atomically record the uploaded blob of an image"""
+        path = self._path(username, digest)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        tmp_path.write_text(json.dumps(entry), encoding='utf-8')
+        os.replace(tmp_path, path)
+        self._entries[(username, digest)] = entry
+
+    def clear(self, username: str, digest: str):
+        """Forget an image, e.g. after the server no longer knows its blob"""
+        self._entries.pop((username, digest), None)
+        self._path(username, digest).unlink(missing_ok=True)
@@ -1,33 +1,428 @@
+import asyncio
+import functools
+import json
+import time
 from dataclasses import dataclass
-from typing import Tuple
-from atproto import Client
+from typing import Dict, List, Optional, Tuple
+import httpx
+from atproto import AsyncClient, Client, SessionEvent
+from atproto_client.request import AsyncRequest, Request
+from atproto.exceptions import (
+    AtProtocolError, BadRequestError, NetworkError, RateLimitExceededError, RequestErrorBase
+)
+from blob_cache import BlobCache
+# Defined apart so reading accounts does not load atproto; still importable from here
+from credentials import BlueskyCredentials
+from media import ImageRef, PreparedImage, aiter_file, file_sha256, iter_file, prepare_image
+import metrics
+from rate_limiter import CREATE_RECORD_POINTS, TokenBucket
+from session_cache import SessionCache
+
+# Used when a 429 carries neither retry-after nor ratelimit-reset
+DEFAULT_RATE_LIMIT_BACKOFF = 60.0
+
+# The endpoints whose ratelimit-* headers track the write-points budget
+WRITE_NSIDS = ('com.atproto.repo.createRecord', 'com.atproto.repo.applyWrites')
+
+POST_COLLECTION = "app.bsky.feed.post"
+_JSON_HEADERS = {"Content-Type": "application/json"}
+
+# (uri, cid) of a published post, and the (root, parent) refs of a reply
+PostRef = Tuple[str, str]
+ReplyRefs = Tuple[PostRef, PostRef]
 
 @dataclass
-class BlueskyCredentials:
-    """Data structure for Bluesky authentication"""
-    username: str
-    password: str
+class PostResult:
+    """Outcome of a single post attempt"""
+    success: bool
+    message: str
+    transient: bool = False
+    uri: Optional[str] = None
+    cid: Optional[str] = None
+
+def is_transient_error(error: Exception) -> bool:
+    """Whether a failed post is worth retrying later
+
+    Timeouts, connection problems, rate limits and 5xx responses are
+    transient; authentication and validation errors are not.
+    """
+    if isinstance(error, RateLimitExceededError):
+        return True
+    if isinstance(error, RequestErrorBase):
+        status_code = error.response.status_code if error.response is not None else None
+        if isinstance(error, NetworkError):
+            # 413 means the record itself is too large; retrying won't help
+            return status_code != 413
+        return status_code is not None and status_code >= 500
+    return isinstance(error, (TimeoutError, ConnectionError))
+
+@functools.lru_cache(maxsize=None)
+def _ssl_context():
+    """One TLS context for every client; loading the CA bundle takes ~50 ms"""
+    return httpx.create_ssl_context()
+
+def _spends_write_points(kwargs) -> bool:
+    """Whether a request is a record write, whose headers report the posting budget
+
+    Other endpoints (createSession, getSession, uploadBlob) have limits and
+    windows of their own that must not replace it.
+    """
+    return str(kwargs.get('url', '')).endswith(WRITE_NSIDS)
+
+class _HeaderTrackingClient(Client):
+    """Client that reports the headers of every successful record write"""
+
+    def __init__(self, on_headers, base_url: Optional[str] = None):
+        super().__init__(base_url, request=Request(verify=_ssl_context()))
+        self._on_headers = on_headers
+
+    def _invoke(self, invoke_type, **kwargs):
+        response = super()._invoke(invoke_type, **kwargs)
+        if _spends_write_points(kwargs):
+            self._on_headers(response.headers)
+        return response
+
+class _AsyncHeaderTrackingClient(AsyncClient):
+    """AsyncClient that reports the headers of every successful record write"""
+
+    def __init__(self, on_headers, base_url: Optional[str] = None):
+        super().__init__(base_url, request=AsyncRequest(verify=_ssl_context()))
+        self._on_headers = on_headers
+
+    async def _invoke(self, invoke_type, **kwargs):
+        response = await super()._invoke(invoke_type, **kwargs)
+        if _spends_write_points(kwargs):
+            self._on_headers(response.headers)
+        return response
 
-class BlueskyPoster:
-    def __init__(self, credentials: BlueskyCredentials, test_mode: bool = False):
+def _rate_limit_backoff(error: RateLimitExceededError) -> float:
+    """Seconds to hold off after a 429, from the response headers"""
+    if error.retry_after is not None:
+        return error.retry_after
+    if error.reset_at is not None:
+        return max(0.0, error.reset_at.timestamp() - time.time())
+    return DEFAULT_RATE_LIMIT_BACKOFF
+
+def _create_record_body(repo: str, record: str, created_at: str, reply: Optional[ReplyRefs] = None,
+                        embed: Optional[str] = None) -> bytes:
+    """createRecord request body around a record pre-rendered at import
+
+    The stored record is a JSON object without createdAt, so the timestamp
+    (and the reply refs of a thread part, and the embed JSON of its images)
+    are spliced in as its last keys instead of parsing and re-serializing it.
+    """
+    extra = f',"createdAt":"{created_at}"'
+    if reply:
+        (root_uri, root_cid), (parent_uri, parent_cid) = reply
+        extra += (
+            f',"reply":{{"root":{{"uri":{json.dumps(root_uri)},"cid":{json.dumps(root_cid)}}},'
+            f'"parent":{{"uri":{json.dumps(parent_uri)},"cid":{json.dumps(parent_cid)}}}}}'
+        )
+    if embed:
+        extra += f',"embed":{embed}'
+    return (
+        f'{{"repo":{json.dumps(repo)},"collection":"{POST_COLLECTION}",'
+        f'"record":{record[:-1]}{extra}}}}}'
+    ).encode("utf-8")
+
+def _images_embed(images: List[ImageRef], entries: List[dict]) -> str:
+    """app.bsky.embed.images JSON for uploaded (or cached) images"""
+    return json.dumps({
+        "$type": "app.bsky.embed.images",
+        "images": [{"alt": alt, "image": entry["blob"], **({"aspectRatio": entry["aspectRatio"]}
+                                                           if "aspectRatio" in entry else {})}
+                   for (_, alt), entry in zip(images, entries)],
+    }, ensure_ascii=False, separators=(",", ":"))
+
+def _upload_headers(prepared: PreparedImage) -> Dict[str, str]:
+    # With an explicit Content-Length a streamed file is not sent chunked
+    return {"Content-Type": prepared.mime_type, "Content-Length": str(prepared.size)}
+
+def _is_missing_blob(error: Exception) -> bool:
+    """Whether createRecord rejected an embed because the server lost its blob"""
+    return isinstance(error, BadRequestError) and "blob" in str(error).lower()
+
+def _plain_record(content: str) -> str:
+    return json.dumps({"$type": POST_COLLECTION, "text": content}, ensure_ascii=False, separators=(",", ":"))
+
+def _test_result(username: str, content: str, images: Optional[List[ImageRef]] = None) -> PostResult:
+    """Test mode outcome, with a made-up ref so thread replies can chain"""
+    uri = f"at://{username}/{POST_COLLECTION}/test{time.time_ns()}"
+    attached = f"\n[{len(images)} image(s)]" if images else ""
+    return PostResult(True, f"Test mode - Would post:\n{content}{attached}", uri=uri, cid="test")
+
+class _PosterBase:
+    """Everything but the network calls, shared by the sync and async posters
+
+    Session and rate-limit bookkeeping, building the createRecord request
+    and classifying failures live here, so the two post_content methods
+    differ only in their awaits.
+    """
+
+    def __init__(self, credentials: BlueskyCredentials, test_mode: bool = False, base_url: Optional[str] = None,
+                 rate_limiter: Optional[TokenBucket] = None, max_rate_limit_retries: int = 3,
+                 session_cache: Optional[SessionCache] = None, blob_cache: Optional[BlobCache] = None,
+                 resize_images: bool = True):
         self.credentials = credentials
         self.test_mode = test_mode
+        self.base_url = base_url
+        self.rate_limiter = rate_limiter
+        self.max_rate_limit_retries = max_rate_limit_retries
+        self.session_cache = session_cache
+        self.blob_cache = blob_cache
+        self.resize_images = resize_images
+        self.login_seconds: Optional[float] = None
         self._client = None
+        self._did: Optional[str] = None
+
+    def rate_limit_delay(self) -> float:
+        """Seconds the next post_content would wait on the rate limiter"""
+        if self.test_mode or not self.rate_limiter:
+            return 0.0
+        return self.rate_limiter.delay(CREATE_RECORD_POINTS)
+
+    def _on_headers(self, headers):
+        if self.rate_limiter:
+            self.rate_limiter.update_from_headers(headers)
+
+    def _on_session_change(self, event: SessionEvent, session):
+        """Remember our DID and persist every new or refreshed session"""
+        self._did = session.did
+        if self.session_cache and event in (SessionEvent.CREATE, SessionEvent.REFRESH):
+            self.session_cache.save(self.credentials.username, session.export())
+
+    def _new_client(self, client_class):
+        """An unauthenticated client that reports rate-limit headers and session changes"""
+        client = client_class(self._on_headers, base_url=self.base_url)
+        client.on_session_change(self._on_session_change)
+        return client
 
+    def _cached_session(self) -> Optional[str]:
+        return self.session_cache.load(self.credentials.username) if self.session_cache else None
+
+    def _reject_cached_session(self, error: Exception):
+        print(f"Cached session for {self.credentials.username} rejected ({error}); logging in with password")
+        self.session_cache.clear(self.credentials.username)
+
+    def _report_login(self, method: str, started: float):
+        self.login_seconds = time.perf_counter() - started
+        print(f"Authenticated {self.credentials.username} via {method} in {self.login_seconds:.3f}s")
+
+    def for_account(self, username: Optional[str]):
+        """This poster for posts of its own (or the default) account, else None"""
+        if username is None or username == self.credentials.username.lower():
+            return self
+        return None
+
+    def _cached_blob(self, digest: str) -> Optional[dict]:
+        return self.blob_cache.load(self.credentials.username, digest) if self.blob_cache else None
+
+    def _remember_blob(self, digest: str, prepared: PreparedImage, response) -> dict:
+        """Cache entry for a finished upload"""
+        entry = {"blob": response.content["blob"]}
+        if prepared.aspect_ratio:
+            entry["aspectRatio"] = prepared.aspect_ratio
+        if self.blob_cache:
+            self.blob_cache.save(self.credentials.username, digest, entry)
+        return entry
+
+    def _forget_blobs(self, images: List[ImageRef]):
+        """Drop cached blobs so the next attempt uploads the images again"""
+        if self.blob_cache:
+            for path, _ in images:
+                self.blob_cache.clear(self.credentials.username, file_sha256(path))
+
+    def _create_record_request(self, content: str, record: Optional[str], reply: Optional[ReplyRefs],
+                               embed: Optional[str]) -> Optional[bytes]:
+        """createRecord body for a post with a record, reply or embed; None to use send_post
+
+        Built per attempt, so createdAt is the time the post is actually sent.
+        """
+        if not (record or reply or embed):
+            return None
+        return _create_record_body(self._did, record or _plain_record(content),
+                                   self._client.get_current_time_iso(), reply, embed)
+
+    def _back_off(self, error: RateLimitExceededError, attempt: int):
+        """Hold the rate limiter until a 429's reset, or re-raise once retries are used up"""
+        metrics.RATE_LIMITED.inc()
+        if not self.rate_limiter or attempt == self.max_rate_limit_retries:
+            raise error
+        self.rate_limiter.update_from_headers(error.response.headers)
+        self.rate_limiter.block_until(_rate_limit_backoff(error))
+
+    def _failure(self, error: Exception, images: Optional[List[ImageRef]]) -> PostResult:
+        """PostResult for a failed post, transient if retrying can succeed"""
+        message = str(error) or type(error).__name__
+        if images and _is_missing_blob(error):
+            # A cached blob the server no longer has; upload again on retry
+            self._forget_blobs(images)
+            return PostResult(False, message, transient=True)
+        return PostResult(False, message, transient=is_transient_error(error))
+
+class BlueskyPoster(_PosterBase):
     def _ensure_client(self):
-        """Ensure we have an authenticated client"""
-        if not self._client:
-            self._client = Client()
-            self._client.login(self.credentials.username, self.credentials.password)
+        """Ensure we have an authenticated client
 
-    def post_content(self, content: str) -> Tuple[bool, str]:
-        """Post content to Bluesky or simulate posting in test mode"""
+        A cached session is reused (getSession validates it and lets the client
+        refresh the access token if it is close to expiry); a full password
+        login only happens when there is no cached session or it is rejected.
+        """
+        if self._client:
+            return
+        started = time.perf_counter()
+        client = self._new_client(_HeaderTrackingClient)
+        session_string = self._cached_session()
+        if session_string:
+            try:
+                client.login(session_string=session_string, fetch_bsky_profile=False)
+                client.com.atproto.server.get_session()
+                self._client = client
+                self._report_login("cached session", started)
+                return
+            except (AtProtocolError, ValueError) as e:
+                self._reject_cached_session(e)
+                client = self._new_client(_HeaderTrackingClient)
+        client.login(self.credentials.username, self.credentials.password, fetch_bsky_profile=False)
+        self._client = client
+        self._report_login("password", started)
+
+    def close(self):
+        """Close the client's connections; the next post logs in again"""
+        if self._client:
+            self._client.request.close()
+            self._client = None
+
+    def _upload_image(self, path: str) -> dict:
+        """Blob entry for an image, uploading it unless this account already did"""
+        digest = file_sha256(path)
+        entry = self._cached_blob(digest)
+        if entry is None:
+            prepared = prepare_image(path, self.resize_images)
+            response = self._client.invoke_procedure(
+                'com.atproto.repo.uploadBlob', headers=_upload_headers(prepared),
+                content=prepared.data if prepared.data is not None else iter_file(path)
+            )
+            entry = self._remember_blob(digest, prepared, response)
+        return entry
+
+    def post_content(self, content: str, record: Optional[str] = None,
+                     reply: Optional[ReplyRefs] = None, images: Optional[List[ImageRef]] = None) -> PostResult:
+        """Post content to Bluesky or simulate posting in test mode
+
+        record is the post's pre-rendered record JSON (facets included); it is
+        sent as is. Without one, the plain content is posted. reply holds the
+        (root, parent) refs when the post continues a thread, and images the
+        (path, alt) of images to embed. The result carries the new post's uri
+        and cid.
+        """
         if self.test_mode:
-            return True, f"Test mode - Would post:\n{content}"
+            return _test_result(self.credentials.username, content, images)
 
         try:
             self._ensure_client()
-            response = self._client.post(text=content)
-            return True, "Posted successfully"
+            embed = _images_embed(images, [self._upload_image(path) for path, _ in images]) if images else None
+            for attempt in range(self.max_rate_limit_retries + 1):
+                if self.rate_limiter:
+                    self.rate_limiter.acquire(CREATE_RECORD_POINTS)
+                try:
+                    body = self._create_record_request(content, record, reply, embed)
+                    if body:
+                        response = self._client.invoke_procedure(
+                            'com.atproto.repo.createRecord', headers=_JSON_HEADERS, content=body
+                        )
+                        uri, cid = response.content["uri"], response.content["cid"]
+                    else:
+                        created = self._client.send_post(text=content, profile_identify=self._did)
+                        uri, cid = created.uri, created.cid
+                    return PostResult(True, "Posted successfully", uri=uri, cid=cid)
+                except RateLimitExceededError as e:
+                    self._back_off(e, attempt)
+        except Exception as e:
+            return self._failure(e, images)
+
+class AsyncBlueskyPoster(_PosterBase):
+    """Non-blocking counterpart of BlueskyPoster built on the atproto async client.
+
+    A single instance can have many post_content calls in flight at once; they
+    share one authenticated client, its connection pool and its rate limiter.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._login_lock = asyncio.Lock()
+        # One upload per image even when several posts embed it at once
+        self._upload_locks: Dict[str, asyncio.Lock] = {}
+
+    async def _ensure_client(self):
+        """Ensure we have an authenticated client, logging in only once"""
+        async with self._login_lock:
+            if self._client:
+                return
+            started = time.perf_counter()
+            client = self._new_client(_AsyncHeaderTrackingClient)
+            session_string = self._cached_session()
+            if session_string:
+                try:
+                    await client.login(session_string=session_string, fetch_bsky_profile=False)
+                    await client.com.atproto.server.get_session()
+                    self._client = client
+                    self._report_login("cached session", started)
+                    return
+                except (AtProtocolError, ValueError) as e:
+                    self._reject_cached_session(e)
+                    client = self._new_client(_AsyncHeaderTrackingClient)
+            await client.login(self.credentials.username, self.credentials.password, fetch_bsky_profile=False)
+            self._client = client
+            self._report_login("password", started)
+
+    async def close(self):
+        """Close the client's connections; the next post logs in again"""
+        if self._client:
+            await self._client.request.close()
+            self._client = None
+
+    async def _upload_image(self, path: str) -> dict:
+        """Blob entry for an image, uploading it unless this account already did"""
+        digest = await asyncio.to_thread(file_sha256, path)
+        async with self._upload_locks.setdefault(digest, asyncio.Lock()):
+            entry = self._cached_blob(digest)
+            if entry is None:
+                prepared = await asyncio.to_thread(prepare_image, path, self.resize_images)
+                response = await self._client.invoke_procedure(
+                    'com.atproto.repo.uploadBlob', headers=_upload_headers(prepared),
+                    content=prepared.data if prepared.data is not None else aiter_file(path)
+                )
+                entry = self._remember_blob(digest, prepared, response)
+        return entry
+
+    async def post_content(self, content: str, record: Optional[str] = None,
+                           reply: Optional[ReplyRefs] = None, images: Optional[List[ImageRef]] = None) -> PostResult:
+        """Post content to Bluesky or simulate posting in test mode"""
+        if self.test_mode:
+            return _test_result(self.credentials.username, content, images)
+
+        try:
+            await self._ensure_client()
+            embed = None
+            if images:
+                entries = await asyncio.gather(*(self._upload_image(path) for path, _ in images))
+                embed = _images_embed(images, entries)
+            for attempt in range(self.max_rate_limit_retries + 1):
+                if self.rate_limiter:
+                    await self.rate_limiter.acquire_async(CREATE_RECORD_POINTS)
+                try:
+                    body = self._create_record_request(content, record, reply, embed)
+                    if body:
+                        response = await self._client.invoke_procedure(
+                            'com.atproto.repo.createRecord', headers=_JSON_HEADERS, content=body
+                        )
+                        uri, cid = response.content["uri"], response.content["cid"]
+                    else:
+                        created = await self._client.send_post(text=content, profile_identify=self._did)
+                        uri, cid = created.uri, created.cid
+                    return PostResult(True, "Posted successfully", uri=uri, cid=cid)
+                except RateLimitExceededError as e:
+                    self._back_off(e, attempt)
         except Exception as e:
-            return False, str(e)
+            return self._failure(e, images)
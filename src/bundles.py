@@ -0,0 +1,81 @@
+import json
+import mmap
+import os
+from pathlib import Path
+from typing import Any, Dict, Iterator, Tuple
+
+JSONL_SUFFIX = ".jsonl"
+MARKDOWN_BUNDLE_SUFFIX = ".bundle.md"
+# Everything the importer picks up from the ready directory
+READY_SUFFIXES = (".md", JSONL_SUFFIX)
+SEPARATOR = b"---"
+
+# Bytes parsed between handing the mapped pages behind them back to the OS,
+# which keeps resident memory flat however large the bundle is
+RELEASE_EVERY = 16 * 2**20
+_DONTNEED = getattr(mmap, "MADV_DONTNEED", None)
+
+def is_bundle(path: Path) -> bool:
+    """Whether a ready file holds many posts rather than one"""
+    return path.name.endswith((JSONL_SUFFIX, MARKDOWN_BUNDLE_SUFFIX))
+
+def _next_separator(mm: mmap.mmap, pos: int, size: int) -> Tuple[int, int]:
+    """Start and end of the first `---` line at or after pos, or (size, size)"""
+    search = pos
+    while True:
+        hit = mm.find(SEPARATOR, search)
+        if hit == -1:
+            return size, size
+        line_end = mm.find(b"\n", hit)
+        following = size if line_end == -1 else line_end + 1
+        at_line_start = hit == 0 or mm[hit - 1] == ord("\n")
+        if at_line_start and mm[hit:following].strip() == SEPARATOR:
+            return hit, following
+        search = hit + len(SEPARATOR)
+
+def iter_records(path: Path, start: int = 0) -> Iterator[Tuple[int, int, bytes]]:
+    """Yield (offset, resume_offset, raw) for each non-blank record from start on
+
+    JSONL bundles hold one record per line; markdown bundles (.bundle.md)
+    separate posts with `---` lines. The file is memory-mapped and scanned
+    in place, so only the current record is ever copied; resume_offset is
+    where reading picks up after the record.
+    """
+    markdown = path.name.endswith(MARKDOWN_BUNDLE_SUFFIX)
+    with open(path, "rb") as f:
+        size = os.fstat(f.fileno()).st_size
+        if start >= size:
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            pos = start
+            released = start - start % mmap.PAGESIZE
+            while pos < size:
+                if markdown:
+                    end, following = _next_separator(mm, pos, size)
+                else:
+                    end = mm.find(b"\n", pos)
+                    end, following = (size, size) if end == -1 else (end, end + 1)
+                raw = mm[pos:end]
+                if raw.strip():
+                    yield pos, following, raw
+                pos = following
+                if _DONTNEED is not None and pos - released >= RELEASE_EVERY:
+                    # Pages are file-backed and clean: dropping them loses nothing
+                    release = pos - pos % mmap.PAGESIZE
+                    mm.madvise(_DONTNEED, released, release - released)
+                    released = release
+
+def decode_record(raw: bytes, markdown: bool) -> Tuple[Dict[str, Any], str]:
+    """(fields, markdown body) of one bundle record; raises ValueError if malformed
+
+    A JSONL record is a JSON string, or an object with a "content" string
+    and any of the front matter fields. Markdown bundle posts have no fields.
+    """
+    if markdown:
+        return {}, raw.decode("utf-8")
+    record = json.loads(raw)
+    if isinstance(record, str):
+        return {}, record
+    if not isinstance(record, dict) or not isinstance(record.get("content"), str):
+        raise ValueError('a JSONL record must be a string or an object with a "content" string')
+    return {str(key).lower(): value for key, value in record.items() if key != "content"}, record["content"]
@@ -24,12 +24,97 @@ REQUIRED_DIRS = [POSTS_DIR, DB_DIR, DRAFTS_DIR, READY_DIR, PROCESSED_DIR]
 # Bluesky configuration
 BLUESKY_USERNAME = os.getenv('BLUESKY_USERNAME')
 BLUESKY_PASSWORD = os.getenv('BLUESKY_PASSWORD')
+# More accounts: a YAML list of {username, password} entries. Posts pick one
+# with `account:` in their front matter; the rest use BLUESKY_USERNAME.
+BLUESKY_ACCOUNTS_FILE = os.getenv('BLUESKY_ACCOUNTS_FILE') or None
+# Reuse sessions across runs instead of logging in with the password each time
+SESSION_CACHE_ENABLED = os.getenv('SESSION_CACHE_ENABLED', 'true').lower() == 'true'
+SESSION_CACHE_DIR = DB_DIR / "sessions"
+# Remember uploaded image blobs by file hash so reused images upload once;
+# images over Bluesky's 1 MB limit are scaled down when Pillow is installed
+BLOB_CACHE_ENABLED = os.getenv('BLOB_CACHE_ENABLED', 'true').lower() == 'true'
+BLOB_CACHE_DIR = DB_DIR / "blobs"
+RESIZE_IMAGES = os.getenv('RESIZE_IMAGES', 'true').lower() == 'true'
+# Leave unset to use the default bsky.social PDS
+BLUESKY_PDS_URL = os.getenv('BLUESKY_PDS_URL') or None
+# 'fake' posts to an in-process fake PDS instead, for offline load tests: any
+# credentials log in, records are only kept in memory, and each createRecord
+# takes FAKE_PDS_LATENCY (+ up to FAKE_PDS_JITTER) seconds, fails with a 502
+# at FAKE_PDS_ERROR_RATE and is limited to FAKE_PDS_RATE_LIMIT write points
+# (3 per record, as on Bluesky) per FAKE_PDS_RATE_WINDOW seconds (0: unlimited)
+BLUESKY_BACKEND = os.getenv('BLUESKY_BACKEND', 'bluesky').lower()
+FAKE_PDS_LATENCY = float(os.getenv('FAKE_PDS_LATENCY', '0.2'))
+FAKE_PDS_JITTER = float(os.getenv('FAKE_PDS_JITTER', '0'))
+FAKE_PDS_ERROR_RATE = float(os.getenv('FAKE_PDS_ERROR_RATE', '0'))
+FAKE_PDS_RATE_LIMIT = int(os.getenv('FAKE_PDS_RATE_LIMIT', '0'))
+FAKE_PDS_RATE_WINDOW = float(os.getenv('FAKE_PDS_RATE_WINDOW', '300'))
 
 # Runtime configuration
 TEST_MODE = os.getenv('TEST_MODE', 'false').lower() == 'true'
 TEST_INTERVAL = int(os.getenv('TEST_INTERVAL'))
 PRODUCTION_INTERVAL = int(os.getenv('PRODUCTION_INTERVAL'))
 POSTS_PER_RUN = int(os.getenv('POSTS_PER_RUN'))
+CLAIM_LEASE_SECONDS = int(os.getenv('CLAIM_LEASE_SECONDS', '300'))
+
+# Transient failures are retried with exponential backoff; after
+# RETRY_MAX_ATTEMPTS failures (or any permanent error) a post is marked 'dead'
+RETRY_MAX_ATTEMPTS = int(os.getenv('RETRY_MAX_ATTEMPTS', '5'))
+RETRY_BASE_DELAY = float(os.getenv('RETRY_BASE_DELAY', '60'))
+RETRY_MAX_DELAY = float(os.getenv('RETRY_MAX_DELAY', '3600'))
+
+# Files imported per database transaction, and threads reading them (raise
+# IMPORT_READ_WORKERS when posts/ready is on NFS/EBS or other slow storage)
+IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', '500'))
+IMPORT_READ_WORKERS = int(os.getenv('IMPORT_READ_WORKERS', '8'))
+
+# Imports always skip exact duplicates (same text after normalizing case and
+# whitespace). DEDUP_NEAR_DUPLICATES also skips posts whose estimated word
+# overlap with an existing post reaches NEAR_DUPLICATE_THRESHOLD (0-1).
+DEDUP_NEAR_DUPLICATES = os.getenv('DEDUP_NEAR_DUPLICATES', 'false').lower() == 'true'
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv('NEAR_DUPLICATE_THRESHOLD', '0.8'))
+
+# Posted and dead posts older than ARCHIVE_AFTER_DAYS are moved by
+# archiver.py into one SQLite file per month under ARCHIVE_DIR, keeping
+# content.db small; imports still skip duplicates of archived posts
+ARCHIVE_DIR = Path(os.getenv('ARCHIVE_DIR') or DB_DIR / "archive")
+ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', '90'))
+# With daemon.py, run the archiver every day at this local time (HH:MM)
+DAEMON_ARCHIVE_AT = os.getenv('DAEMON_ARCHIVE_AT') or None
+
+# @mentions are resolved to DIDs at import so posting needs no lookups;
+# resolutions are cached in the database for HANDLE_CACHE_TTL seconds
+RESOLVE_MENTIONS = os.getenv('RESOLVE_MENTIONS', 'true').lower() == 'true'
+HANDLE_CACHE_TTL = float(os.getenv('HANDLE_CACHE_TTL', str(24 * 60 * 60)))
+
+# Watch the ready directory (inotify, or polling where unavailable) instead of
+# scanning it every cycle; used by the daemon and the long-running test mode loop
+WATCH_READY_DIR = os.getenv('WATCH_READY_DIR', 'false').lower() == 'true'
+WATCH_DEBOUNCE_SECONDS = float(os.getenv('WATCH_DEBOUNCE_SECONDS', '0.5'))
+
+# Client-side rate limiting of posts, per account. Bluesky's default PDS budget
+# is 5000 points/hour at 3 points per post (~0.46 posts/s); the limiter also
+# follows the ratelimit-* headers the server returns. 0 disables the bucket.
+RATE_LIMIT_POSTS_PER_SECOND = float(os.getenv('RATE_LIMIT_POSTS_PER_SECOND', '0.45'))
+RATE_LIMIT_BURST = int(os.getenv('RATE_LIMIT_BURST', '10'))
+RATE_LIMIT_MAX_RETRIES = int(os.getenv('RATE_LIMIT_MAX_RETRIES', '3'))
+
+# Asynchronous posting keeps up to MAX_CONCURRENT_POSTS requests in flight
+ASYNC_POSTING = os.getenv('ASYNC_POSTING', 'false').lower() == 'true'
+MAX_CONCURRENT_POSTS = int(os.getenv('MAX_CONCURRENT_POSTS', '8'))
+
+# Worker mode (worker.py)
+WORKER_HEARTBEAT_SECONDS = int(os.getenv('WORKER_HEARTBEAT_SECONDS', '30'))
+WORKER_IDLE_SECONDS = float(os.getenv('WORKER_IDLE_SECONDS', '5'))
+# WAL needs shared memory, so workers on different hosts sharing a network
+# volume must fall back to a rollback journal (e.g. DELETE)
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL')
+
+# Observability: Prometheus metrics on http://METRICS_HOST:METRICS_PORT/metrics
+# (0 turns the endpoint off), and one JSON line per import, post and run
+# appended to METRICS_JSON_LOG ('-' for stdout)
+METRICS_PORT = int(os.getenv('METRICS_PORT', '0'))
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_JSON_LOG = os.getenv('METRICS_JSON_LOG') or None
 
 def get_posting_interval():
     """Returns the appropriate posting interval based on the current mode"""
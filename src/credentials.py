@@ -0,0 +1,7 @@
+from dataclasses import dataclass
+
+@dataclass
+class BlueskyCredentials:
+    """Data structure for Bluesky authentication"""
+    username: str
+    password: str
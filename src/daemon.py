@@ -0,0 +1,218 @@
+import asyncio
+import importlib
+import signal
+import sqlite3
+from datetime import datetime, timedelta
+
+import schedule
+from dotenv import load_dotenv
+
+import config
+import metrics
+from archiver import Archiver
+from backends import configured_backend
+from db_setup import setup_database
+from file_watcher import watch_ready_dir
+from post_manager import PostManager, RetryPolicy
+from poster_pool import configured_pool
+from rich_text import resolve_handle
+from scheduler import PostScheduler
+from worker import AsyncPostWorker, PostWorker
+
+class Daemon:
+    """main.py's production cycle in one long-running process instead of cron.
+
+    The database connection, the logged-in clients and their rate limiters,
+    and every cache stay warm between cycles. Like main.py's loop, the daemon
+    sleeps until the next post is due (PostScheduler), working through a
+    backlog at the posting interval; with WATCH_READY_DIR, new files are
+    imported as they arrive and wake it, otherwise each cycle globs the
+    ready directory. A `schedule` scheduler runs the archiver once a day
+    when DAEMON_ARCHIVE_AT is set.
+
+    SIGHUP re-reads .env and rebuilds everything from the new settings
+    between cycles. SIGTERM and SIGINT let the post in flight finish, record
+    the batch (handing unattempted posts back to the queue) and exit.
+    """
+
+    def __init__(self):
+        self.scheduler = schedule.Scheduler()
+        self.post_manager = None
+        self.backend = None
+        self.bluesky = None
+        self.worker = None
+        self.post_scheduler = None
+        self.watcher = None
+        self.metrics_server = None
+        self.interval = 0
+        self.cycles = 0
+        self._loop = None
+        self._async_clients = False
+        self._stopping = False
+        self._reload_requested = False
+
+    def start(self) -> "Daemon":
+        """Build the pipeline from the current config and schedule its jobs"""
+        setup_database()
+        self.post_manager = PostManager(
+            db_path=config.DB_PATH,
+            ready_dir=config.READY_DIR,
+            processed_dir=config.PROCESSED_DIR,
+            journal_mode=config.SQLITE_JOURNAL_MODE,
+            retry_policy=RetryPolicy(config.RETRY_MAX_ATTEMPTS, config.RETRY_BASE_DELAY, config.RETRY_MAX_DELAY),
+            import_batch_size=config.IMPORT_BATCH_SIZE,
+            import_read_workers=config.IMPORT_READ_WORKERS,
+            near_duplicate_threshold=config.NEAR_DUPLICATE_THRESHOLD if config.DEDUP_NEAR_DUPLICATES else None,
+            handle_resolver=resolve_handle if config.RESOLVE_MENTIONS else None,
+            handle_cache_ttl=config.HANDLE_CACHE_TTL,
+            archive_dir=config.ARCHIVE_DIR
+        )
+        self.metrics_server = metrics.configured_metrics(self.post_manager.scrape_queue_status)
+        self.backend = configured_backend().start()
+        self.bluesky = configured_pool(self.backend.url)
+        self._async_clients = config.ASYNC_POSTING
+        worker_options = dict(
+            batch_size=config.POSTS_PER_RUN,
+            lease_seconds=config.CLAIM_LEASE_SECONDS,
+            heartbeat_seconds=config.WORKER_HEARTBEAT_SECONDS
+        )
+        if config.ASYNC_POSTING:
+            # One loop for the daemon's lifetime: the async clients are bound to it
+            self._loop = self._loop or asyncio.new_event_loop()
+            self.worker = AsyncPostWorker(
+                self.post_manager, self.bluesky, max_concurrent=config.MAX_CONCURRENT_POSTS, **worker_options
+            )
+        else:
+            self.worker = PostWorker(self.post_manager, self.bluesky, **worker_options)
+        self.post_scheduler = PostScheduler(self.post_manager)
+        if config.WATCH_READY_DIR:
+            self.watcher = watch_ready_dir(self.post_manager, self.post_scheduler.notify, config.WATCH_DEBOUNCE_SECONDS)
+
+        self.interval = config.get_posting_interval()
+        self.scheduler.clear()
+        if config.DAEMON_ARCHIVE_AT:
+            self.scheduler.every().day.at(config.DAEMON_ARCHIVE_AT).do(self._guarded, self.run_archiver)
+        print(f"Daemon running: {config.POSTS_PER_RUN} posts per cycle, backlogs at one cycle every {self.interval}s"
+              + (f", archiving daily at {config.DAEMON_ARCHIVE_AT}" if config.DAEMON_ARCHIVE_AT else ""))
+        return self
+
+    def shutdown(self):
+        """Close everything start() opened"""
+        if self.watcher:
+            self.watcher.stop()
+            self.watcher = None
+        if self.bluesky:
+            # Async clients belong to the loop; close them on it
+            if self._async_clients:
+                self._loop.run_until_complete(self.bluesky.aclose())
+            else:
+                self.bluesky.close()
+            self.bluesky = None
+        metrics.shutdown(self.metrics_server)
+        self.metrics_server = None
+        if self.post_manager:
+            self.post_manager.close()
+        if self.backend:
+            self.backend.stop()
+            if self.backend.summary():
+                print(self.backend.summary())
+
+    @staticmethod
+    def _guarded(job):
+        """Run a scheduled job; a failure is logged and retried next time, like a failed cron run"""
+        try:
+            job()
+        except Exception as e:
+            print(f"Daemon: {job.__name__} failed: {type(e).__name__}: {e}")
+
+    def run_cycle(self) -> int:
+        """Import new files (unless the watcher does) and publish one batch, as one cron run of main.py would"""
+        if not self.watcher:
+            imported_count = self.post_manager.import_new_files()
+            if imported_count:
+                print(f"Imported {imported_count} new posts")
+        if self._loop:
+            claimed = self._loop.run_until_complete(self.worker.run_once())
+        else:
+            claimed = self.worker.run_once()
+        self.cycles += 1
+        return claimed
+
+    def run_archiver(self):
+        """Move finished posts older than ARCHIVE_AFTER_DAYS to the monthly archives"""
+        cutoff = datetime.now() - timedelta(days=config.ARCHIVE_AFTER_DAYS)
+        with Archiver(config.DB_PATH, config.ARCHIVE_DIR) as archiver:
+            moved = archiver.archive(cutoff)
+        if moved:
+            print(f"Archived {sum(moved.values())} posts")
+
+    def reload(self):
+        """Re-read .env and rebuild the pipeline with the new settings"""
+        print("Reloading configuration")
+        load_dotenv(override=True)
+        importlib.reload(config)
+        self.shutdown()
+        self.start()
+
+    def next_wakeup(self):
+        """Seconds until the next post is due or the archiver runs (None: until woken)"""
+        try:
+            sleep = self.post_scheduler.next_sleep(self.interval, watching=self.watcher is not None)
+        except sqlite3.Error as e:
+            print(f"Daemon: could not read the queue: {e}")
+            sleep = self.interval
+        archive_in = self.scheduler.idle_seconds
+        timeouts = [max(timeout, 0) for timeout in (sleep, archive_in) if timeout is not None]
+        return min(timeouts) if timeouts else None
+
+    def stop(self):
+        """Finish the post in flight, record its batch and leave run()"""
+        self._stopping = True
+        if self.worker:
+            self.worker.stop()
+        if self.post_scheduler:
+            self.post_scheduler.wake()
+
+    def request_reload(self):
+        self._reload_requested = True
+        if self.post_scheduler:
+            self.post_scheduler.wake()
+
+    def run(self):
+        """Run cycles (the first one right away) until stop()"""
+        self.start()
+        try:
+            while not self._stopping:
+                if self._reload_requested:
+                    self._reload_requested = False
+                    self.reload()
+                self._guarded(self.run_cycle)
+                self.scheduler.run_pending()
+                if self._stopping or self._reload_requested:
+                    continue
+                # Sleep until the next post is due, the archiver's time, new
+                # files (with the watcher) or a signal
+                self.post_scheduler.wait(self.next_wakeup())
+        finally:
+            self.shutdown()
+            if self._loop:
+                self._loop.close()
+        print(f"Daemon stopped after {self.cycles} cycles")
+
+def main():
+    daemon = Daemon()
+
+    def handle_stop(signum, frame):
+        print("\nReceived shutdown signal. Finishing the post in flight...")
+        daemon.stop()
+
+    def handle_reload(signum, frame):
+        daemon.request_reload()
+
+    signal.signal(signal.SIGTERM, handle_stop)
+    signal.signal(signal.SIGINT, handle_stop)
+    signal.signal(signal.SIGHUP, handle_reload)
+    daemon.run()
+
+if __name__ == "__main__":
+    main()
@@ -1,30 +1,367 @@
 import sqlite3
-from config import DB_PATH, REQUIRED_DIRS
+# Read through the module, so a daemon's config reload reaches setup too
+import config
+from dedup import content_hash
+
+def _backfill_content_hashes(conn):
+    """Hash existing posts; later copies of the same text keep a NULL hash
+
+    Copies still waiting to be posted are retired as 'dead', so only the
+    first post with a given text goes out.
+    """
+    first_ids = {}
+    updates = []
+    duplicates = []
+    for post_id, content, status in conn.execute('SELECT id, content, status FROM posts ORDER BY id'):
+        digest = content_hash(content)
+        if digest not in first_ids:
+            first_ids[digest] = post_id
+            updates.append((digest, post_id))
+        elif status in ('ready', 'retry'):
+            duplicates.append((f"Duplicate of post {first_ids[digest]}", post_id))
+    conn.executemany('UPDATE posts SET content_hash = ? WHERE id = ?', updates)
+    conn.executemany('''
+        UPDATE posts SET status = 'dead', next_attempt_at = NULL, last_error = ? WHERE id = ?
+    ''', duplicates)
+
+# Schema migrations, applied in order. Each entry is a tuple of SQL statements
+# (or callables taking the connection, for data backfills) that runs in a
+# single transaction; PRAGMA user_version records how many have been applied,
+# so append new migrations to the end and never edit shipped ones.
+MIGRATIONS = [
+    # 1: initial posts table
+    (
+        '''
+        CREATE TABLE IF NOT EXISTS posts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            posted_at TIMESTAMP,
+            status TEXT CHECK(status IN ('ready', 'posted', 'failed')) NOT NULL DEFAULT 'ready'
+        )
+        ''',
+    ),
+    # 2: ready-queue index so dequeue is an index seek instead of scan + sort
+    (
+        'CREATE INDEX IF NOT EXISTS idx_posts_status_created_at ON posts (status, created_at)',
+    ),
+    # 3: leased claims - 'in_progress' status plus the claim owner and lease expiry
+    (
+        '''
+        CREATE TABLE posts_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            posted_at TIMESTAMP,
+            status TEXT CHECK(status IN ('ready', 'in_progress', 'posted', 'failed')) NOT NULL DEFAULT 'ready',
+            claimed_by TEXT,
+            lease_expires_at TIMESTAMP
+        )
+        ''',
+        '''
+        INSERT INTO posts_new (id, content, created_at, posted_at, status)
+        SELECT id, content, created_at, posted_at, status FROM posts
+        ''',
+        'DROP TABLE posts',
+        'ALTER TABLE posts_new RENAME TO posts',
+        'CREATE INDEX idx_posts_status_created_at ON posts (status, created_at)',
+    ),
+    # 4: posts sharing a sequence_key are published strictly one after another
+    (
+        'ALTER TABLE posts ADD COLUMN sequence_key TEXT',
+    ),
+    # 5: automatic retries - 'retry' and dead-letter 'dead' statuses, attempt
+    # bookkeeping, and an index so due retries are found without scanning
+    # the ones still backing off
+    (
+        '''
+        CREATE TABLE posts_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            posted_at TIMESTAMP,
+            status TEXT CHECK(status IN ('ready', 'in_progress', 'retry', 'posted', 'failed', 'dead')) NOT NULL DEFAULT 'ready',
+            claimed_by TEXT,
+            lease_expires_at TIMESTAMP,
+            sequence_key TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP,
+            last_error TEXT
+        )
+        ''',
+        '''
+        INSERT INTO posts_new (id, content, created_at, posted_at, status, claimed_by, lease_expires_at, sequence_key)
+        SELECT id, content, created_at, posted_at, status, claimed_by, lease_expires_at, sequence_key FROM posts
+        ''',
+        'DROP TABLE posts',
+        'ALTER TABLE posts_new RENAME TO posts',
+        'CREATE INDEX idx_posts_status_created_at ON posts (status, created_at)',
+        'CREATE INDEX idx_posts_status_next_attempt_at ON posts (status, next_attempt_at)',
+    ),
+    # 6: chunks of files whose posts are committed but which may not have been
+    # moved out of the ready directory yet (crash recovery for bulk imports)
+    (
+        'CREATE TABLE IF NOT EXISTS import_journal (id INTEGER PRIMARY KEY, filenames TEXT NOT NULL)',
+    ),
+    # 7: exact-duplicate detection - hash of the normalized text, unique so
+    # imports can skip content that was already queued or posted
+    (
+        'ALTER TABLE posts ADD COLUMN content_hash TEXT',
+        _backfill_content_hashes,
+        '''
+        CREATE UNIQUE INDEX idx_posts_content_hash ON posts (content_hash)
+        WHERE content_hash IS NOT NULL
+        ''',
+    ),
+    # 8: near-duplicate detection - MinHash signatures and their LSH buckets
+    (
+        '''
+        CREATE TABLE post_minhash (
+            post_id INTEGER PRIMARY KEY REFERENCES posts (id) ON DELETE CASCADE,
+            signature BLOB NOT NULL
+        )
+        ''',
+        '''
+        CREATE TABLE post_minhash_bands (
+            band INTEGER NOT NULL,
+            bucket INTEGER NOT NULL,
+            post_id INTEGER NOT NULL,
+            PRIMARY KEY (band, bucket, post_id)
+        ) WITHOUT ROWID
+        ''',
+    ),
+    # 9: scheduling - posts become claimable at scheduled_for (defaulting to
+    # created_at), highest priority first
+    (
+        'ALTER TABLE posts ADD COLUMN scheduled_for TIMESTAMP',
+        'ALTER TABLE posts ADD COLUMN priority INTEGER NOT NULL DEFAULT 0',
+        'UPDATE posts SET scheduled_for = created_at',
+        '''
+        CREATE TRIGGER posts_default_scheduled_for AFTER INSERT ON posts
+        WHEN NEW.scheduled_for IS NULL
+        BEGIN
+            UPDATE posts SET scheduled_for = NEW.created_at WHERE id = NEW.id;
+        END
+        ''',
+        # Next-due lookups for the scheduler
+        'CREATE INDEX idx_posts_status_scheduled_for_priority ON posts (status, scheduled_for, priority DESC)',
+        # Claim order: walks each priority level oldest-due first and stops at the batch size
+        'CREATE INDEX idx_posts_status_priority_scheduled_for ON posts (status, priority DESC, scheduled_for)',
+    ),
+    # 10: pre-rendered app.bsky.feed.post records (text, facets, langs) built
+    # at import, and a TTL cache of mention handle -> DID lookups
+    (
+        'ALTER TABLE posts ADD COLUMN record TEXT',
+        '''
+        CREATE TABLE handle_dids (
+            handle TEXT PRIMARY KEY,
+            did TEXT,
+            resolved_at TIMESTAMP NOT NULL
+        )
+        ''',
+    ),
+    # 11: threads - long posts are split into parts that reply to each other.
+    # Parts after the first wait as 'pending' until claimed with their thread,
+    # and posted rows keep their uri/cid so later parts can reference them.
+    (
+        '''
+        CREATE TABLE posts_new (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            content TEXT NOT NULL,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+            posted_at TIMESTAMP,
+            status TEXT CHECK(status IN ('ready', 'pending', 'in_progress', 'retry', 'posted', 'failed', 'dead')) NOT NULL DEFAULT 'ready',
+            claimed_by TEXT,
+            lease_expires_at TIMESTAMP,
+            sequence_key TEXT,
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at TIMESTAMP,
+            last_error TEXT,
+            content_hash TEXT,
+            scheduled_for TIMESTAMP,
+            priority INTEGER NOT NULL DEFAULT 0,
+            record TEXT,
+            thread_root_id INTEGER REFERENCES posts_new (id),
+            thread_position INTEGER NOT NULL DEFAULT 0,
+            uri TEXT,
+            cid TEXT
+        )
+        ''',
+        '''
+        INSERT INTO posts_new (id, content, created_at, posted_at, status, claimed_by, lease_expires_at,
+                               sequence_key, attempts, next_attempt_at, last_error, content_hash,
+                               scheduled_for, priority, record)
+        SELECT id, content, created_at, posted_at, status, claimed_by, lease_expires_at,
+               sequence_key, attempts, next_attempt_at, last_error, content_hash,
+               scheduled_for, priority, record
+        FROM posts
+        ''',
+        'DROP TABLE posts',
+        'ALTER TABLE posts_new RENAME TO posts',
+        'CREATE INDEX idx_posts_status_created_at ON posts (status, created_at)',
+        'CREATE INDEX idx_posts_status_next_attempt_at ON posts (status, next_attempt_at)',
+        'CREATE UNIQUE INDEX idx_posts_content_hash ON posts (content_hash) WHERE content_hash IS NOT NULL',
+        'CREATE INDEX idx_posts_status_scheduled_for_priority ON posts (status, scheduled_for, priority DESC)',
+        'CREATE INDEX idx_posts_status_priority_scheduled_for ON posts (status, priority DESC, scheduled_for)',
+        '''
+        CREATE INDEX idx_posts_thread ON posts (thread_root_id, thread_position)
+        WHERE thread_root_id IS NOT NULL
+        ''',
+        '''
+        CREATE TRIGGER posts_default_scheduled_for AFTER INSERT ON posts
+        WHEN NEW.scheduled_for IS NULL
+        BEGIN
+            UPDATE posts SET scheduled_for = NEW.created_at WHERE id = NEW.id;
+        END
+        ''',
+    ),
+    # 12: images embedded in a post, as a JSON list of [path, alt text]
+    (
+        'ALTER TABLE posts ADD COLUMN images TEXT',
+    ),
+    # 13: several Bluesky accounts posting from one queue; posts without an
+    # account go out on the default (BLUESKY_USERNAME) account
+    (
+        '''
+        CREATE TABLE accounts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            username TEXT NOT NULL UNIQUE,
+            created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+        ''',
+        'ALTER TABLE posts ADD COLUMN account_id INTEGER REFERENCES accounts (id)',
+    ),
+    # 14: per-status post counts kept current by triggers, so queue status is
+    # a read of a few rows instead of a GROUP BY over the whole history
+    (
+        '''
+        CREATE TABLE queue_stats (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+        ''',
+        'INSERT INTO queue_stats (status, count) SELECT status, COUNT(*) FROM posts GROUP BY status',
+        '''
+        CREATE TRIGGER queue_stats_insert AFTER INSERT ON posts
+        BEGIN
+            INSERT INTO queue_stats (status, count) VALUES (NEW.status, 1)
+            ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+        '''
+        CREATE TRIGGER queue_stats_delete AFTER DELETE ON posts
+        BEGIN
+            UPDATE queue_stats SET count = count - 1 WHERE status = OLD.status;
+        END
+        ''',
+        '''
+        CREATE TRIGGER queue_stats_update AFTER UPDATE OF status ON posts
+        WHEN OLD.status IS NOT NEW.status
+        BEGIN
+            UPDATE queue_stats SET count = count - 1 WHERE status = OLD.status;
+            INSERT INTO queue_stats (status, count) VALUES (NEW.status, 1)
+            ON CONFLICT (status) DO UPDATE SET count = count + 1;
+        END
+        ''',
+    ),
+    # 15: content hashes of posts moved to the monthly archive databases, as
+    # 60-bit keys, so imports can skip duplicates without opening archives
+    (
+        '''
+        CREATE TABLE archive_index (
+            hash_key INTEGER NOT NULL,
+            month TEXT NOT NULL,
+            PRIMARY KEY (hash_key, month)
+        ) WITHOUT ROWID
+        ''',
+    ),
+    # 16: how far into each bundle file in the ready directory an import has
+    # committed, so an interrupted import resumes there
+    (
+        '''
+        CREATE TABLE import_bundles (
+            name TEXT PRIMARY KEY,
+            resume_offset INTEGER NOT NULL
+        )
+        ''',
+    ),
+    # 17: later thread parts were indexed as near-duplicate candidates of
+    # their own; only whole posts (thread roots) belong in the index
+    (
+        '''
+        DELETE FROM post_minhash_bands
+        WHERE post_id IN (SELECT id FROM posts WHERE thread_root_id IS NOT NULL)
+        ''',
+        '''
+        DELETE FROM post_minhash
+        WHERE post_id IN (SELECT id FROM posts WHERE thread_root_id IS NOT NULL)
+        ''',
+    ),
+    # 18: the ready queue has been ordered by scheduled_for since migration 9,
+    # so nothing reads (status, created_at) any more
+    (
+        'DROP INDEX IF EXISTS idx_posts_status_created_at',
+    ),
+    # 19: claims check each sequenced candidate for an unfinished earlier
+    # post of its sequence
+    (
+        'CREATE INDEX idx_posts_sequence_key ON posts (sequence_key, status) WHERE sequence_key IS NOT NULL',
+    ),
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
 
 def setup_directories():
     """Create all required directories if they don't exist"""
-    for directory in REQUIRED_DIRS:
+    for directory in config.REQUIRED_DIRS:
         directory.mkdir(parents=True, exist_ok=True)
         print(f"Ensured directory exists: {directory}")
 
-def setup_database():
-    """Initialize the SQLite database with required schema"""
-    setup_directories()
+def get_schema_version(conn) -> int:
+    """Return the number of migrations applied to the database"""
+    return conn.execute('PRAGMA user_version').fetchone()[0]
 
-    conn = sqlite3.connect(DB_PATH)
-    cursor = conn.cursor()
+def migrate(conn) -> int:
+    """Apply pending migrations idempotently, returning how many were applied"""
+    if get_schema_version(conn) >= SCHEMA_VERSION:
+        return 0
 
-    cursor.execute('''
-    CREATE TABLE IF NOT EXISTS posts (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        content TEXT NOT NULL,
-        created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
-        posted_at TIMESTAMP,
-        status TEXT CHECK(status IN ('ready', 'posted', 'failed')) NOT NULL DEFAULT 'ready'
-    )
-    ''')
+    applied = 0
+    isolation_level = conn.isolation_level
+    conn.isolation_level = None  # transactions are managed explicitly below
+    try:
+        for version, statements in enumerate(MIGRATIONS, start=1):
+            # BEGIN IMMEDIATE serializes concurrent starters; re-check the
+            # version under the lock so each migration runs exactly once
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                if get_schema_version(conn) >= version:
+                    conn.execute('ROLLBACK')
+                    continue
+                for statement in statements:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+                conn.execute(f'PRAGMA user_version = {version}')
+                conn.execute('COMMIT')
+            except Exception:
+                conn.execute('ROLLBACK')
+                raise
+            applied += 1
+            print(f"Applied database migration {version}")
+    finally:
+        conn.isolation_level = isolation_level
+    return applied
 
-    conn.commit()
-    conn.close()
-    print(f"Database setup complete at: {DB_PATH}")
+def setup_database(db_path=None):
+    """Initialize the SQLite database (DB_PATH by default) and bring its schema up to date"""
+    db_path = db_path or config.DB_PATH
+    setup_directories()
 
+    conn = sqlite3.connect(db_path)
+    try:
+        migrate(conn)
+    finally:
+        conn.close()
+    print(f"Database setup complete at: {db_path}")
@@ -0,0 +1,232 @@
+"""In-process stand-in for a Bluesky PDS, for load tests and benchmarks.
+
+Serves just enough XRPC for atproto's Client/AsyncClient to log in, upload
+blobs and create posts, so posters pointed at it run their whole real code
+path (sessions, serialization, rate-limit headers) without touching Bluesky.
+Every created record is kept in `records`.
+
+Each createRecord and uploadBlob sleeps `latency` seconds (plus up to
+`jitter` more) to simulate the network round trip. A fraction `error_rate`
+of createRecord calls fail with a 502, as an overloaded PDS would. With
+`rate_limit` set, createRecord is limited to that many write points per
+`window` seconds, charging CREATE_RECORD_POINTS per record (fixed windows,
+like the real PDS); its answers carry ratelimit-* headers and excess calls
+get a 429. Each request is handled on its own thread.
+"""
+import math
+import base64
+import hashlib
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from rate_limiter import CREATE_RECORD_POINTS
+
+
+def _jwt(payload):
+    """An unsigned JWT; the client only decodes the payload for its expiry"""
+    def encode(part):
+        return base64.urlsafe_b64encode(json.dumps(part).encode()).rstrip(b"=").decode()
+    return f"{encode({'alg': 'none', 'typ': 'JWT'})}.{encode(payload)}.sig"
+
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+    request_queue_size = 256
+
+
+class FakePDS:
+    def __init__(self, latency=0.2, rate_limit=None, window=5, session_latency=0.0, error_rate=0.0, jitter=0.0,
+                 seed=None, host="127.0.0.1", port=0):
+        self.latency = latency
+        self.jitter = jitter
+        self.session_latency = session_latency
+        self.sessions_created = 0
+        self.rate_limit = rate_limit
+        self.window = window
+        self.error_rate = error_rate
+        self.records = []
+        self.blobs_uploaded = 0
+        self.blob_bytes = 0
+        self.rejected = 0
+        self.errors = 0
+        self._random = random.Random(seed)
+        self._window_start = 0.0
+        self._window_used = 0
+        self._lock = threading.Lock()
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self):
+        """Serve on a background thread; returns self"""
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def summary(self) -> str:
+        return (f"fake PDS: {len(self.records)} records, {self.blobs_uploaded} blobs, "
+                f"{self.errors} injected errors, {self.rejected} rate limited")
+
+    def _delay(self):
+        time.sleep(self.latency + (self._random.uniform(0, self.jitter) if self.jitter else 0))
+
+    def create_session(self, body):
+        time.sleep(self.session_latency)
+        with self._lock:
+            self.sessions_created += 1
+        return 200, self._session(body.get("identifier", "bench.test"))
+
+    def _session(self, handle):
+        did = f"did:plc:{handle.replace('.', '')[:24]}"
+        now = int(time.time())
+        return {
+            "accessJwt": _jwt({"scope": "com.atproto.access", "sub": did, "handle": handle, "iat": now, "exp": now + 7200}),
+            "refreshJwt": _jwt({"scope": "com.atproto.refresh", "sub": did, "handle": handle, "iat": now, "exp": now + 86400}),
+            "handle": handle,
+            "did": did,
+        }
+
+    def get_session(self, authorization):
+        """Echo back the account of the bearer token"""
+        payload = authorization.split(".")[1] if authorization.count(".") == 2 else ""
+        try:
+            claims = json.loads(base64.urlsafe_b64decode(payload + "=" * (-len(payload) % 4)))
+            account = {"did": claims["sub"], "handle": claims["handle"]}
+        except (ValueError, KeyError):
+            return 401, {"error": "InvalidToken", "message": "Token could not be verified"}
+        return 200, account
+
+    def refresh_session(self, authorization):
+        status, account = self.get_session(authorization)
+        if status != 200:
+            return status, account
+        return 200, self._session(account["handle"])
+
+    def get_profile(self, params):
+        actor = params.get("actor", "bench.test")
+        return 200, {"did": f"did:plc:{actor.replace('.', '')[:24]}", "handle": actor}
+
+    def _take_rate_limit(self, points):
+        """Charge points against the current window; returns (allowed, headers)"""
+        if self.rate_limit is None:
+            return True, {}
+        with self._lock:
+            now = time.time()
+            if now >= self._window_start + self.window:
+                self._window_start = math.floor(now / self.window) * self.window
+                self._window_used = 0
+            allowed = self._window_used + points <= self.rate_limit
+            if allowed:
+                self._window_used += points
+            else:
+                self.rejected += 1
+            headers = {
+                "ratelimit-limit": str(self.rate_limit),
+                "ratelimit-remaining": str(self.rate_limit - self._window_used),
+                "ratelimit-reset": str(math.ceil(self._window_start + self.window)),
+                "ratelimit-policy": f"{self.rate_limit};w={self.window}",
+            }
+        return allowed, headers
+
+    def create_record(self, body):
+        self._delay()
+        allowed, headers = self._take_rate_limit(CREATE_RECORD_POINTS)
+        if not allowed:
+            return 429, {"error": "RateLimitExceeded", "message": "Rate Limit Exceeded"}, headers
+        with self._lock:
+            if self.error_rate and self._random.random() < self.error_rate:
+                self.errors += 1
+                return 502, {"error": "UpstreamFailure", "message": "Injected failure"}, headers
+            self.records.append(body)
+            rkey = f"3k{len(self.records):011d}"
+        return 200, {
+            "uri": f"at://{body.get('repo')}/{body.get('collection')}/{rkey}",
+            "cid": "bafyreie5737gdxlw5i64vzichcalba3z2v5n6icifvx5xytvske7mr3hpm",
+        }, headers
+
+    def upload_blob(self, stream, length, mime_type):
+        """Read the blob in chunks, as a PDS would stream it to storage"""
+        self._delay()
+        digest = hashlib.sha256()
+        remaining = length
+        while remaining:
+            chunk = stream.read(min(remaining, 65536))
+            if not chunk:
+                break
+            digest.update(chunk)
+            remaining -= len(chunk)
+        with self._lock:
+            self.blobs_uploaded += 1
+            self.blob_bytes += length - remaining
+        return 200, {"blob": {
+            "$type": "blob",
+            "ref": {"$link": f"bafkrei{digest.hexdigest()[:52]}"},
+            "mimeType": mime_type,
+            "size": length - remaining,
+        }}
+
+    def _handler_class(self):
+        pds = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # Headers and body go out in separate writes; without TCP_NODELAY
+            # each keep-alive response stalls ~40 ms on delayed ACKs
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def _reply(self, status, payload, headers=None):
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                path, _, query = self.path.partition("?")
+                params = dict(pair.split("=", 1) for pair in query.split("&") if "=" in pair)
+                if path == "/xrpc/app.bsky.actor.getProfile":
+                    self._reply(*pds.get_profile(params))
+                elif path == "/xrpc/com.atproto.server.getSession":
+                    self._reply(*pds.get_session(self.headers.get("Authorization", "")))
+                else:
+                    self._reply(404, {"error": "MethodNotImplemented", "message": path})
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if self.path == "/xrpc/com.atproto.repo.uploadBlob":
+                    self._reply(*pds.upload_blob(self.rfile, length, self.headers.get("Content-Type")))
+                    return
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if self.path == "/xrpc/com.atproto.server.createSession":
+                    self._reply(*pds.create_session(body))
+                elif self.path == "/xrpc/com.atproto.server.refreshSession":
+                    self._reply(*pds.refresh_session(self.headers.get("Authorization", "")))
+                elif self.path == "/xrpc/com.atproto.repo.createRecord":
+                    self._reply(*pds.create_record(body))
+                else:
+                    self._reply(404, {"error": "MethodNotImplemented", "message": self.path})
+
+        return Handler
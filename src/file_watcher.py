@@ -0,0 +1,234 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from bundles import READY_SUFFIXES
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_Q_OVERFLOW = 0x00004000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC
+_EVENT_HEADER = struct.Struct("iIII")
+
+def _load_inotify():
+    """Return libc if it provides inotify, otherwise None"""
+    if not sys.platform.startswith("linux"):
+        return None
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+        libc.inotify_init1
+        libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    return libc
+
+class ReadyDirWatcher:
+    """Feeds files that land in the ready directory to a callback as they arrive.
+
+    On Linux the directory is watched with inotify for files that are closed
+    after writing or moved in; elsewhere (or if inotify is unavailable) it
+    falls back to polling. Either way a file is only handed over once it has
+    been quiet for `debounce` seconds, so partially written files are not
+    imported. Files already present at start are reported on the first pass.
+    The callback runs on the watcher thread with a list of paths.
+    """
+
+    def __init__(self, directory: Path, callback: Callable[[List[Path]], None],
+                 suffix: Union[str, Tuple[str, ...]] = ".md", debounce: float = 0.5, poll_interval: float = 2.0,
+                 use_inotify: Optional[bool] = None):
+        self.directory = directory
+        self.callback = callback
+        self.suffix = suffix
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self._libc = _load_inotify() if use_inotify is not False else None
+        if use_inotify and not self._libc:
+            raise OSError("inotify is not available on this platform")
+        self._stop_event = threading.Event()
+        self._thread = None
+        # name -> time of the last write activity seen for it
+        self._pending: Dict[str, float] = {}
+        # name -> (size, mtime) of files handed over that were left in the
+        # directory (e.g. invalid front matter); skipped until they change
+        self._failed: Dict[str, Tuple[int, float]] = {}
+
+    @property
+    def mode(self) -> str:
+        return "inotify" if self._libc else "polling"
+
+    def start(self):
+        """Start watching on a background thread"""
+        target = self._run_inotify if self._libc else self._run_polling
+        self._thread = threading.Thread(target=target, name="ready-dir-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop watching and wait for the watcher thread to exit"""
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        self.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.stop()
+
+    def _matches(self, name: str) -> bool:
+        return name.endswith(self.suffix) and not name.startswith(".")
+
+    def _scan(self):
+        """Mark every matching file currently in the directory as pending, except unchanged failures"""
+        now = time.monotonic()
+        seen = set()
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if self._matches(entry.name) and entry.is_file():
+                    seen.add(entry.name)
+                    failed = self._failed.get(entry.name)
+                    if failed is not None:
+                        stat = entry.stat()
+                        if (stat.st_size, stat.st_mtime) == failed:
+                            continue
+                        del self._failed[entry.name]
+                    self._pending.setdefault(entry.name, now)
+        for name in self._failed.keys() - seen:
+            del self._failed[name]
+
+    def _flush(self, now: float, settled: Callable[[str], bool] = lambda name: True) -> Optional[float]:
+        """Hand over files quiet for `debounce` seconds
+
+        Returns how long until the next pending file settles, or None.
+        """
+        ready = []
+        next_due = None
+        for name, last_activity in list(self._pending.items()):
+            due_in = last_activity + self.debounce - now
+            if due_in <= 0 and settled(name):
+                del self._pending[name]
+                ready.append(self.directory / name)
+            else:
+                next_due = max(due_in, 0.05) if next_due is None else min(next_due, max(due_in, 0.05))
+        if ready:
+            ready.sort()
+            try:
+                self.callback(ready)
+            except Exception as e:
+                # Retried on the next scan
+                print(f"Ready directory watcher: import failed: {e}")
+            else:
+                self._remember_failures(ready)
+        return next_due
+
+    def _remember_failures(self, handed_over: List[Path]):
+        """Note the files the callback left behind, so scans do not retry them every poll"""
+        for path in handed_over:
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                self._failed.pop(path.name, None)
+                continue
+            self._failed[path.name] = (stat.st_size, stat.st_mtime)
+
+    def _run_inotify(self):
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        try:
+            mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_MODIFY
+            if self._libc.inotify_add_watch(fd, os.fsencode(self.directory), mask) < 0:
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {self.directory}")
+            # Anything written before the watch existed
+            self._scan()
+            while not self._stop_event.is_set():
+                timeout = self._flush(time.monotonic())
+                # Wake at least once a second to notice stop()
+                readable, _, _ = select.select([fd], [], [], min(timeout or 1.0, 1.0))
+                if readable:
+                    self._read_events(fd)
+        finally:
+            os.close(fd)
+
+    def _read_events(self, fd: int):
+        try:
+            data = os.read(fd, 64 * 1024)
+        except BlockingIOError:
+            return
+        now = time.monotonic()
+        offset = 0
+        while offset < len(data):
+            _, event_mask, _, name_length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + name_length].rstrip(b"\0").decode(errors="surrogateescape")
+            offset += name_length
+            if event_mask & IN_Q_OVERFLOW:
+                # Events were dropped; fall back to a full scan
+                self._scan()
+            elif event_mask & (IN_CLOSE_WRITE | IN_MOVED_TO):
+                if self._matches(name):
+                    # Rewritten, so worth another try even if it failed before
+                    self._failed.pop(name, None)
+                    self._pending[name] = now
+            elif event_mask & IN_MODIFY and name in self._pending:
+                # Still being written; restart its debounce window
+                self._pending[name] = now
+
+    def _run_polling(self):
+        sizes: Dict[str, Tuple[int, float]] = {}
+
+        def settled(name: str) -> bool:
+            """A file is settled once its size and mtime stop changing"""
+            try:
+                stat = (self.directory / name).stat()
+            except FileNotFoundError:
+                self._pending.pop(name, None)
+                sizes.pop(name, None)
+                return False
+            current = (stat.st_size, stat.st_mtime)
+            previous = sizes.get(name)
+            sizes[name] = current
+            if previous != current:
+                self._pending[name] = time.monotonic()
+                return False
+            del sizes[name]
+            return True
+
+        next_scan = 0.0
+        while not self._stop_event.is_set():
+            now = time.monotonic()
+            # Listing a large directory is the expensive part; between scans
+            # only the pending files are re-checked
+            if now >= next_scan:
+                self._scan()
+                next_scan = now + self.poll_interval
+            timeout = self._flush(now, settled)
+            wait = next_scan - now
+            self._stop_event.wait(min(timeout, wait) if timeout else wait)
+
+def watch_ready_dir(post_manager, on_import: Callable[[], None], debounce: float) -> ReadyDirWatcher:
+    """Start importing files into post_manager as soon as they land in its ready directory
+
+    on_import runs (on the watcher thread) after files produced new posts,
+    e.g. to wake a run loop sleeping until the next post is due.
+    """
+    def import_arrivals(files):
+        imported_count = post_manager.import_files(files)
+        if imported_count:
+            print(f"Imported {imported_count} new posts")
+            on_import()
+
+    watcher = ReadyDirWatcher(post_manager.ready_dir, import_arrivals, suffix=READY_SUFFIXES, debounce=debounce)
+    watcher.start()
+    print(f"Watching {post_manager.ready_dir} for new posts ({watcher.mode})")
+    return watcher
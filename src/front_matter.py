@@ -0,0 +1,75 @@
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import yaml
+
+DELIMITER = "---"
+# libyaml's loader is several times faster when PyYAML was built with it
+_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+
+def split_front_matter(text: str) -> Tuple[Dict[str, Any], str]:
+    """Split a leading `---` YAML block from a markdown post
+
+    Returns the fields and the remaining body. Only a closed block holding a
+    YAML mapping counts as front matter; anything else (such as a post that
+    opens with a markdown horizontal rule) is returned unchanged with no
+    fields.
+    """
+    if not text.startswith(DELIMITER):
+        return {}, text
+    lines = text.splitlines(keepends=True)
+    if lines[0].strip() != DELIMITER:
+        return {}, text
+    for index, line in enumerate(lines[1:], start=1):
+        if line.strip() == DELIMITER:
+            try:
+                fields = yaml.load("".join(lines[1:index]), Loader=_LOADER)
+            except yaml.YAMLError:
+                return {}, text
+            if fields is None:
+                fields = {}
+            if not isinstance(fields, dict):
+                return {}, text
+            return {str(key).lower(): value for key, value in fields.items()}, "".join(lines[index + 1:])
+    return {}, text
+
+def parse_timestamp(value) -> datetime:
+    """ISO 8601 date or datetime, as naive local time like the rest of the queue"""
+    if isinstance(value, datetime):
+        timestamp = value
+    elif isinstance(value, date):
+        timestamp = datetime(value.year, value.month, value.day)
+    else:
+        value = str(value)
+        if value.endswith(("Z", "z")):
+            value = value[:-1] + "+00:00"
+        timestamp = datetime.fromisoformat(value)
+    if timestamp.tzinfo is not None:
+        timestamp = timestamp.astimezone().replace(tzinfo=None)
+    return timestamp
+
+def scheduling_fields(fields: Dict[str, Any]) -> Tuple[Optional[datetime], int, Optional[str]]:
+    """(scheduled_for, priority, sequence_key) from parsed front matter"""
+    scheduled_for = parse_timestamp(fields["scheduled_for"]) if fields.get("scheduled_for") else None
+    try:
+        priority = int(fields.get("priority") or 0)
+    except (TypeError, ValueError):
+        raise ValueError(f"priority must be an integer, not {fields['priority']!r}") from None
+    sequence = fields.get("sequence")
+    return scheduled_for, priority, str(sequence) if sequence not in (None, "") else None
+
+def account_field(fields: Dict[str, Any]) -> Optional[str]:
+    """Handle of the account to post from, or None for the default account"""
+    account = fields.get("account")
+    if not account:
+        return None
+    return str(account).strip().lstrip("@").lower()
+
+def language_tags(fields: Dict[str, Any]) -> List[str]:
+    """`langs` (or `lang`) as a list of BCP 47 tags"""
+    langs = fields.get("langs", fields.get("lang"))
+    if not langs:
+        return []
+    if isinstance(langs, str):
+        langs = langs.replace(",", " ").split()
+    return [str(lang) for lang in langs]
@@ -0,0 +1,38 @@
+import os
+import sqlite3
+from datetime import datetime
+from pathlib import Path
+
+from bundles import READY_SUFFIXES
+from db_setup import SCHEMA_VERSION
+
+def has_ready_files(ready_dir: Path) -> bool:
+    """Whether ready_dir holds at least one post or bundle file, stopping at the first"""
+    with os.scandir(ready_dir) as entries:
+        return any(entry.name.endswith(READY_SUFFIXES) and entry.is_file() for entry in entries)
+
+def is_idle(db_path: Path, ready_dir: Path) -> bool:
+    """Whether a one-shot run would find nothing to do
+
+    Checked before main.py loads the Bluesky client or touches the schema: no
+    file waiting in ready_dir, no interrupted import to recover, and no ready
+    post, retry or expired lease due yet. A missing or outdated database or
+    ready directory is work too, since setup_database has to run.
+    """
+    if not db_path.exists() or not ready_dir.is_dir() or has_ready_files(ready_dir):
+        return False
+    conn = sqlite3.connect(f"{db_path.as_uri()}?mode=ro", uri=True)
+    try:
+        if conn.execute('PRAGMA user_version').fetchone()[0] < SCHEMA_VERSION:
+            return False
+        now = datetime.now()
+        # Each probe is a seek on one of the queue indexes
+        due = conn.execute('''
+            SELECT EXISTS (SELECT 1 FROM import_journal)
+                OR EXISTS (SELECT 1 FROM posts WHERE status = 'ready' AND scheduled_for <= ?)
+                OR EXISTS (SELECT 1 FROM posts WHERE status = 'retry' AND next_attempt_at <= ?)
+                OR EXISTS (SELECT 1 FROM posts WHERE status = 'in_progress' AND lease_expires_at < ?)
+        ''', (now, now, now)).fetchone()[0]
+        return not due
+    finally:
+        conn.close()
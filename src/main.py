@@ -1,80 +1,147 @@
 import signal
 import sys
-import time
 from datetime import datetime
-from post_manager import PostManager
-from bluesky_poster import BlueskyPoster, BlueskyCredentials
-from db_setup import setup_database
+from idle import is_idle
 from config import (
-    DB_PATH, READY_DIR, PROCESSED_DIR,
-    BLUESKY_USERNAME, BLUESKY_PASSWORD,
-    TEST_MODE, get_posting_interval, POSTS_PER_RUN
+    DB_PATH, READY_DIR, PROCESSED_DIR, ARCHIVE_DIR,
+    TEST_MODE, get_posting_interval, POSTS_PER_RUN, CLAIM_LEASE_SECONDS,
+    WORKER_HEARTBEAT_SECONDS, SQLITE_JOURNAL_MODE,
+    ASYNC_POSTING, MAX_CONCURRENT_POSTS,
+    RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY,
+    WATCH_READY_DIR, WATCH_DEBOUNCE_SECONDS, IMPORT_BATCH_SIZE, IMPORT_READ_WORKERS,
+    DEDUP_NEAR_DUPLICATES, NEAR_DUPLICATE_THRESHOLD, RESOLVE_MENTIONS, HANDLE_CACHE_TTL
 )
 
-def signal_handler(signum, frame):
-    """Handle shutdown signals gracefully"""
-    print("\nReceived shutdown signal. Finishing current tasks...")
-    sys.exit(0)
-
 def main():
-    # Set up signal handlers for graceful shutdown
-    signal.signal(signal.SIGINT, signal_handler)
-    signal.signal(signal.SIGTERM, signal_handler)
+    # Imported here so an idle run never loads them; see the __main__ block
+    import asyncio
+    import metrics
+    from backends import configured_backend
+    from db_setup import setup_database
+    from file_watcher import watch_ready_dir
+    from post_manager import PostManager, RetryPolicy
+    from poster_pool import configured_pool
+    from rich_text import resolve_handle
+    from scheduler import PostScheduler
+    from worker import AsyncPostWorker, PostWorker
+
     # Initialize the database and required directories
     setup_database()
     # Initialize the post manager and poster
     post_manager = PostManager(
         db_path=DB_PATH,
         ready_dir=READY_DIR,
-        processed_dir=PROCESSED_DIR
-    )
-    bluesky = BlueskyPoster(
-        credentials=BlueskyCredentials(
-            username=BLUESKY_USERNAME,
-            password=BLUESKY_PASSWORD
-        ),
-        test_mode=TEST_MODE
+        processed_dir=PROCESSED_DIR,
+        journal_mode=SQLITE_JOURNAL_MODE,
+        retry_policy=RetryPolicy(RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY),
+        import_batch_size=IMPORT_BATCH_SIZE,
+        import_read_workers=IMPORT_READ_WORKERS,
+        near_duplicate_threshold=NEAR_DUPLICATE_THRESHOLD if DEDUP_NEAR_DUPLICATES else None,
+        handle_resolver=resolve_handle if RESOLVE_MENTIONS else None,
+        handle_cache_ttl=HANDLE_CACHE_TTL,
+        archive_dir=ARCHIVE_DIR
     )
+    # Prometheus endpoint and JSON event log, when configured
+    metrics_server = metrics.configured_metrics(post_manager.scrape_queue_status)
+    # Bluesky itself, or a fake PDS for offline load tests
+    backend = configured_backend().start()
+    # One authenticated client and rate limiter per account
+    bluesky = configured_pool(backend.url)
     # Get the appropriate posting interval
     posting_interval = get_posting_interval()
     print("\nBluesky Poster System Starting")
     print(f"Mode: {'TEST' if TEST_MODE else 'PRODUCTION'}")
     print(f"Posting Interval: {posting_interval} seconds")
     print(f"Posts Per Run: {POSTS_PER_RUN}")
+    if len(bluesky) > 1:
+        print(f"Accounts: {len(bluesky)}")
+    if ASYNC_POSTING:
+        print(f"Concurrent Posts: {MAX_CONCURRENT_POSTS}")
     print("-" * 50)
 
-    while TEST_MODE:  # Only loop if in test mode
+    worker_options = dict(
+        batch_size=POSTS_PER_RUN,
+        lease_seconds=CLAIM_LEASE_SECONDS,
+        heartbeat_seconds=WORKER_HEARTBEAT_SECONDS
+    )
+    # When this run loops (test mode; daemon.py is the production loop),
+    # import files as they arrive instead of globbing the ready directory
+    # every cycle. Wake the loop in case a new post is due before its next
+    # wakeup.
+    scheduler = PostScheduler(post_manager)
+    watcher = None
+    if TEST_MODE and WATCH_READY_DIR:
+        watcher = watch_ready_dir(post_manager, scheduler.notify, WATCH_DEBOUNCE_SECONDS)
+    if ASYNC_POSTING:
+        worker = AsyncPostWorker(post_manager, bluesky, max_concurrent=MAX_CONCURRENT_POSTS, **worker_options)
+    else:
+        worker = PostWorker(post_manager, bluesky, **worker_options)
+
+    def signal_handler(signum, frame):
+        """Handle shutdown signals gracefully: finish the post in flight and record the batch"""
+        print("\nReceived shutdown signal. Finishing current tasks...")
+        worker.stop()
+        scheduler.wake()
+
+    signal.signal(signal.SIGINT, signal_handler)
+    signal.signal(signal.SIGTERM, signal_handler)
+    try:
+        if ASYNC_POSTING:
+            asyncio.run(run_loop_async(post_manager, worker, scheduler, posting_interval, watcher))
+        else:
+            run_loop(post_manager, worker, scheduler, posting_interval, watcher)
+    finally:
+        if watcher:
+            watcher.stop()
+        metrics.shutdown(metrics_server)
+        post_manager.close()
+        backend.stop()
+        if backend.summary():
+            print(backend.summary())
+
+def run_loop(post_manager, worker, scheduler, posting_interval, watcher=None):
+    while TEST_MODE and not worker.stopping:  # Only loop if in test mode
+        # Import new posts, unless the watcher is already doing it
+        if not watcher:
+            imported_count = post_manager.import_new_files()
+            if imported_count:
+                print(f"Imported {imported_count} new posts")
+        # Process posts
+        worker.run_once()
+        # Sleep until the next scheduled post instead of polling
+        scheduler.wait(scheduler.next_sleep(posting_interval, watching=watcher is not None))
+
+    if not TEST_MODE:  # Single run for production mode
         # Import new posts
         imported_count = post_manager.import_new_files()
         if imported_count:
             print(f"Imported {imported_count} new posts")
         # Process posts
-        for _ in range(POSTS_PER_RUN):
-            post = post_manager.get_next_ready_post()
-            if not post:
-                break
-            success, message = bluesky.post_content(post.content)
-            status = "posted" if success else "failed"
-            post_manager.update_post_status(post_id=post.id, status=status, posted_at=datetime.now() if success else None)
-            print(f"Post {post.id}: {message}")
-        time.sleep(posting_interval)
+        worker.run_once()
+
+async def run_loop_async(post_manager, worker, scheduler, posting_interval, watcher=None):
+    """Same cycle as run_loop, publishing each batch through the async worker"""
+    while TEST_MODE and not worker.stopping:  # Only loop if in test mode
+        if not watcher:
+            imported_count = post_manager.import_new_files()
+            if imported_count:
+                print(f"Imported {imported_count} new posts")
+        await worker.run_once()
+        await scheduler.wait_async(scheduler.next_sleep(posting_interval, watching=watcher is not None))
 
     if not TEST_MODE:  # Single run for production mode
-        # Import new posts
         imported_count = post_manager.import_new_files()
         if imported_count:
             print(f"Imported {imported_count} new posts")
-        # Process posts
-        for _ in range(POSTS_PER_RUN):
-            post = post_manager.get_next_ready_post()
-            if not post:
-                break
-            success, message = bluesky.post_content(post.content)
-            status = "posted" if success else "failed"
-            post_manager.update_post_status(post_id=post.id, status=status, posted_at=datetime.now() if success else None)
-            print(f"Post {post.id}: {message}")
+        await worker.run_once()
 
 if __name__ == "__main__":
+    # A cron run with nothing due leaves before loading the Bluesky client
+    # or touching the schema
+    if not TEST_MODE and is_idle(DB_PATH, READY_DIR):
+        sys.exit(0)
+    from post_manager import PostManager
+
     post_manager = None  # Define outside try block for finally access
     session_start_time = datetime.now()  # Capture start time of this test session
     try:
@@ -83,7 +150,8 @@ if __name__ == "__main__":
         post_manager = PostManager(
             db_path=DB_PATH,
             ready_dir=READY_DIR,
-            processed_dir=PROCESSED_DIR
+            processed_dir=PROCESSED_DIR,
+            journal_mode=SQLITE_JOURNAL_MODE
         )
         main()
     finally:
@@ -91,4 +159,6 @@ if __name__ == "__main__":
             post_manager.reset_test_mode(session_start_time)  # Pass the session start time
             print("Test mode cleanup completed")
             print("-" * 50)
+        if post_manager:
+            post_manager.close()
 
@@ -0,0 +1,118 @@
+import asyncio
+import hashlib
+import io
+import mimetypes
+import os
+import re
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterator, List, Optional, Tuple
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; without it oversized images are rejected
+    Image = None
+
+# Bluesky accepts up to 4 images per post, each at most 1,000,000 bytes
+MAX_IMAGES = 4
+MAX_IMAGE_BYTES = 1_000_000
+# Longest side of a resized image, and the JPEG qualities tried in turn
+MAX_IMAGE_DIMENSION = 2000
+RESIZE_QUALITIES = (85, 75, 65, 50)
+UPLOAD_CHUNK_SIZE = 64 * 1024
+
+# ![alt text](relative/path.png) on a line of its own or inline
+_IMAGE = re.compile(r"!\[([^\]]*)\]\(([^)\s]+)\)[ \t]*\n?")
+
+# (absolute path, alt text)
+ImageRef = Tuple[str, str]
+
+@dataclass
+class PreparedImage:
+    """An image ready for uploadBlob
+
+    data is None when the file is uploaded as is, streamed from path.
+    """
+    path: str
+    mime_type: str
+    size: int
+    data: Optional[bytes] = None
+    aspect_ratio: Optional[Dict[str, int]] = None
+
+def extract_images(text: str, base_dir: Path) -> Tuple[str, List[ImageRef]]:
+    """Take markdown image references out of a post
+
+    Paths are resolved against base_dir (the post file's directory). Remote
+    images (http/https URLs) are left in the text. Raises ValueError for
+    missing files and for more images than a post can hold.
+    """
+    images = []
+
+    def take(match):
+        target = match.group(2)
+        if "://" in target:
+            return match.group(0)
+        path = (base_dir / target).resolve()
+        if not path.is_file():
+            raise ValueError(f"image {target} not found")
+        images.append((str(path), match.group(1)))
+        return ""
+
+    text = _IMAGE.sub(take, text)
+    if len(images) > MAX_IMAGES:
+        raise ValueError(f"{len(images)} images, a post can have at most {MAX_IMAGES}")
+    return text, images
+
+def file_sha256(path: str) -> str:
+    # hashlib.file_digest would do this, but only from Python 3.11
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while chunk := f.read(1 << 20):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _aspect_ratio(image) -> Dict[str, int]:
+    width, height = image.size
+    return {"width": width, "height": height}
+
+def prepare_image(path: str, resize: bool = True) -> PreparedImage:
+    """Check an image against the upload limit, re-encoding it if needed
+
+    Images under the limit are streamed from disk unchanged. Larger ones are
+    scaled down and recompressed as JPEG when Pillow is installed and resize
+    is enabled; otherwise ValueError is raised.
+    """
+    size = os.path.getsize(path)
+    mime_type = mimetypes.guess_type(path)[0] or "application/octet-stream"
+    if size <= MAX_IMAGE_BYTES:
+        aspect_ratio = None
+        if Image is not None:
+            # Only reads the header
+            with Image.open(path) as image:
+                aspect_ratio = _aspect_ratio(image)
+        return PreparedImage(path, mime_type, size, aspect_ratio=aspect_ratio)
+    if not resize or Image is None:
+        raise ValueError(f"{Path(path).name} is {size} bytes, over the {MAX_IMAGE_BYTES} byte limit "
+                         f"({'install Pillow to resize it' if Image is None else 'resizing is disabled'})")
+    with Image.open(path) as image:
+        image.thumbnail((MAX_IMAGE_DIMENSION, MAX_IMAGE_DIMENSION))
+        image = image.convert("RGB")
+        for quality in RESIZE_QUALITIES:
+            buffer = io.BytesIO()
+            image.save(buffer, "JPEG", quality=quality, optimize=True)
+            if buffer.tell() <= MAX_IMAGE_BYTES:
+                data = buffer.getvalue()
+                return PreparedImage(path, "image/jpeg", len(data), data, _aspect_ratio(image))
+    raise ValueError(f"{Path(path).name} is still over {MAX_IMAGE_BYTES} bytes after recompressing")
+
+def iter_file(path: str) -> Iterator[bytes]:
+    """Read a file in chunks, for streaming uploads"""
+    with open(path, 'rb') as f:
+        while chunk := f.read(UPLOAD_CHUNK_SIZE):
+            yield chunk
+
+async def aiter_file(path: str) -> AsyncIterator[bytes]:
+    """iter_file for the async client, reading off the event loop"""
+    with open(path, 'rb') as f:
+        while chunk := await asyncio.to_thread(f.read, UPLOAD_CHUNK_SIZE):
+            yield chunk
@@ -0,0 +1,285 @@
+import bisect
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+# Seconds; covers a sub-millisecond dequeue up to a multi-minute import
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+
+class _Metric:
+    """Values per label tuple, guarded by one lock per metric
+
+    Recording is a dict lookup and an add under an uncontended lock, so it is
+    cheap enough to leave on in the posting loop.
+    """
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = tuple(labels)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> Tuple[str, ...]:
+        if not self.labels:
+            return ()
+        return tuple([str(labels[label]) for label in self.labels])
+
+    def _label_text(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [f'{label}="{value}"' for label, value in zip(self.labels, key)]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def expose(self) -> List[str]:
+        """Prometheus text format lines for this metric"""
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = list(self._values.items())
+        for key, value in items:
+            lines.append(f"{self.name}{self._label_text(key)} {value}")
+        return lines
+
+    def snapshot(self):
+        """Current values as plain JSON-able data"""
+        with self._lock:
+            items = list(self._values.items())
+        if not self.labels:
+            return items[0][1] if items else 0
+        return {",".join(key): value for key, value in items}
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    """A value that goes up and down; set directly or read from a callback at scrape time"""
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        super().__init__(name, help_text, labels)
+        self._function: Optional[Callable[[], Iterable[tuple]]] = None
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def set_function(self, function: Optional[Callable[[], Iterable[tuple]]]):
+        """Collect from function on every scrape: (label values..., value) rows
+
+        Keeps expensive reads, such as queue counts, off the hot path.
+        """
+        self._function = function
+
+    def collect(self):
+        function = self._function
+        if function is None:
+            return
+        try:
+            rows = list(function())
+        except Exception as e:
+            print(f"Metrics: collecting {self.name} failed: {e}")
+            return
+        with self._lock:
+            self._values = {tuple(str(value) for value in tuple(row)[:-1]): row[-1] for row in rows}
+
+    def expose(self) -> List[str]:
+        self.collect()
+        return super().expose()
+
+    def snapshot(self):
+        self.collect()
+        return super().snapshot()
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count"""
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # Per-bucket counts (the last one is +Inf), sum
+                state = self._values[key] = [[0] * (len(self.buckets) + 1), 0.0]
+            state[0][index] += 1
+            state[1] += value
+
+    def time(self, **labels) -> "_Timer":
+        """Context manager observing the duration of its block"""
+        return _Timer(self, labels)
+
+    def expose(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} {self.kind}"]
+        with self._lock:
+            items = [(key, list(counts), total) for key, (counts, total) in self._values.items()]
+        for key, counts, total in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(float(bound))
+                bucket_label = f'le="{le}"'
+                lines.append(f"{self.name}_bucket{self._label_text(key, bucket_label)} {cumulative}")
+            lines.append(f"{self.name}_sum{self._label_text(key)} {total}")
+            lines.append(f"{self.name}_count{self._label_text(key)} {cumulative}")
+        return lines
+
+    def snapshot(self):
+        with self._lock:
+            items = [(key, sum(counts), total) for key, (counts, total) in self._values.items()]
+        values = {",".join(key): {"count": count, "sum": round(total, 6)} for key, count, total in items}
+        if not self.labels:
+            return values.get("", {"count": 0, "sum": 0.0})
+        return values
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram: Histogram, labels: Dict[str, str]):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+
+class Registry:
+    def __init__(self):
+        self.metrics: List[_Metric] = []
+
+    def register(self, metric: _Metric) -> _Metric:
+        self.metrics.append(metric)
+        return metric
+
+    def expose(self) -> str:
+        """Every metric in the Prometheus text exposition format"""
+        return "\n".join(line for metric in self.metrics for line in metric.expose()) + "\n"
+
+    def snapshot(self) -> dict:
+        return {metric.name: metric.snapshot() for metric in self.metrics}
+
+REGISTRY = Registry()
+
+IMPORTED_POSTS = REGISTRY.register(Counter(
+    "bsky_imported_posts_total", "Posts imported from the ready directory"))
+IMPORT_DURATION = REGISTRY.register(Histogram(
+    "bsky_import_duration_seconds", "Time to import one set of ready files"))
+DEQUEUE_DURATION = REGISTRY.register(Histogram(
+    "bsky_dequeue_duration_seconds", "Time to claim the next batch (or post) from the queue"))
+POST_DURATION = REGISTRY.register(Histogram(
+    "bsky_post_duration_seconds", "Time to publish one post, by outcome", labels=("outcome",)))
+RATE_LIMIT_WAIT = REGISTRY.register(Histogram(
+    "bsky_rate_limit_wait_seconds", "Time requests waited on the client-side rate limiter"))
+RATE_LIMITED = REGISTRY.register(Counter(
+    "bsky_rate_limited_total", "Requests rejected by the server with a 429"))
+QUEUE_DEPTH = REGISTRY.register(Gauge(
+    "bsky_queue_depth", "Posts in the queue, by status", labels=("status",)))
+
+class _Server(ThreadingHTTPServer):
+    daemon_threads = True
+
+class MetricsServer:
+    """Serves REGISTRY on /metrics from a background thread"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 9464, registry: Registry = REGISTRY):
+        self.registry = registry
+        self._server = _Server((host, port), self._handler_class())
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/metrics"
+
+    def _handler_class(self):
+        registry = self.registry
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = registry.expose().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "MetricsServer":
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+_json_log = None
+_json_log_lock = threading.Lock()
+
+def configure_json_log(path: Optional[str]):
+    """Write log_event() lines to path ('-' for stdout), or stop with None"""
+    global _json_log
+    if _json_log not in (None, sys.stdout):
+        _json_log.close()
+    if path is None:
+        _json_log = None
+    elif path == "-":
+        _json_log = sys.stdout
+    else:
+        _json_log = open(path, "a", encoding="utf-8", buffering=1)
+
+def log_event(event: str, **fields):
+    """One JSON line per event, when a JSON log is configured"""
+    if _json_log is None:
+        return
+    line = json.dumps({"ts": round(time.time(), 3), "event": event, **fields}, default=str)
+    with _json_log_lock:
+        _json_log.write(line + "\n")
+
+def configured_metrics(queue_status: Optional[Callable[[], Iterable[tuple]]] = None) -> Optional[MetricsServer]:
+    """Set up the exporters chosen by METRICS_PORT and METRICS_JSON_LOG
+
+    queue_status (e.g. PostManager.scrape_queue_status) feeds the queue depth
+    gauge. Returns the started /metrics server, or None when it is off.
+    """
+    from config import METRICS_HOST, METRICS_PORT, METRICS_JSON_LOG
+
+    QUEUE_DEPTH.set_function(queue_status)
+    configure_json_log(METRICS_JSON_LOG)
+    if not METRICS_PORT:
+        return None
+    server = MetricsServer(METRICS_HOST, METRICS_PORT).start()
+    print(f"Serving metrics on {server.url}")
+    return server
+
+def shutdown(server: Optional[MetricsServer]):
+    """Stop the /metrics server and log a final snapshot of every metric"""
+    if server:
+        server.stop()
+    log_event("metrics", **REGISTRY.snapshot())
+    configure_json_log(None)
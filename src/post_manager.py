@@ -1,9 +1,59 @@
-from dataclasses import dataclass
-from datetime import datetime
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta
 from pathlib import Path
+import errno
+import itertools
+import json
+import os
+import random
 import sqlite3
 import shutil
-from typing import Optional, List
+import threading
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from front_matter import account_field, language_tags, scheduling_fields, split_front_matter
+from media import ImageRef, extract_images
+from rich_text import Facet, detect_facets, mentioned_handles, render_record
+from thread_splitter import split_thread
+import metrics
+from archiver import archived_hashes
+from bundles import READY_SUFFIXES, MARKDOWN_BUNDLE_SUFFIX, decode_record, is_bundle, iter_records
+from dedup import band_keys, content_hash, minhash_signature, pack_signature, similarity, unpack_signature
+
+# Connection tuning applied once to every pooled connection
+SQLITE_PRAGMAS = (
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+)
+SQLITE_BUSY_TIMEOUT = 30.0
+STATEMENT_CACHE_SIZE = 64
+
+# Claim filter: a post in a sequence waits until every earlier post of the
+# sequence (ordered by thread root, so a thread counts as one post) is
+# finished, whichever worker holds it and whether or not it failed
+SEQUENCE_HEAD = '''
+    (p.sequence_key IS NULL OR NOT EXISTS (
+        SELECT 1 FROM posts AS earlier
+        WHERE earlier.sequence_key = p.sequence_key
+        AND earlier.status IN ('ready', 'pending', 'retry', 'in_progress')
+        AND COALESCE(earlier.thread_root_id, earlier.id) < COALESCE(p.thread_root_id, p.id)
+    ))
+'''
+
+# Files imported per transaction
+DEFAULT_IMPORT_BATCH_SIZE = 500
+
+# Threads reading ready files concurrently during an import
+DEFAULT_IMPORT_READ_WORKERS = 8
+
+# How long a resolved mention handle -> DID mapping is trusted
+DEFAULT_HANDLE_CACHE_TTL = 24 * 60 * 60
+
+# How long a claimed post stays reserved before another worker may reclaim it
+DEFAULT_LEASE_SECONDS = 300
 
 @dataclass
 class Post:
@@ -14,59 +64,841 @@ class Post:
     posted_at: Optional[datetime]
     status: str
     filename: Optional[str] = None
+    sequence_key: Optional[str] = None
+    scheduled_for: Optional[datetime] = None
+    priority: int = 0
+    # Pre-rendered app.bsky.feed.post record JSON (without createdAt)
+    record: Optional[str] = None
+    # Parts of a long post after the first reply to the previous part
+    thread_root_id: Optional[int] = None
+    thread_position: int = 0
+    # (path, alt text) of images to embed; only ever on a thread's first part
+    images: List[ImageRef] = field(default_factory=list)
+    # Handle of the account to post from; None posts from the default account
+    account: Optional[str] = None
+
+    @property
+    def thread_root(self) -> int:
+        """Id of the first part of this post's thread (its own id if not a reply)"""
+        return self.thread_root_id or self.id
+
+@dataclass
+class ImportedFile:
+    """A ready file (or bundle record) parsed for import, before it becomes a post"""
+    name: str
+    content: str
+    content_hash: str
+    signature: Optional[tuple] = None
+    scheduled_for: Optional[datetime] = None
+    priority: int = 0
+    sequence_key: Optional[str] = None
+    langs: Optional[List[str]] = None
+    images: List[ImageRef] = field(default_factory=list)
+    account: Optional[str] = None
+    # One entry per thread part; a post that fits has a single part
+    parts: List[str] = field(default_factory=list)
+    facets: List[List[Facet]] = field(default_factory=list)
+    records: List[str] = field(default_factory=list)
+
+@dataclass
+class RetryPolicy:
+    """Exponential backoff with jitter for transient posting failures"""
+    max_attempts: int = 5
+    base_delay: float = 60.0
+    max_delay: float = 3600.0
+
+    def next_delay(self, attempts: int) -> float:
+        """Seconds to wait before retrying a post that has failed `attempts` times"""
+        ceiling = min(self.max_delay, self.base_delay * 2 ** (attempts - 1))
+        # Keep half the backoff and randomize the rest so retries spread out
+        return ceiling / 2 + random.uniform(0, ceiling / 2)
 
 class PostManager:
-    def __init__(self, db_path: Path, ready_dir: Path, processed_dir: Path):
+    def __init__(self, db_path: Path, ready_dir: Path, processed_dir: Path, journal_mode: str = "WAL",
+                 retry_policy: Optional[RetryPolicy] = None,
+                 import_batch_size: int = DEFAULT_IMPORT_BATCH_SIZE,
+                 import_read_workers: int = DEFAULT_IMPORT_READ_WORKERS,
+                 near_duplicate_threshold: Optional[float] = None,
+                 handle_resolver: Optional[Callable[[str], Optional[str]]] = None,
+                 handle_cache_ttl: float = DEFAULT_HANDLE_CACHE_TTL,
+                 archive_dir: Optional[Path] = None):
         self.db_path = db_path
         self.ready_dir = ready_dir
         self.processed_dir = processed_dir
+        self.journal_mode = journal_mode
+        self.retry_policy = retry_policy or RetryPolicy()
+        self.import_batch_size = import_batch_size
+        self.import_read_workers = max(1, import_read_workers)
+        # Estimated Jaccard similarity at which an import counts as a near
+        # duplicate; None checks exact duplicates only
+        self.near_duplicate_threshold = near_duplicate_threshold
+        # Resolves mention handles to DIDs at import; without one, mentions
+        # that are not already cached stay plain text
+        self.handle_resolver = handle_resolver
+        self.handle_cache_ttl = handle_cache_ttl
+        # Monthly archives of old posts (see archiver.py), consulted when an
+        # import's hash matches archive_index
+        self.archive_dir = archive_dir
+        self._local = threading.local()
+        self._connections = []
+        self._connections_lock = threading.Lock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
 
     def _get_db_connection(self):
-        """Create a database connection with row factory"""
-        conn = sqlite3.connect(self.db_path)
-        conn.row_factory = sqlite3.Row
+        """Return this thread's long-lived connection, opening it on first use"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(
+                self.db_path,
+                timeout=SQLITE_BUSY_TIMEOUT,
+                cached_statements=STATEMENT_CACHE_SIZE,
+                check_same_thread=False
+            )
+            conn.row_factory = sqlite3.Row
+            conn.execute(f"PRAGMA journal_mode={self.journal_mode}")
+            for pragma in SQLITE_PRAGMAS:
+                conn.execute(pragma)
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
         return conn
 
+    def release_connection(self):
+        """Close the calling thread's pooled connection, if it opened one
+
+        Short-lived threads (e.g. a worker's per-batch heartbeat) call this
+        before exiting so their connections do not pile up until close().
+        """
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            return
+        self._local.conn = None
+        with self._connections_lock:
+            if conn in self._connections:
+                self._connections.remove(conn)
+        conn.close()
+
+    def close(self):
+        """Close every pooled connection opened by this manager"""
+        with self._connections_lock:
+            connections, self._connections = self._connections, []
+        for conn in connections:
+            conn.close()
+        self._local = threading.local()
+
     def import_new_files(self) -> int:
-        """Import new markdown files from ready directory into database"""
+        """Import new markdown files and bundles from ready directory into database, in filename order"""
+        return self.import_files(sorted(
+            file for suffix in READY_SUFFIXES for file in self.ready_dir.glob(f"*{suffix}")
+        ))
+
+    def import_files(self, files: Iterable[Path]) -> int:
+        """Import the given markdown files from the ready directory
+
+        Files are read and inserted in chunks of import_batch_size, one
+        transaction per chunk, and only moved to the processed directory once
+        their chunk is committed. The chunk's filenames are journaled in the
+        same transaction, so a crash between commit and move is repaired by
+        recover_import_journal() instead of importing the files twice. Files
+        that have already disappeared (e.g. imported by someone else) are
+        skipped.
+
+        Files are read by a pool of import_read_workers threads, and the next
+        chunk is read while the current one is written, which hides per-file
+        latency on network storage. Only the calling thread touches SQLite,
+        and posts are inserted in the order the files were given.
+
+        Files whose normalized text matches an existing post (any status) are
+        moved to processed without creating a post. With
+        near_duplicate_threshold set, so are files whose estimated similarity
+        to an existing post reaches the threshold.
+
+        Bundles (JSONL or .bundle.md files, see bundles.py) among the files
+        are imported after the others by import_bundle.
+        """
+        start = time.perf_counter()
+        self.recover_import_journal()
+        if self.near_duplicate_threshold is not None:
+            self.index_near_duplicates()
         imported_count = 0
-        with self._get_db_connection() as conn:
-            cursor = conn.cursor()
+        bundles = []
 
-            for file in self.ready_dir.glob("*.md"):
-                content = file.read_text(encoding='utf-8')
-                cursor.execute(
-                    'INSERT INTO posts (content, created_at, status) VALUES (?, ?, ?)',
-                    (content, datetime.now(), 'ready')
-                )
-                shutil.move(str(file), str(self.processed_dir / file.name))
-                imported_count += 1
+        def single_posts(candidates):
+            for file in candidates:
+                if is_bundle(file):
+                    bundles.append(file)
+                else:
+                    yield file
+
+        files = single_posts(files)
+        with ThreadPoolExecutor(max_workers=self.import_read_workers,
+                                thread_name_prefix="import-read") as pool:
+            def read_ahead():
+                chunk = itertools.islice(files, self.import_batch_size)
+                return [pool.submit(self._load_file, file) for file in chunk]
 
+            pending = read_ahead()
+            while pending:
+                chunk, pending = pending, read_ahead()
+                loaded = [future.result() for future in chunk]
+                loaded = [imported for imported in loaded if imported is not None]
+                if not loaded:
+                    continue
+                self._render_records(loaded, pool)
+                imported_count += self._import_chunk(loaded)
+            for bundle in bundles:
+                imported_count += self.import_bundle(bundle, pool)
+
+        elapsed = time.perf_counter() - start
+        metrics.IMPORT_DURATION.observe(elapsed)
+        if imported_count:
+            metrics.IMPORTED_POSTS.inc(imported_count)
+            metrics.log_event("import", imported=imported_count, seconds=round(elapsed, 6))
         return imported_count
 
-    def get_next_ready_post(self) -> Optional[Post]:
-        """Retrieve the next post ready for processing"""
+    def _load_file(self, file: Path) -> Optional[ImportedFile]:
+        """Read and parse a ready file; runs on the read pool
+
+        Returns None for files that have gone, and for files with invalid
+        front matter, which stay in the ready directory until fixed.
+        """
+        text = self._read_file(file)
+        if text is None:
+            return None
+        try:
+            fields, content = split_front_matter(text)
+        except ValueError as e:
+            print(f"Skipping {file.name}: invalid front matter: {e}")
+            return None
+        return self._parse_post(file.name, fields, content, file.parent)
+
+    def _parse_post(self, name: str, fields: Dict, content: str, base_dir: Path) -> Optional[ImportedFile]:
+        """Build a post from its front matter fields and markdown body
+
+        Returns None, after saying why, for invalid fields and missing images.
+        Image paths are relative to base_dir.
+        """
+        try:
+            scheduled_for, priority, sequence_key = scheduling_fields(fields)
+            langs = language_tags(fields)
+            account = account_field(fields)
+        except ValueError as e:
+            print(f"Skipping {name}: invalid front matter: {e}")
+            return None
+        content = content.strip()
+        try:
+            text, images = extract_images(content, base_dir)
+        except ValueError as e:
+            print(f"Skipping {name}: {e}")
+            return None
+        # Dedup keys on the markdown, so the same text with other images is new
+        parts = split_thread(text.strip())
+        return ImportedFile(
+            name=name,
+            content=content,
+            content_hash=content_hash(content),
+            signature=minhash_signature(content) if self.near_duplicate_threshold is not None else None,
+            scheduled_for=scheduled_for,
+            priority=priority,
+            sequence_key=sequence_key,
+            langs=langs,
+            images=images,
+            account=account,
+            parts=parts,
+            facets=[detect_facets(part) for part in parts]
+        )
+
+    @staticmethod
+    def _read_file(file: Path) -> Optional[str]:
+        """Read a ready file, or return None if it has already gone"""
+        try:
+            with open(file, encoding='utf-8') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def import_bundle(self, bundle: Path, pool: Optional[ThreadPoolExecutor] = None) -> int:
+        """Import every post of a bundle file, then move it to processed
+
+        Records are streamed from the memory-mapped file and inserted in
+        chunks of import_batch_size. Each chunk's transaction also records the
+        offset just past it in import_bundles, so after a crash the next
+        import resumes there instead of re-reading the whole bundle. Malformed
+        records are skipped with a message; posts are named after their byte
+        offset (e.g. posts.jsonl@1024) in messages.
+        """
+        conn = self._get_db_connection()
+        row = conn.execute('SELECT resume_offset FROM import_bundles WHERE name = ?', (bundle.name,)).fetchone()
+        start = row[0] if row else 0
+        try:
+            size = bundle.stat().st_size
+        except FileNotFoundError:
+            return 0
+        if start > size:
+            print(f"{bundle.name} is smaller than when its import stopped; importing it from the start")
+            start = 0
+        elif start:
+            print(f"Resuming {bundle.name} at byte {start} of {size}")
+
+        markdown = bundle.name.endswith(MARKDOWN_BUNDLE_SUFFIX)
+        imported_count = 0
+        records = iter_records(bundle, start)
+        while True:
+            chunk = list(itertools.islice(records, self.import_batch_size))
+            if not chunk:
+                break
+            loaded = []
+            for offset, _, raw in chunk:
+                name = f"{bundle.name}@{offset}"
+                try:
+                    fields, content = decode_record(raw, markdown)
+                except ValueError as e:
+                    print(f"Skipping {name}: {e}")
+                    continue
+                imported = self._parse_post(name, fields, content, bundle.parent)
+                if imported is not None:
+                    loaded.append(imported)
+            self._render_records(loaded, pool)
+            imported_count += self._import_chunk(loaded, resume=(bundle.name, chunk[-1][1]))
+
+        # Forget the offset before moving: a crash in between re-reads the
+        # bundle, skipping its posts as duplicates, while a stale offset could
+        # make a later bundle of the same name start part way through
+        with conn:
+            conn.execute('DELETE FROM import_bundles WHERE name = ?', (bundle.name,))
+        self._move_files([bundle.name])
+        return imported_count
+
+    def _render_records(self, loaded: List[ImportedFile], pool: ThreadPoolExecutor):
+        """Build the post record of every part, resolving the chunk's mentions together"""
+        dids = self.resolve_handles(
+            set().union(*(mentioned_handles(facets) for imported in loaded for facets in imported.facets)), pool
+        )
+        for imported in loaded:
+            imported.records = [
+                render_record(part, facets, dids, imported.langs)
+                for part, facets in zip(imported.parts, imported.facets)
+            ]
+
+    def resolve_handles(self, handles: Set[str], pool: Optional[ThreadPoolExecutor] = None) -> Dict[str, Optional[str]]:
+        """Map handles to DIDs through the handle_dids cache
+
+        Entries older than handle_cache_ttl are resolved again with
+        handle_resolver, concurrently on pool when given. Handles that do not
+        exist are cached as None; lookups that fail are not cached.
+        """
+        if not handles:
+            return {}
+        conn = self._get_db_connection()
+        fresh_after = datetime.now() - timedelta(seconds=self.handle_cache_ttl)
+        dids = {
+            row['handle']: row['did'] for row in conn.execute(
+                '''
+                SELECT handle, did FROM handle_dids
+                WHERE handle IN (SELECT value FROM json_each(?)) AND resolved_at >= ?
+                ''',
+                (json.dumps(sorted(handles)), fresh_after)
+            )
+        }
+        missing = sorted(handles - dids.keys())
+        if not missing or not self.handle_resolver:
+            return dids
+
+        def resolve(handle):
+            try:
+                return handle, self.handle_resolver(handle), True
+            except Exception as e:
+                print(f"Could not resolve @{handle}: {e}")
+                return handle, None, False
+
+        results = list(pool.map(resolve, missing) if pool else map(resolve, missing))
+        now = datetime.now()
+        with conn:
+            conn.executemany(
+                '''
+                INSERT INTO handle_dids (handle, did, resolved_at) VALUES (?, ?, ?)
+                ON CONFLICT (handle) DO UPDATE SET did = excluded.did, resolved_at = excluded.resolved_at
+                ''',
+                [(handle, did, now) for handle, did, resolved in results if resolved]
+            )
+        dids.update((handle, did) for handle, did, _ in results)
+        return dids
+
+    def _import_chunk(self, loaded: List[ImportedFile], resume: Optional[Tuple[str, int]] = None) -> int:
+        """Insert one chunk of parsed files, skipping duplicates
+
+        With resume, a (bundle name, offset) pair, the chunk came from a
+        bundle: the offset is saved with the posts instead of journaling and
+        moving files.
+        """
+        conn = self._get_db_connection()
+        hashes = [imported.content_hash for imported in loaded]
+        # One indexed lookup per hash via the unique content_hash index
+        known = {
+            row[0] for row in conn.execute(
+                'SELECT content_hash FROM posts WHERE content_hash IN (SELECT value FROM json_each(?))',
+                (json.dumps(hashes),)
+            )
+        }
+        # Posts moved to the archives are duplicates too
+        known |= archived_hashes(conn, self.archive_dir, [digest for digest in hashes if digest not in known])
+        chunk_buckets = {}
+        new_posts = []
+        for imported in loaded:
+            if imported.content_hash in known:
+                print(f"Skipping {imported.name}: duplicate of an existing post")
+                continue
+            if imported.signature is not None:
+                match = self._find_near_duplicate(conn, imported.signature, chunk_buckets)
+                if match is not None:
+                    print(f"Skipping {imported.name}: near duplicate of {match}")
+                    continue
+                for key in band_keys(imported.signature):
+                    chunk_buckets.setdefault(key, []).append((f"{imported.name} in this import", imported.signature))
+            known.add(imported.content_hash)
+            new_posts.append(imported)
+
+        created_at = datetime.now()
+        with conn:
+            account_ids = self._account_ids(conn, {imported.account for imported in new_posts if imported.account})
+            # DO NOTHING covers a concurrent importer inserting the same text
+            # between the lookup above and this insert
+            conn.executemany(
+                '''
+                INSERT INTO posts (content, created_at, status, content_hash,
+                                   scheduled_for, priority, sequence_key, record, images, account_id)
+                VALUES (?, ?, 'ready', ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT DO NOTHING
+                ''',
+                [
+                    (imported.parts[0], created_at, imported.content_hash,
+                     imported.scheduled_for or created_at, imported.priority, imported.sequence_key,
+                     imported.records[0], json.dumps(imported.images) if imported.images else None,
+                     account_ids.get(imported.account))
+                    for imported in new_posts
+                ]
+            )
+            threads = [imported for imported in new_posts if len(imported.parts) > 1]
+            ids = {}
+            if threads or (self.near_duplicate_threshold is not None and new_posts):
+                # created_at tells our rows apart from a concurrent importer's
+                ids = dict(conn.execute(
+                    '''
+                    SELECT content_hash, id FROM posts
+                    WHERE content_hash IN (SELECT value FROM json_each(?)) AND created_at = ?
+                    ''',
+                    (json.dumps([imported.content_hash for imported in new_posts]), created_at)
+                ).fetchall())
+            if threads:
+                # The remaining parts wait as 'pending' and are claimed with the first
+                conn.executemany(
+                    '''
+                    INSERT INTO posts (content, created_at, status, scheduled_for, priority, sequence_key,
+                                       record, thread_root_id, thread_position, account_id)
+                    VALUES (?, ?, 'pending', ?, ?, ?, ?, ?, ?, ?)
+                    ''',
+                    [
+                        (part, created_at, imported.scheduled_for or created_at, imported.priority,
+                         imported.sequence_key, record, ids[imported.content_hash], position,
+                         account_ids.get(imported.account))
+                        for imported in threads if imported.content_hash in ids
+                        for position, (part, record) in enumerate(
+                            zip(imported.parts[1:], imported.records[1:]), start=1
+                        )
+                    ]
+                )
+            if self.near_duplicate_threshold is not None and new_posts:
+                self._index_signatures(conn, [
+                    (ids[imported.content_hash], imported.signature)
+                    for imported in new_posts if imported.content_hash in ids
+                ])
+            if resume is not None:
+                conn.execute(
+                    '''
+                    INSERT INTO import_bundles (name, resume_offset) VALUES (?, ?)
+                    ON CONFLICT (name) DO UPDATE SET resume_offset = excluded.resume_offset
+                    ''',
+                    resume
+                )
+                return len(new_posts)
+            names = [imported.name for imported in loaded]
+            cursor = conn.execute(
+                'INSERT INTO import_journal (filenames) VALUES (?)', (json.dumps(names),)
+            )
+        self._move_to_processed(cursor.lastrowid, names)
+        return len(new_posts)
+
+    @staticmethod
+    def _account_ids(conn, usernames: Set[str]) -> Dict[str, int]:
+        """Ids of the given accounts, adding the ones seen for the first time"""
+        if not usernames:
+            return {}
+        names = json.dumps(sorted(usernames))
+        conn.execute(
+            'INSERT INTO accounts (username) SELECT value FROM json_each(?) WHERE true ON CONFLICT DO NOTHING',
+            (names,)
+        )
+        return {
+            username: account_id for account_id, username in conn.execute(
+                'SELECT id, username FROM accounts WHERE username IN (SELECT value FROM json_each(?))', (names,)
+            )
+        }
+
+    def _find_near_duplicate(self, conn, signature, chunk_buckets) -> Optional[str]:
+        """Describe the first indexed post at or above the similarity threshold, if any"""
+        checked = set()
+        for band, bucket in band_keys(signature):
+            for label, other in chunk_buckets.get((band, bucket), ()):
+                if similarity(signature, other) >= self.near_duplicate_threshold:
+                    return label
+            for post_id, packed in conn.execute(
+                '''
+                SELECT m.post_id, m.signature
+                FROM post_minhash_bands b JOIN post_minhash m ON m.post_id = b.post_id
+                WHERE b.band = ? AND b.bucket = ?
+                ''',
+                (band, bucket)
+            ):
+                if post_id in checked:
+                    continue
+                checked.add(post_id)
+                if similarity(signature, unpack_signature(packed)) >= self.near_duplicate_threshold:
+                    return f"post {post_id}"
+        return None
+
+    @staticmethod
+    def _index_signatures(conn, signatures):
+        """Store (post_id, signature) pairs and their LSH buckets"""
+        conn.executemany(
+            'INSERT OR REPLACE INTO post_minhash (post_id, signature) VALUES (?, ?)',
+            [(post_id, pack_signature(signature)) for post_id, signature in signatures]
+        )
+        conn.executemany(
+            'INSERT OR IGNORE INTO post_minhash_bands (band, bucket, post_id) VALUES (?, ?, ?)',
+            [
+                (band, bucket, post_id)
+                for post_id, signature in signatures
+                for band, bucket in band_keys(signature)
+            ]
+        )
+
+    def index_near_duplicates(self, batch_size: int = 1000) -> int:
+        """Compute MinHash signatures for posts created since the last indexed one
+
+        Runs once, in batches, the first time near-duplicate detection is
+        enabled on an existing database; afterwards imports index their own
+        posts and this is a single lookup. Later thread parts are never
+        indexed: imports compare against whole posts, which their roots'
+        signatures stand for.
+        """
+        conn = self._get_db_connection()
+        indexed = 0
+        while True:
+            rows = conn.execute(
+                '''
+                SELECT id, content FROM posts
+                WHERE id > (SELECT COALESCE(MAX(post_id), 0) FROM post_minhash)
+                AND thread_root_id IS NULL
+                ORDER BY id LIMIT ?
+                ''',
+                (batch_size,)
+            ).fetchall()
+            if not rows:
+                break
+            with conn:
+                self._index_signatures(conn, [(row['id'], minhash_signature(row['content'])) for row in rows])
+            indexed += len(rows)
+        if indexed:
+            print(f"Indexed {indexed} posts for near-duplicate detection")
+        return indexed
+
+    def _move_to_processed(self, journal_id: int, names: List[str]):
+        """Move a committed chunk out of the ready directory and clear its journal entry"""
+        self._move_files(names)
         with self._get_db_connection() as conn:
+            conn.execute('DELETE FROM import_journal WHERE id = ?', (journal_id,))
+
+    def _move_files(self, names: List[str]):
+        """Move the named files from the ready directory to processed"""
+        if os.rename not in os.supports_dir_fd:
+            # No directory-relative renames (Windows)
+            for name in names:
+                self._move_file(name, lambda: os.replace(self.ready_dir / name, self.processed_dir / name))
+            return
+        ready_fd = os.open(self.ready_dir, os.O_RDONLY)
+        processed_fd = os.open(self.processed_dir, os.O_RDONLY)
+        try:
+            for name in names:
+                # Directory-relative renames skip re-resolving both paths per file
+                self._move_file(name, lambda: os.rename(name, name, src_dir_fd=ready_fd, dst_dir_fd=processed_fd))
+        finally:
+            os.close(ready_fd)
+            os.close(processed_fd)
+
+    def _move_file(self, name: str, rename: Callable[[], None]):
+        """Run rename for one file, tolerating files already gone and a processed dir on another filesystem"""
+        try:
+            rename()
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+            shutil.move(str(self.ready_dir / name), str(self.processed_dir / name))
+
+    def recover_import_journal(self) -> int:
+        """Finish moving files whose posts were committed before a crash"""
+        with self._get_db_connection() as conn:
+            chunks = conn.execute('SELECT id, filenames FROM import_journal').fetchall()
+        for journal_id, filenames in chunks:
+            names = json.loads(filenames)
+            print(f"Recovering {len(names)} imported files left in {self.ready_dir}")
+            self._move_to_processed(journal_id, names)
+        return len(chunks)
+
+    @staticmethod
+    def _row_to_post(row) -> Post:
+        """Build a Post from a posts row"""
+        return Post(
+            id=row['id'],
+            content=row['content'],
+            created_at=datetime.fromisoformat(row['created_at']),
+            posted_at=datetime.fromisoformat(row['posted_at']) if row['posted_at'] else None,
+            status=row['status'],
+            sequence_key=row['sequence_key'],
+            scheduled_for=datetime.fromisoformat(row['scheduled_for']) if row['scheduled_for'] else None,
+            priority=row['priority'],
+            record=row['record'],
+            thread_root_id=row['thread_root_id'],
+            thread_position=row['thread_position'],
+            images=[tuple(image) for image in json.loads(row['images'])] if row['images'] else [],
+            account=row['account']
+        )
+
+    def get_next_ready_post(self) -> Optional[Post]:
+        """Retrieve the next post due for processing"""
+        with metrics.DEQUEUE_DURATION.time(), self._get_db_connection() as conn:
             cursor = conn.cursor()
-            cursor.execute('''
-                SELECT id, content, created_at, posted_at, status
+            cursor.execute(f'''
+                SELECT id, content, created_at, posted_at, status, sequence_key, scheduled_for, priority, record,
+                    thread_root_id, thread_position, images,
+                    (SELECT username FROM accounts WHERE accounts.id = posts.account_id) AS account
                 FROM posts
-                WHERE status = 'ready'
-                ORDER BY created_at
-                LIMIT 1
-            ''')
+                WHERE id = (
+                    -- Select the id alone so the claim-order index covers the search
+                    SELECT id
+                    FROM posts AS p
+                    WHERE status = 'ready'
+                    -- The unary + keeps the planner on the claim-order index
+                    -- instead of a scheduled_for range scan and a sort
+                    AND +scheduled_for <= ?
+                    AND {SEQUENCE_HEAD}
+                    ORDER BY priority DESC, scheduled_for, id
+                    LIMIT 1
+                )
+            ''', (datetime.now(),))
             row = cursor.fetchone()
 
             if row:
-                return Post(
-                    id=row['id'],
-                    content=row['content'],
-                    created_at=datetime.fromisoformat(row['created_at']),
-                    posted_at=datetime.fromisoformat(row['posted_at']) if row['posted_at'] else None,
-                    status=row['status']
-                )
+                return self._row_to_post(row)
         return None
 
+    def _release_expired_leases(self, conn, now: datetime) -> int:
+        """Put in_progress posts whose lease ended before now back to ready"""
+        cursor = conn.execute('''
+            UPDATE posts
+            SET status = 'ready', claimed_by = NULL, lease_expires_at = NULL
+            WHERE status = 'in_progress'
+            AND lease_expires_at < ?
+        ''', (now,))
+        return cursor.rowcount
+
+    def release_expired_leases(self) -> int:
+        """Return posts whose claim lease has expired to the ready queue"""
+        with self._get_db_connection() as conn:
+            return self._release_expired_leases(conn, datetime.now())
+
+    def _release_due_retries(self, conn, now: datetime) -> int:
+        """Move retries whose backoff has elapsed back to ready"""
+        cursor = conn.execute('''
+            UPDATE posts
+            SET status = 'ready', next_attempt_at = NULL
+            WHERE status = 'retry'
+            AND next_attempt_at <= ?
+        ''', (now,))
+        return cursor.rowcount
+
+    def claim_batch(self, n: int, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> List[Post]:
+        """Atomically claim up to n due posts for worker_id
+
+        Posts are due once their scheduled_for has passed and are claimed
+        highest priority first, then earliest scheduled. The pending later
+        parts of a claimed post's thread are claimed with it, so a batch can
+        hold more than n posts; they are returned right after their first
+        part, in thread order. Claimed posts move to 'in_progress' with a
+        lease. Posts whose lease has expired (e.g. their worker crashed) and
+        retries that are due are put back in the queue first so they can be
+        claimed again. Of each sequence only the earliest unfinished post is
+        claimable, so a sequence goes out in order, one post at a time.
+        """
+        now = datetime.now()
+        with metrics.DEQUEUE_DURATION.time(), self._get_db_connection() as conn:
+            # Reclaim and claim share one write transaction
+            self._release_expired_leases(conn, now)
+            self._release_due_retries(conn, now)
+            cursor = conn.execute(f'''
+                UPDATE posts
+                SET status = 'in_progress', claimed_by = ?, lease_expires_at = ?
+                WHERE id IN (
+                    SELECT id
+                    FROM posts AS p
+                    WHERE status = 'ready'
+                    -- The unary + keeps the planner on the claim-order index
+                    -- instead of a scheduled_for range scan and a sort
+                    AND +scheduled_for <= ?
+                    AND {SEQUENCE_HEAD}
+                    ORDER BY priority DESC, scheduled_for, id
+                    LIMIT ?
+                )
+                RETURNING id, content, created_at, posted_at, status, sequence_key, scheduled_for, priority, record,
+                    thread_root_id, thread_position, images,
+                    (SELECT username FROM accounts WHERE accounts.id = posts.account_id) AS account
+            ''', (worker_id, now + timedelta(seconds=lease_seconds), now, n))
+            rows = cursor.fetchall()
+            if rows:
+                roots = sorted({row['thread_root_id'] or row['id'] for row in rows})
+                rows += conn.execute('''
+                    UPDATE posts
+                    SET status = 'in_progress', claimed_by = ?, lease_expires_at = ?
+                    WHERE status = 'pending'
+                    AND thread_root_id IN (SELECT value FROM json_each(?))
+                    RETURNING id, content, created_at, posted_at, status, sequence_key, scheduled_for, priority,
+                        record, thread_root_id, thread_position, images,
+                        (SELECT username FROM accounts WHERE accounts.id = posts.account_id) AS account
+                ''', (worker_id, now + timedelta(seconds=lease_seconds), json.dumps(roots))).fetchall()
+
+        posts = [self._row_to_post(row) for row in rows]
+        posts.sort(key=lambda post: (-post.priority, post.scheduled_for, post.thread_root, post.thread_position))
+        return posts
+
+    def thread_refs(self, posts: List[Post]) -> Dict[tuple, tuple]:
+        """(uri, cid) of the already published parts of the given posts' threads
+
+        Keyed by (thread_root, thread_position); replies need the first part
+        (position 0) as root and the previous part as parent.
+        """
+        roots = sorted({post.thread_root for post in posts if post.thread_position > 0})
+        if not roots:
+            return {}
+        rows = self._get_db_connection().execute('''
+            SELECT COALESCE(thread_root_id, id), thread_position, uri, cid
+            FROM posts
+            WHERE (id IN (SELECT value FROM json_each(?1)) OR thread_root_id IN (SELECT value FROM json_each(?1)))
+            AND uri IS NOT NULL
+        ''', (json.dumps(roots),)).fetchall()
+        return {(root, position): (uri, cid) for root, position, uri, cid in rows}
+
+    def next_due_time(self) -> Optional[datetime]:
+        """When the earliest post is or will become claimable, None if nothing is queued
+
+        The earliest ready post by scheduled_for, retry by next_attempt_at and
+        in-progress post by lease expiry (in case its worker dies), each a
+        single index seek.
+        """
+        conn = self._get_db_connection()
+        due_times = conn.execute('''
+            SELECT
+                (SELECT scheduled_for FROM posts WHERE status = 'ready' AND scheduled_for IS NOT NULL
+                 ORDER BY scheduled_for LIMIT 1),
+                (SELECT next_attempt_at FROM posts WHERE status = 'retry' AND next_attempt_at IS NOT NULL
+                 ORDER BY next_attempt_at LIMIT 1),
+                (SELECT lease_expires_at FROM posts WHERE status = 'in_progress' AND lease_expires_at IS NOT NULL
+                 ORDER BY lease_expires_at LIMIT 1)
+        ''').fetchone()
+        due_times = [datetime.fromisoformat(due_at) for due_at in due_times if due_at]
+        return min(due_times, default=None)
+
+    def extend_leases(self, worker_id: str, lease_seconds: int = DEFAULT_LEASE_SECONDS) -> int:
+        """Heartbeat: push back the lease expiry of every post held by worker_id"""
+        with self._get_db_connection() as conn:
+            cursor = conn.execute('''
+                UPDATE posts
+                SET lease_expires_at = ?
+                WHERE status = 'in_progress'
+                AND claimed_by = ?
+            ''', (datetime.now() + timedelta(seconds=lease_seconds), worker_id))
+            return cursor.rowcount
+
+    def complete_batch(self, results: List[tuple], worker_id: Optional[str] = None) -> int:
+        """Record the outcomes of claimed posts in a single executemany
+
+        results holds (post_id, status, posted_at, error, uri, cid) tuples
+        where status is 'posted', 'ready' (not attempted), 'pending' (a thread
+        part not attempted because an earlier part was not published),
+        'retry' (transient failure) or 'dead' (permanent failure). Retries are
+        scheduled with the retry policy's backoff, and go to 'dead' once they
+        run out of attempts. When worker_id is given, only posts still leased
+        to that worker are updated. Returns the number of posts updated.
+        """
+        now = datetime.now()
+        with self._get_db_connection() as conn:
+            retry_ids = [post_id for post_id, status, *_ in results if status == 'retry']
+            attempts = {}
+            if retry_ids:
+                attempts = dict(conn.execute('''
+                    SELECT id, attempts
+                    FROM posts
+                    WHERE id IN (SELECT value FROM json_each(?))
+                ''', (json.dumps(retry_ids),)).fetchall())
+
+            rows = []
+            for post_id, status, posted_at, error, uri, cid in results:
+                next_attempt_at = None
+                if status == 'retry':
+                    attempt = attempts.get(post_id, 0) + 1
+                    if attempt >= self.retry_policy.max_attempts:
+                        status = 'dead'
+                    else:
+                        next_attempt_at = now + timedelta(seconds=self.retry_policy.next_delay(attempt))
+                failed = 1 if status in ('retry', 'dead') else 0
+                rows.append((status, posted_at, failed, next_attempt_at, error, uri, cid, post_id, worker_id))
+
+            cursor = conn.executemany('''
+                UPDATE posts
+                SET status = ?, posted_at = ?, attempts = attempts + ?, next_attempt_at = ?, last_error = ?,
+                    uri = COALESCE(?, uri), cid = COALESCE(?, cid),
+                    claimed_by = NULL, lease_expires_at = NULL
+                WHERE id = ?
+                AND status = 'in_progress'
+                AND claimed_by = COALESCE(?, claimed_by)
+            ''', rows)
+            updated = cursor.rowcount
+            # A pending part whose previous part is published (e.g. the part
+            # was claimed separately after a lease expired) becomes claimable
+            conn.execute('''
+                UPDATE posts
+                SET status = 'ready'
+                WHERE status = 'pending'
+                AND thread_root_id IN (
+                    SELECT COALESCE(thread_root_id, id) FROM posts WHERE id IN (SELECT value FROM json_each(?))
+                )
+                AND EXISTS (
+                    SELECT 1 FROM posts previous
+                    WHERE previous.status = 'posted'
+                    AND (
+                        (posts.thread_position = 1 AND previous.id = posts.thread_root_id)
+                        OR (previous.thread_root_id = posts.thread_root_id
+                            AND previous.thread_position = posts.thread_position - 1)
+                    )
+                )
+            ''', (json.dumps([result[0] for result in results]),))
+            return updated
+
     def update_post_status(self, post_id: int, status: str, posted_at: Optional[datetime] = None):
         """Update the status and posting time of a processed post"""
         with self._get_db_connection() as conn:
@@ -78,15 +910,32 @@ class PostManager:
             ''', (status, posted_at, post_id))
 
     def get_queue_status(self) -> List[tuple]:
-        """Get the current status counts of all posts"""
-        with self._get_db_connection() as conn:
-            cursor = conn.cursor()
-            cursor.execute('''
-                SELECT status, COUNT(*) as count
-                FROM posts
-                GROUP BY status
-            ''')
-        return cursor.fetchall()
+        """Get the current status counts of all posts
+
+        Reads the trigger-maintained queue_stats table, so the cost does not
+        grow with the posts history; queue_stats.py checks and rebuilds it.
+        """
+        return self._queue_status(self._get_db_connection())
+
+    def scrape_queue_status(self) -> List[tuple]:
+        """get_queue_status on a connection of its own, closed afterwards
+
+        For the metrics server, whose every request runs on a new thread: the
+        thread-local pool would keep one connection open per scrape.
+        """
+        conn = sqlite3.connect(self.db_path, timeout=SQLITE_BUSY_TIMEOUT)
+        try:
+            return self._queue_status(conn)
+        finally:
+            conn.close()
+
+    def _queue_status(self, conn) -> List[tuple]:
+        return conn.execute('''
+            SELECT status, count
+            FROM queue_stats
+            WHERE count > 0
+            ORDER BY status
+        ''').fetchall()
 
     def reset_test_mode(self, session_start_time):
         """Reset system state after test mode, only for posts marked during this session"""
@@ -95,10 +944,13 @@ class PostManager:
         with self._get_db_connection() as conn:
             cursor = conn.cursor()
             # Reset only posts that were marked as posted during this test session
+            # Later thread parts go back to waiting for their first part
             cursor.execute('''
                 UPDATE posts
-                SET status = 'ready',
-                    posted_at = NULL
+                SET status = CASE WHEN thread_position > 0 THEN 'pending' ELSE 'ready' END,
+                    posted_at = NULL,
+                    uri = NULL,
+                    cid = NULL
                 WHERE status = 'posted'
                 AND posted_at >= ?
         ''', (session_start_time,))
@@ -0,0 +1,110 @@
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import yaml
+
+from credentials import BlueskyCredentials
+
+def load_accounts(path: Path) -> List[BlueskyCredentials]:
+    """Credentials from an accounts file: a YAML list of username/password entries"""
+    with open(path, encoding='utf-8') as f:
+        entries = yaml.safe_load(f) or []
+    if not isinstance(entries, list):
+        raise ValueError(f"{path} must hold a list of accounts")
+    try:
+        return [BlueskyCredentials(str(entry["username"]), str(entry["password"])) for entry in entries]
+    except (KeyError, TypeError) as e:
+        raise ValueError(f"every account in {path} needs a username and password") from e
+
+class PosterPool:
+    """One poster per account, each with its own client and rate limiter.
+
+    Posters are built by factory on first use, so accounts with nothing to
+    post never log in. for_account(None) is the default account's poster.
+    Sync and async posters work the same way; with AsyncPostWorker, posts
+    for different accounts go out concurrently and each account is paced by
+    its own limiter.
+    """
+
+    def __init__(self, factory: Callable[[BlueskyCredentials], Any], accounts: Iterable[BlueskyCredentials],
+                 default_username: Optional[str] = None):
+        self._factory = factory
+        self._credentials: Dict[str, BlueskyCredentials] = {
+            credentials.username.lower(): credentials for credentials in accounts
+        }
+        self.default_username = default_username.lower() if default_username else None
+        self._posters: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._credentials)
+
+    def for_account(self, username: Optional[str]):
+        """The poster for an account, or None if it has no credentials"""
+        username = username or self.default_username
+        if username is None:
+            return None
+        poster = self._posters.get(username)
+        if poster is None:
+            with self._lock:
+                poster = self._posters.get(username)
+                if poster is None:
+                    credentials = self._credentials.get(username)
+                    if credentials is None:
+                        return None
+                    poster = self._posters[username] = self._factory(credentials)
+        return poster
+
+    def close(self):
+        """Close every poster built so far (sync posters)"""
+        with self._lock:
+            posters, self._posters = list(self._posters.values()), {}
+        for poster in posters:
+            poster.close()
+
+    async def aclose(self):
+        """Close every poster built so far (async posters)"""
+        with self._lock:
+            posters, self._posters = list(self._posters.values()), {}
+        for poster in posters:
+            await poster.close()
+
+def configured_pool(base_url: Optional[str] = None) -> PosterPool:
+    """The pool for the configured accounts: BLUESKY_USERNAME plus BLUESKY_ACCOUNTS_FILE
+
+    Posters talk to base_url (a started backend's url); None is bsky.social.
+    """
+    from blob_cache import BlobCache
+    from rate_limiter import TokenBucket
+    from session_cache import SessionCache
+    from config import (
+        BLUESKY_USERNAME, BLUESKY_PASSWORD, BLUESKY_ACCOUNTS_FILE, TEST_MODE, ASYNC_POSTING,
+        RATE_LIMIT_POSTS_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_MAX_RETRIES,
+        SESSION_CACHE_ENABLED, SESSION_CACHE_DIR, BLOB_CACHE_ENABLED, BLOB_CACHE_DIR, RESIZE_IMAGES
+    )
+
+    # Both caches key their entries by account
+    session_cache = SessionCache(SESSION_CACHE_DIR) if SESSION_CACHE_ENABLED else None
+    blob_cache = BlobCache(BLOB_CACHE_DIR) if BLOB_CACHE_ENABLED else None
+
+    def make_poster(credentials: BlueskyCredentials):
+        # Loading atproto is most of a cold start; only runs that post pay for it
+        from bluesky_poster import AsyncBlueskyPoster, BlueskyPoster
+
+        poster_cls = AsyncBlueskyPoster if ASYNC_POSTING else BlueskyPoster
+        return poster_cls(
+            credentials=credentials,
+            test_mode=TEST_MODE,
+            base_url=base_url,
+            rate_limiter=TokenBucket(RATE_LIMIT_POSTS_PER_SECOND, RATE_LIMIT_BURST),
+            max_rate_limit_retries=RATE_LIMIT_MAX_RETRIES,
+            session_cache=session_cache,
+            blob_cache=blob_cache,
+            resize_images=RESIZE_IMAGES
+        )
+
+    accounts = load_accounts(BLUESKY_ACCOUNTS_FILE) if BLUESKY_ACCOUNTS_FILE else []
+    if BLUESKY_USERNAME:
+        accounts.append(BlueskyCredentials(BLUESKY_USERNAME, BLUESKY_PASSWORD))
+    return PosterPool(make_poster, accounts, BLUESKY_USERNAME)
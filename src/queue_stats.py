@@ -0,0 +1,60 @@
+import argparse
+import sqlite3
+from typing import Dict, Tuple
+
+def check(conn) -> Dict[str, Tuple[int, int]]:
+    """Statuses whose queue_stats count is wrong, as {status: (stored, actual)}
+
+    One statement, so both sides are read from the same snapshot even while
+    workers are posting.
+    """
+    rows = conn.execute('''
+        SELECT status, SUM(stored), SUM(actual)
+        FROM (
+            SELECT status, count AS stored, 0 AS actual FROM queue_stats
+            UNION ALL
+            SELECT status, 0, COUNT(*) FROM posts GROUP BY status
+        )
+        GROUP BY status
+        HAVING SUM(stored) != SUM(actual)
+    ''')
+    return {status: (stored, actual) for status, stored, actual in rows}
+
+def rebuild(conn):
+    """Recount queue_stats from posts in one transaction
+
+    The triggers keep it right for every write that goes through SQLite, so
+    this is only needed after the table was edited by hand or restored
+    from a copy taken without it.
+    """
+    with conn:
+        conn.execute('DELETE FROM queue_stats')
+        conn.execute('INSERT INTO queue_stats (status, count) SELECT status, COUNT(*) FROM posts GROUP BY status')
+
+def main():
+    from config import DB_PATH
+    from db_setup import setup_database
+
+    parser = argparse.ArgumentParser(description="Check the queue_stats status counts against the posts table")
+    parser.add_argument('--rebuild', action='store_true', help="recount queue_stats if it is out of sync")
+    args = parser.parse_args()
+
+    setup_database()
+    conn = sqlite3.connect(DB_PATH, timeout=30)
+    try:
+        mismatches = check(conn)
+        for status, (stored, actual) in sorted(mismatches.items()):
+            print(f"{status}: queue_stats has {stored}, posts has {actual}")
+        if not mismatches:
+            print("queue_stats is consistent with posts")
+        elif args.rebuild:
+            rebuild(conn)
+            print("Rebuilt queue_stats")
+        else:
+            print("Run with --rebuild to recount it")
+            raise SystemExit(1)
+    finally:
+        conn.close()
+
+if __name__ == "__main__":
+    main()
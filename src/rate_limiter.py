@@ -0,0 +1,107 @@
+import asyncio
+import threading
+import time
+from typing import Mapping, Optional
+import metrics
+
+# Write points the PDS charges for creating one record
+CREATE_RECORD_POINTS = 3
+
+class TokenBucket:
+    """Client-side rate limiter for one Bluesky account.
+
+    A classic token bucket (``rate`` tokens per second, up to ``capacity``
+    banked) combined with the server's own view of the budget: every response
+    carrying ``ratelimit-remaining``/``ratelimit-reset`` headers updates how
+    many points are left in the current window, each request spends the
+    points the server charges for it, and once the budget cannot cover a
+    request callers wait for the reset instead of collecting a 429.
+
+    Callers reserve a token and then sleep for the returned delay, so
+    concurrent callers queue up fairly instead of all waking at once. A rate
+    of 0 disables the local bucket and relies on the headers alone.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(capacity, 1)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        # Server-reported budget for the current window
+        self._server_remaining: Optional[int] = None
+        self._server_reset = 0.0
+
+    def reserve(self, points: int = 1) -> float:
+        """Take one token and points of the server budget, returning how many seconds to wait before using them"""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.rate > 0:
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                self._tokens -= 1
+                if self._tokens < 0:
+                    wait = -self._tokens / self.rate
+
+            if self._server_remaining is not None:
+                if now >= self._server_reset:
+                    # Window is over; the next response tells us the new budget
+                    self._server_remaining = None
+                elif self._server_remaining >= points:
+                    self._server_remaining -= points
+                else:
+                    wait = max(wait, self._server_reset - now)
+            return wait
+
+    def delay(self, points: int = 1) -> float:
+        """Seconds until reserve(points) would not have to wait, without taking anything"""
+        with self._lock:
+            now = time.monotonic()
+            wait = 0.0
+            if self.rate > 0:
+                tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                if tokens < 1:
+                    wait = (1 - tokens) / self.rate
+            if self._server_remaining is not None and now < self._server_reset and self._server_remaining < points:
+                wait = max(wait, self._server_reset - now)
+            return wait
+
+    def acquire(self, points: int = 1) -> float:
+        """Block until a request costing points may be sent, returning the time spent waiting"""
+        wait = self.reserve(points)
+        metrics.RATE_LIMIT_WAIT.observe(wait)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, points: int = 1) -> float:
+        """Async variant of acquire"""
+        wait = self.reserve(points)
+        metrics.RATE_LIMIT_WAIT.observe(wait)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+    def update_from_headers(self, headers: Mapping[str, str]):
+        """Adopt the budget reported by ratelimit-remaining/ratelimit-reset"""
+        try:
+            remaining = int(headers['ratelimit-remaining'])
+            reset_at = float(headers['ratelimit-reset'])
+        except (KeyError, TypeError, ValueError):
+            return
+        # ratelimit-reset is a unix timestamp; convert to our monotonic clock
+        reset = time.monotonic() + max(0.0, reset_at - time.time())
+        with self._lock:
+            same_window = self._server_remaining is not None and abs(reset - self._server_reset) < 1
+            if same_window:
+                # Responses can arrive out of order; trust the lowest count
+                remaining = min(remaining, self._server_remaining)
+            self._server_remaining = remaining
+            self._server_reset = reset
+
+    def block_until(self, seconds: float):
+        """Hold back all callers for the given number of seconds (e.g. after a 429)"""
+        with self._lock:
+            self._server_remaining = 0
+            self._server_reset = max(self._server_reset, time.monotonic() + seconds)
@@ -0,0 +1,88 @@
+import json
+import re
+from typing import Dict, List, Optional, Set, Tuple
+
+# Facets index into the UTF-8 encoded text, so everything here matches on bytes.
+# Patterns follow the Bluesky app's own detection rules.
+_MENTION = re.compile(
+    rb"(?:^|\s|\()(@((?:[a-zA-Z0-9](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?\.)+"
+    rb"[a-zA-Z](?:[a-zA-Z0-9-]{0,61}[a-zA-Z0-9])?))(?=$|[\s),.;:!?'\"])"
+)
+_LINK = re.compile(rb"(?:^|\s|\()(https?://\S+)")
+_TAG = re.compile(rb"(?:^|\s)((?:#|\xef\xbc\x83)(\S+))")  # '#' or fullwidth '＃'
+_TRAILING_PUNCTUATION = b".,;:!?'\""
+MAX_TAG_LENGTH = 64
+
+# (byte_start, byte_end, kind, value) with kind 'mention' (value is the handle),
+# 'link' (the URI) or 'tag' (the tag without '#')
+Facet = Tuple[int, int, str, str]
+
+def _trim_link(url: bytes) -> bytes:
+    """Drop trailing punctuation, and a closing parenthesis with no opening one"""
+    while url:
+        if url.endswith(b")") and url.count(b"(") < url.count(b")"):
+            url = url[:-1]
+        elif url[-1] in _TRAILING_PUNCTUATION:
+            url = url[:-1]
+        else:
+            break
+    return url
+
+def detect_facets(text: str) -> List[Facet]:
+    """Find mentions, links and hashtags in a post, with UTF-8 byte offsets"""
+    data = text.encode("utf-8")
+    facets = []
+    for match in _MENTION.finditer(data):
+        facets.append((match.start(1), match.end(1), "mention", match.group(2).decode().lower()))
+    for match in _LINK.finditer(data):
+        url = _trim_link(match.group(1))
+        facets.append((match.start(1), match.start(1) + len(url), "link", url.decode("utf-8", "replace")))
+    for match in _TAG.finditer(data):
+        tag = match.group(2).rstrip(_TRAILING_PUNCTUATION)
+        value = tag.decode("utf-8", "replace")
+        # '#1st' is a tag, '#1' (an issue or list number) is not
+        if not tag or tag.isdigit() or len(value) > MAX_TAG_LENGTH:
+            continue
+        start = match.start(1)
+        facets.append((start, match.end(2) - (len(match.group(2)) - len(tag)), "tag", value))
+    facets.sort()
+    return facets
+
+def mentioned_handles(facets: List[Facet]) -> Set[str]:
+    return {value for _, _, kind, value in facets if kind == "mention"}
+
+def render_record(text: str, facets: List[Facet], dids: Dict[str, Optional[str]],
+                  langs: Optional[List[str]] = None) -> str:
+    """The app.bsky.feed.post record for a post, as compact JSON without createdAt
+
+    Mentions whose handle has no DID in dids are left as plain text.
+    """
+    rendered = []
+    for start, end, kind, value in facets:
+        if kind == "mention":
+            did = dids.get(value)
+            if not did:
+                continue
+            feature = {"$type": "app.bsky.richtext.facet#mention", "did": did}
+        elif kind == "link":
+            feature = {"$type": "app.bsky.richtext.facet#link", "uri": value}
+        else:
+            feature = {"$type": "app.bsky.richtext.facet#tag", "tag": value}
+        rendered.append({"index": {"byteStart": start, "byteEnd": end}, "features": [feature]})
+    record = {"$type": "app.bsky.feed.post", "text": text}
+    if rendered:
+        record["facets"] = rendered
+    if langs:
+        record["langs"] = langs
+    return json.dumps(record, ensure_ascii=False, separators=(",", ":"))
+
+_id_resolver = None
+
+def resolve_handle(handle: str) -> Optional[str]:
+    """Resolve a handle to its DID over DNS/HTTPS, or None if it does not exist"""
+    global _id_resolver
+    if _id_resolver is None:
+        # Only importers that see mentions pay for loading the resolver
+        from atproto import IdResolver
+        _id_resolver = IdResolver(timeout=5)
+    return _id_resolver.handle.resolve(handle)
@@ -0,0 +1,85 @@
+import asyncio
+import threading
+from datetime import datetime
+from typing import Optional
+
+from post_manager import PostManager
+
+class PostScheduler:
+    """Knows when the next post becomes due, so the run loop can sleep until then.
+
+    refresh() looks up the earliest due time among ready, retrying and
+    in-progress posts. It is only a wakeup hint; claim_batch still decides
+    what is actually due. Call refresh() after anything that changes the
+    queue (a claimed batch, an import) and notify() to wake a sleeping
+    wait() early.
+    """
+
+    def __init__(self, post_manager: PostManager):
+        self.post_manager = post_manager
+        self._next_due: Optional[datetime] = None
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        # Set up by the first wait_async() call, on the running event loop
+        self._loop = None
+        self._async_wakeup = None
+
+    def refresh(self):
+        """Look up the next due time in the database"""
+        next_due = self.post_manager.next_due_time()
+        with self._lock:
+            self._next_due = next_due
+
+    def notify(self):
+        """Refresh and interrupt wait(), e.g. after new posts were imported"""
+        self.refresh()
+        self.wake()
+
+    def wake(self):
+        """Interrupt wait() without touching the database; safe in signal handlers"""
+        self._wakeup.set()
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._async_wakeup.set)
+
+    def seconds_until_due(self, now: Optional[datetime] = None) -> Optional[float]:
+        """0 if a post is due now, seconds until the next one, or None if the queue is empty"""
+        with self._lock:
+            due_at = self._next_due
+        if due_at is None:
+            return None
+        return max(0.0, (due_at - (now or datetime.now())).total_seconds())
+
+    def wait(self, timeout: Optional[float]) -> bool:
+        """Sleep up to timeout seconds (forever if None); True if woken by notify()"""
+        woken = self._wakeup.wait(timeout)
+        self._wakeup.clear()
+        return woken
+
+    async def wait_async(self, timeout: Optional[float]) -> bool:
+        """wait() for the asyncio run loop"""
+        if self._async_wakeup is None:
+            self._async_wakeup = asyncio.Event()
+            self._loop = asyncio.get_running_loop()
+        try:
+            await asyncio.wait_for(self._async_wakeup.wait(), timeout)
+            woken = True
+        except asyncio.TimeoutError:
+            woken = False
+        self._async_wakeup.clear()
+        return woken
+
+    def next_sleep(self, posting_interval: float, watching: bool) -> Optional[float]:
+        """How long the run loop should sleep after a cycle (None: until notified)
+
+        Sleeps exactly until the next post is due. A backlog that is already
+        due is worked through at posting_interval, and without a ready
+        directory watcher the loop still wakes every posting_interval to look
+        for new files.
+        """
+        self.refresh()
+        due_in = self.seconds_until_due()
+        if due_in == 0:
+            return posting_interval
+        if not watching:
+            return posting_interval if due_in is None else min(due_in, posting_interval)
+        return due_in
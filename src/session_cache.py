@@ -0,0 +1,38 @@
+import os
+import re
+from pathlib import Path
+from typing import Optional
+
+class SessionCache:
+    """Persists exported atproto session strings, one file per account.
+
+    The session string holds the access and refresh JWTs, so files are written
+    atomically and readable by the owner only.
+    """
+
+    def __init__(self, directory: Path):
+        self.directory = directory
+
+    def _path(self, username: str) -> Path:
+        return self.directory / f"{re.sub(r'[^A-Za-z0-9._-]', '_', username)}.session"
+
+    def load(self, username: str) -> Optional[str]:
+        """Return the cached session string for username, if any"""
+        try:
+            return self._path(username).read_text(encoding='utf-8').strip() or None
+        except FileNotFoundError:
+            return None
+
+    def save(self, username: str, session_string: str):
+        """Atomically replace the cached session for username"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(username)
+        tmp_path = path.with_suffix(f".tmp{os.getpid()}")
+        fd = os.open(tmp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(session_string)
+        os.replace(tmp_path, path)
+
+    def clear(self, username: str):
+        """Forget the cached session for username"""
+        self._path(username).unlink(missing_ok=True)
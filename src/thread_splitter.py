@@ -0,0 +1,76 @@
+import re
+from typing import List
+
+import regex
+
+# Bluesky rejects post text over 300 graphemes or 3000 UTF-8 bytes
+MAX_GRAPHEMES = 300
+MAX_BYTES = 3000
+
+_GRAPHEME = regex.compile(r"\X")
+_PARAGRAPH_BREAK = re.compile(r"\n\s*\n")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+_WHITESPACE = re.compile(r"\s+")
+
+def grapheme_count(text: str) -> int:
+    """Number of user-perceived characters, as Bluesky counts them"""
+    if text.isascii():
+        # Every ASCII character is its own grapheme except CR LF
+        return len(text) - text.count("\r\n")
+    return len(_GRAPHEME.findall(text))
+
+def fits(text: str, limit: int = MAX_GRAPHEMES) -> bool:
+    """Whether text can be posted as a single post"""
+    # A string never has more graphemes than code points, so short text
+    # skips the grapheme scan entirely
+    if len(text) > limit and grapheme_count(text) > limit:
+        return False
+    return len(text) * 4 <= MAX_BYTES or len(text.encode("utf-8")) <= MAX_BYTES
+
+def _hard_split(word: str, limit: int) -> List[str]:
+    """Cut a single over-long word at grapheme boundaries"""
+    graphemes = _GRAPHEME.findall(word)
+    return ["".join(graphemes[i:i + limit]) for i in range(0, len(graphemes), limit)]
+
+def _pieces(paragraph: str, limit: int) -> List[str]:
+    """Sentences of a paragraph, with any sentence too long for a post cut into words"""
+    pieces = []
+    for sentence in _SENTENCE_END.split(paragraph):
+        if fits(sentence, limit):
+            pieces.append(sentence)
+            continue
+        for word in _WHITESPACE.split(sentence):
+            pieces.extend([word] if fits(word, limit) else _hard_split(word, limit))
+    return pieces
+
+def split_thread(text: str, limit: int = MAX_GRAPHEMES) -> List[str]:
+    """Split text into posts of at most limit graphemes, for publishing as a thread
+
+    Breaks at paragraph and sentence boundaries where possible, then between
+    words, and only cuts inside a word that is longer than a whole post.
+    Text that fits is returned as a single part.
+    """
+    if fits(text, limit):
+        return [text]
+    parts = []
+    current = ""
+    current_length = 0
+    for paragraph in _PARAGRAPH_BREAK.split(text.strip()):
+        separator = "\n\n"
+        for piece in _pieces(paragraph.strip(), limit):
+            if not piece:
+                continue
+            length = grapheme_count(piece)
+            if current and current_length + len(separator) + length <= limit \
+                    and fits(current + separator + piece, limit):
+                current += separator + piece
+                current_length += len(separator) + length
+            else:
+                if current:
+                    parts.append(current)
+                current, current_length = piece, length
+            # Within a paragraph, pieces are joined by a space
+            separator = " "
+    if current:
+        parts.append(current)
+    return parts
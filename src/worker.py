@@ -0,0 +1,321 @@
+import asyncio
+import os
+import signal
+import socket
+import sqlite3
+import threading
+import time
+from datetime import datetime
+from typing import Optional
+import metrics
+from post_manager import PostManager, RetryPolicy, DEFAULT_LEASE_SECONDS
+
+def default_worker_id() -> str:
+    """Identify this process across hosts sharing the database"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+def outcome(post, result) -> tuple:
+    """Turn a PostResult into a PostManager.complete_batch entry"""
+    if result.success:
+        return (post.id, "posted", datetime.now(), None, result.uri, result.cid)
+    return (post.id, "retry" if result.transient else "dead", None, result.message, None, None)
+
+def observe(entry: tuple, elapsed: float):
+    """Record how long a publish attempt took, under its outcome"""
+    metrics.POST_DURATION.observe(elapsed, outcome=entry[1])
+    metrics.log_event("post", post_id=entry[0], outcome=entry[1], seconds=round(elapsed, 6), error=entry[3])
+
+def unattempted(post) -> tuple:
+    """complete_batch entry handing a post we did not publish back to the queue
+
+    Later thread parts go back to 'pending' so they are claimed again with
+    (or after) the part before them.
+    """
+    return (post.id, "pending" if post.thread_position else "ready", None, None, None, None)
+
+def no_account(post) -> tuple:
+    """complete_batch entry for a post whose account has no credentials"""
+    return (post.id, "dead", None, f"No credentials for account {post.account or '(default)'}", None, None)
+
+def thread_reply(post, refs: dict):
+    """(root, parent) refs to reply to for a later thread part
+
+    None for the first part (or a post that is not a thread) and False when
+    the root or parent part has not been published yet.
+    """
+    if not post.thread_position:
+        return None
+    root = refs.get((post.thread_root, 0))
+    parent = refs.get((post.thread_root, post.thread_position - 1))
+    return (root, parent) if root and parent else False
+
+def chain_key(post) -> str:
+    """Posts that must go out one after another, in claim order: a sequence, or a thread"""
+    return post.sequence_key or f"thread:{post.thread_root}"
+
+def record_ref(post, result, refs: dict):
+    """Remember where a published post went, for the thread parts after it"""
+    if result.success and result.uri:
+        refs[(post.thread_root, post.thread_position)] = (result.uri, result.cid)
+
+class PostWorker:
+    """Claims leased batches of posts and publishes them until stopped.
+
+    Any number of workers can drain the same database: claims are atomic, a
+    heartbeat keeps the leases of the current batch alive while posting, and
+    every claim first returns expired leases (crashed workers) to 'ready'.
+    """
+
+    def __init__(self, post_manager: PostManager, poster, batch_size: int,
+                 worker_id: Optional[str] = None,
+                 lease_seconds: int = DEFAULT_LEASE_SECONDS,
+                 heartbeat_seconds: float = 30,
+                 idle_seconds: float = 5):
+        self.post_manager = post_manager
+        self.poster = poster
+        self.batch_size = batch_size
+        self.worker_id = worker_id or default_worker_id()
+        self.lease_seconds = lease_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        self.idle_seconds = idle_seconds
+        self._stop_event = threading.Event()
+
+    def stop(self):
+        """Ask the worker to finish its current post and exit"""
+        self._stop_event.set()
+
+    @property
+    def stopping(self) -> bool:
+        return self._stop_event.is_set()
+
+    def _heartbeat(self, batch_done: threading.Event):
+        """Extend our leases periodically until the batch is finished"""
+        try:
+            while not batch_done.wait(self.heartbeat_seconds):
+                try:
+                    self.post_manager.extend_leases(self.worker_id, self.lease_seconds)
+                except sqlite3.Error as e:
+                    print(f"Worker {self.worker_id}: lease heartbeat failed: {e}")
+        finally:
+            # A new heartbeat thread starts with every batch
+            self.post_manager.release_connection()
+
+    def run_once(self) -> int:
+        """Claim one batch, publish it and record the outcomes
+
+        Returns the number of posts claimed.
+        """
+        posts = self.post_manager.claim_batch(self.batch_size, self.worker_id, self.lease_seconds)
+        if not posts:
+            return 0
+
+        batch_done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(batch_done,), daemon=True)
+        heartbeat.start()
+        results = []
+        refs = self.post_manager.thread_refs(posts)
+        # Chains stop at their first post that is not published; the posts
+        # after it go back to the queue, behind it
+        broken = set()
+        try:
+            for post in posts:
+                if self._stop_event.is_set():
+                    break
+                chain = chain_key(post)
+                if chain in broken:
+                    continue
+                reply = thread_reply(post, refs)
+                if reply is False:
+                    broken.add(chain)
+                    continue
+                poster = self.poster.for_account(post.account)
+                if poster is None:
+                    results.append(no_account(post))
+                    broken.add(chain)
+                    continue
+                # Wait out the rate limiter here, where a stop can cut it short
+                rate_limit_delay = getattr(poster, 'rate_limit_delay', None)
+                if rate_limit_delay and self._stop_event.wait(rate_limit_delay()):
+                    break
+                start = time.perf_counter()
+                result = poster.post_content(post.content, record=post.record, reply=reply, images=post.images)
+                entry = outcome(post, result)
+                observe(entry, time.perf_counter() - start)
+                results.append(entry)
+                record_ref(post, result, refs)
+                if not result.success:
+                    broken.add(chain)
+                print(f"Post {post.id}: {result.message}")
+        finally:
+            batch_done.set()
+            heartbeat.join()
+            # Record whatever was published even if we are interrupted, and
+            # hand unattempted posts straight back to the queue
+            attempted = {result[0] for result in results}
+            results.extend(unattempted(post) for post in posts if post.id not in attempted)
+            self.post_manager.complete_batch(results, self.worker_id)
+        return len(posts)
+
+    def run(self, exit_when_idle: bool = False):
+        """Process batches until stopped (or, optionally, until the queue is empty)"""
+        while not self._stop_event.is_set():
+            if self.run_once():
+                continue
+            if exit_when_idle:
+                break
+            self._stop_event.wait(self.idle_seconds)
+
+class AsyncPostWorker(PostWorker):
+    """PostWorker for an async poster that keeps several posts in flight.
+
+    Up to max_concurrent posts per account are published at once, so an
+    account waiting on its rate limiter never holds up the others when the
+    poster is a PosterPool. Posts that share a sequence_key, and the
+    parts of a thread, are chained so each starts only after the previous one
+    (in claim order) has been published.
+    """
+
+    def __init__(self, post_manager: PostManager, poster, batch_size: int,
+                 max_concurrent: int = 8, **kwargs):
+        super().__init__(post_manager, poster, batch_size, **kwargs)
+        self.max_concurrent = max_concurrent
+
+    async def _wait_unless_stopped(self, seconds: float, poll: float = 0.25) -> bool:
+        """Sleep for seconds, returning False as soon as stop() is called"""
+        deadline = time.monotonic() + seconds
+        while not self._stop_event.is_set():
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return True
+            await asyncio.sleep(min(remaining, poll))
+        return False
+
+    async def _publish(self, post, previous, semaphore, results, refs) -> bool:
+        """Post one entry once its predecessor in the chain is done
+
+        Returns whether the post was published; when the predecessor was
+        not, the post is left unattempted.
+        """
+        if previous and not await previous:
+            return False
+        if self._stop_event.is_set():
+            return False
+        reply = thread_reply(post, refs)
+        if reply is False:
+            return False
+        poster = self.poster.for_account(post.account)
+        if poster is None:
+            results.append(no_account(post))
+            return False
+        async with semaphore:
+            # Posts queued on the semaphore when stop() came in are not
+            # attempted; they go back to the queue with the rest
+            if self._stop_event.is_set():
+                return False
+            # Wait out the rate limiter here, where a stop can cut it short,
+            # rather than inside post_content
+            rate_limit_delay = getattr(poster, 'rate_limit_delay', None)
+            if rate_limit_delay and not await self._wait_unless_stopped(rate_limit_delay()):
+                return False
+            start = time.perf_counter()
+            result = await poster.post_content(post.content, record=post.record, reply=reply, images=post.images)
+            elapsed = time.perf_counter() - start
+        entry = outcome(post, result)
+        observe(entry, elapsed)
+        results.append(entry)
+        record_ref(post, result, refs)
+        print(f"Post {post.id}: {result.message}")
+        return result.success
+
+    async def run_once(self) -> int:
+        """Claim one batch and publish it concurrently
+
+        Returns the number of posts claimed.
+        """
+        posts = self.post_manager.claim_batch(self.batch_size, self.worker_id, self.lease_seconds)
+        if not posts:
+            return 0
+
+        batch_done = threading.Event()
+        heartbeat = threading.Thread(target=self._heartbeat, args=(batch_done,), daemon=True)
+        heartbeat.start()
+        semaphores = {}
+        sequence_tails = {}
+        tasks = []
+        results = []
+        refs = self.post_manager.thread_refs(posts)
+        try:
+            for post in posts:
+                chain = chain_key(post)
+                semaphore = semaphores.setdefault(post.account, asyncio.Semaphore(self.max_concurrent))
+                task = asyncio.create_task(self._publish(post, sequence_tails.get(chain), semaphore, results, refs))
+                sequence_tails[chain] = task
+                tasks.append(task)
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            batch_done.set()
+            heartbeat.join()
+            attempted = {result[0] for result in results}
+            results.extend(unattempted(post) for post in posts if post.id not in attempted)
+            self.post_manager.complete_batch(results, self.worker_id)
+        return len(posts)
+
+    async def run(self, exit_when_idle: bool = False):
+        """Process batches until stopped (or, optionally, until the queue is empty)"""
+        while not self._stop_event.is_set():
+            if await self.run_once():
+                continue
+            if exit_when_idle:
+                break
+            await asyncio.sleep(self.idle_seconds)
+
+def main():
+    from db_setup import setup_database
+    from backends import configured_backend
+    from poster_pool import configured_pool
+    from config import (
+        DB_PATH, READY_DIR, PROCESSED_DIR, POSTS_PER_RUN,
+        CLAIM_LEASE_SECONDS, WORKER_HEARTBEAT_SECONDS, WORKER_IDLE_SECONDS,
+        SQLITE_JOURNAL_MODE, ASYNC_POSTING, MAX_CONCURRENT_POSTS,
+        RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY
+    )
+
+    setup_database()
+    backend = configured_backend().start()
+    bluesky = configured_pool(backend.url)
+    retry_policy = RetryPolicy(RETRY_MAX_ATTEMPTS, RETRY_BASE_DELAY, RETRY_MAX_DELAY)
+    with PostManager(DB_PATH, READY_DIR, PROCESSED_DIR, journal_mode=SQLITE_JOURNAL_MODE,
+                     retry_policy=retry_policy) as post_manager:
+        worker_options = dict(
+            batch_size=POSTS_PER_RUN,
+            lease_seconds=CLAIM_LEASE_SECONDS,
+            heartbeat_seconds=WORKER_HEARTBEAT_SECONDS,
+            idle_seconds=WORKER_IDLE_SECONDS
+        )
+        metrics_server = metrics.configured_metrics(post_manager.scrape_queue_status)
+        if ASYNC_POSTING:
+            worker = AsyncPostWorker(post_manager, bluesky, max_concurrent=MAX_CONCURRENT_POSTS, **worker_options)
+        else:
+            worker = PostWorker(post_manager, bluesky, **worker_options)
+
+        def signal_handler(signum, frame):
+            print(f"\nWorker {worker.worker_id} received shutdown signal. Finishing current post...")
+            worker.stop()
+
+        signal.signal(signal.SIGINT, signal_handler)
+        signal.signal(signal.SIGTERM, signal_handler)
+        print(f"Worker {worker.worker_id} starting (batch size {POSTS_PER_RUN}, lease {CLAIM_LEASE_SECONDS}s)")
+        if ASYNC_POSTING:
+            asyncio.run(worker.run())
+        else:
+            worker.run()
+        metrics.shutdown(metrics_server)
+        backend.stop()
+        print(f"Worker {worker.worker_id} stopped")
+        if backend.summary():
+            print(backend.summary())
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+"""Shared fixtures for the test suite.
+
+Tests run against a throwaway PROJECT_ROOT so they never touch a real
+content.db, and import the flat modules from src/ directly.
+"""
+import os
+import sqlite3
+import sys
+import tempfile
+from pathlib import Path
+
+import pytest
+
+SRC_DIR = Path(__file__).resolve().parent.parent / "src"
+if str(SRC_DIR) not in sys.path:
+    sys.path.insert(0, str(SRC_DIR))
+
+os.environ.setdefault('PROJECT_ROOT', tempfile.mkdtemp(prefix="bsky-test-"))
+os.environ.setdefault('TEST_INTERVAL', '0')
+os.environ.setdefault('PRODUCTION_INTERVAL', '0')
+os.environ.setdefault('POSTS_PER_RUN', '50')
+
+
+@pytest.fixture
+def post_manager(tmp_path):
+    """A PostManager on a freshly migrated database with empty ready/processed dirs"""
+    from db_setup import setup_database
+    from post_manager import PostManager
+
+    ready_dir = tmp_path / "ready"
+    processed_dir = tmp_path / "processed"
+    ready_dir.mkdir()
+    processed_dir.mkdir()
+    db_path = tmp_path / "content.db"
+    setup_database(db_path)
+    with PostManager(db_path, ready_dir, processed_dir) as manager:
+        yield manager
+
+
+def queue_posts(post_manager, count: int):
+    """Import count distinct single-post files and return their ids in import order"""
+    for i in range(count):
+        (post_manager.ready_dir / f"{i:04d}.md").write_text(f"Test post number {i}", encoding="utf-8")
+    assert post_manager.import_new_files() == count
+    conn = post_manager._get_db_connection()
+    return [row[0] for row in conn.execute("SELECT id FROM posts ORDER BY id")]
+
+
+# posts as the first release's setup_database created it, before migrations
+BASELINE_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    content TEXT NOT NULL,
+    created_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    posted_at TIMESTAMP,
+    status TEXT CHECK(status IN ('ready', 'posted', 'failed')) NOT NULL DEFAULT 'ready'
+)
+'''
+
+
+def baseline_database(tmp_path, rows):
+    """A database as the first release left it, holding rows of (content, created_at, posted_at, status)"""
+    conn = sqlite3.connect(tmp_path / "baseline.db")
+    conn.execute(BASELINE_SCHEMA)
+    conn.executemany(
+        "INSERT INTO posts (content, created_at, posted_at, status) VALUES (?, ?, ?, ?)", rows
+    )
+    conn.commit()
+    return conn
@@ -0,0 +1,118 @@
+import json
+from pathlib import Path
+
+import pytest
+
+import bundles
+from bundles import decode_record, is_bundle, iter_records
+from post_manager import PostManager
+
+
+def write_bundle(path, count):
+    """A JSONL bundle of count distinct posts; returns the offset after each line"""
+    offsets = []
+    with open(path, "w", encoding="utf-8") as f:
+        for i in range(count):
+            f.write(json.dumps({"content": f"Bundle post number {i}"}) + "\n")
+            offsets.append(f.tell())
+    return offsets
+
+
+def imported_contents(post_manager):
+    conn = post_manager._get_db_connection()
+    return [row[0] for row in conn.execute("SELECT content FROM posts ORDER BY id")]
+
+
+def test_interrupted_bundle_resumes_at_last_chunk(post_manager, monkeypatch):
+    post_manager.import_batch_size = 3
+    bundle = post_manager.ready_dir / "posts.jsonl"
+    offsets = write_bundle(bundle, 10)
+
+    import_chunk = PostManager._import_chunk
+    chunks = []
+
+    def crash_on_second_chunk(self, loaded, resume=None):
+        if len(chunks) == 1:
+            raise RuntimeError("simulated crash")
+        chunks.append(len(loaded))
+        return import_chunk(self, loaded, resume)
+
+    monkeypatch.setattr(PostManager, "_import_chunk", crash_on_second_chunk)
+    with pytest.raises(RuntimeError):
+        post_manager.import_bundle(bundle)
+
+    conn = post_manager._get_db_connection()
+    resume = [tuple(row) for row in conn.execute("SELECT name, resume_offset FROM import_bundles")]
+    assert resume == [("posts.jsonl", offsets[2])]
+    assert len(imported_contents(post_manager)) == 3
+    assert bundle.exists()
+
+    def count_chunks(self, loaded, resume=None):
+        chunks.append(len(loaded))
+        return import_chunk(self, loaded, resume)
+
+    chunks.clear()
+    monkeypatch.setattr(PostManager, "_import_chunk", count_chunks)
+    assert post_manager.import_bundle(bundle) == 7
+
+    # Only the records after the saved offset were read again
+    assert chunks == [3, 3, 1]
+    assert imported_contents(post_manager) == [f"Bundle post number {i}" for i in range(10)]
+    assert conn.execute("SELECT COUNT(*) FROM import_bundles").fetchone()[0] == 0
+    assert not bundle.exists()
+    assert (post_manager.processed_dir / "posts.jsonl").exists()
+
+
+def test_shrunk_bundle_imports_from_the_start(post_manager):
+    bundle = post_manager.ready_dir / "posts.jsonl"
+    write_bundle(bundle, 2)
+    with post_manager._get_db_connection() as conn:
+        conn.execute("INSERT INTO import_bundles (name, resume_offset) VALUES ('posts.jsonl', 1000000)")
+
+    assert post_manager.import_bundle(bundle) == 2
+
+
+def test_is_bundle():
+    assert is_bundle(Path("posts.jsonl"))
+    assert is_bundle(Path("week.bundle.md"))
+    assert not is_bundle(Path("post.md"))
+
+
+def test_jsonl_records_and_resume_offsets(tmp_path):
+    bundle = tmp_path / "posts.jsonl"
+    bundle.write_bytes(b'"first"\n\n{"content": "second"}\n"third"')
+    records = list(iter_records(bundle))
+    assert [raw for _, _, raw in records] == [b'"first"', b'{"content": "second"}', b'"third"']
+    assert [offset for offset, _, _ in records] == [0, 9, 31]
+    # Resuming after a record starts with the next one
+    assert [raw for _, _, raw in iter_records(bundle, records[0][1])] == [b'{"content": "second"}', b'"third"']
+    assert list(iter_records(bundle, bundle.stat().st_size)) == []
+
+
+def test_markdown_bundle_splits_on_separator_lines_only(tmp_path):
+    bundle = tmp_path / "week.bundle.md"
+    bundle.write_text("First post\n---\nSecond --- post\n---  \n\n---\nThird post\n", encoding="utf-8")
+    assert [raw for _, _, raw in iter_records(bundle)] == [b"First post\n", b"Second --- post\n", b"Third post\n"]
+
+
+def test_pages_are_released_while_reading(tmp_path, monkeypatch):
+    monkeypatch.setattr(bundles, "RELEASE_EVERY", 4096)
+    bundle = tmp_path / "posts.jsonl"
+    bundle.write_text("".join(json.dumps(f"Post {i}") + "\n" for i in range(5000)), encoding="utf-8")
+    assert sum(1 for _ in iter_records(bundle)) == 5000
+
+
+def test_decode_record():
+    assert decode_record(b'"Just text"', markdown=False) == ({}, "Just text")
+    assert decode_record(b'{"content": "Text", "Priority": 5}', markdown=False) == ({"priority": 5}, "Text")
+    assert decode_record("Caf\u00e9\n".encode(), markdown=True) == ({}, "Caf\u00e9\n")
+    for malformed in (b"{not json", b'{"text": "no content"}', b"[1, 2]"):
+        with pytest.raises(ValueError):
+            decode_record(malformed, markdown=False)
+
+
+def test_malformed_records_are_skipped(post_manager):
+    bundle = post_manager.ready_dir / "posts.jsonl"
+    bundle.write_text('"Good post"\n{broken\n{"content": "Another good post"}\n', encoding="utf-8")
+    assert post_manager.import_bundle(bundle) == 2
+    assert imported_contents(post_manager) == ["Good post", "Another good post"]
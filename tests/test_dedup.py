@@ -0,0 +1,65 @@
+from conftest import baseline_database
+from db_setup import migrate
+from dedup import (
+    band_keys, content_hash, minhash_signature, normalize, pack_signature, similarity, unpack_signature
+)
+
+ARTICLE = ("SQLite keeps every queued post in a single file, and a composite index turns finding the next "
+           "due post into one seek instead of a scan over the whole history of published posts.")
+
+
+def test_normalize_ignores_case_width_and_whitespace():
+    assert normalize("  Hello\n\tＷｏｒｌｄ  ") == "hello world"
+    assert content_hash("Hello World") == content_hash("hello   world\n")
+    assert content_hash("Hello World") != content_hash("Hello World!")
+
+
+def test_similar_posts_have_similar_signatures():
+    edited = ARTICLE.replace("one seek", "a single seek")
+    unrelated = "Lunch today was a sandwich with far too much mustard and a cold cup of coffee on the side."
+    original = minhash_signature(ARTICLE)
+    assert similarity(original, minhash_signature(ARTICLE)) == 1.0
+    assert similarity(original, minhash_signature(edited)) > 0.6
+    assert similarity(original, minhash_signature(unrelated)) < 0.2
+
+
+def test_signature_round_trips_and_shares_bands_with_itself():
+    signature = minhash_signature(ARTICLE)
+    assert unpack_signature(pack_signature(signature)) == signature
+    assert band_keys(signature) == band_keys(minhash_signature(ARTICLE.upper()))
+
+
+def test_import_skips_exact_duplicates(post_manager):
+    (post_manager.ready_dir / "a.md").write_text("Launch day!", encoding="utf-8")
+    (post_manager.ready_dir / "b.md").write_text("  launch DAY! \n", encoding="utf-8")
+    assert post_manager.import_new_files() == 1
+    (post_manager.ready_dir / "c.md").write_text("LAUNCH day!", encoding="utf-8")
+    assert post_manager.import_new_files() == 0
+    # Duplicates are moved out of the way, not left to be retried
+    assert sorted(path.name for path in post_manager.processed_dir.iterdir()) == ["a.md", "b.md", "c.md"]
+
+
+def test_import_skips_near_duplicates_when_enabled(post_manager):
+    post_manager.near_duplicate_threshold = 0.6
+    (post_manager.ready_dir / "a.md").write_text(ARTICLE, encoding="utf-8")
+    assert post_manager.import_new_files() == 1
+    (post_manager.ready_dir / "b.md").write_text(ARTICLE.replace("one seek", "a single seek"), encoding="utf-8")
+    assert post_manager.import_new_files() == 0
+
+
+def test_backfill_retires_queued_duplicates(tmp_path):
+    conn = baseline_database(tmp_path, [
+        ("Same text", "2024-01-01 09:00:00", "2024-01-01 09:05:00", "posted"),
+        ("same   TEXT", "2024-01-02 09:00:00", None, "ready"),
+        ("Other text", "2024-01-03 09:00:00", None, "ready"),
+        ("other text", "2024-01-04 09:00:00", None, "ready"),
+    ])
+    migrate(conn)
+
+    rows = conn.execute("SELECT id, status, last_error FROM posts ORDER BY id").fetchall()
+    assert rows == [
+        (1, "posted", None),
+        (2, "dead", "Duplicate of post 1"),
+        (3, "ready", None),
+        (4, "dead", "Duplicate of post 3"),
+    ]
@@ -0,0 +1,89 @@
+import time
+
+from file_watcher import ReadyDirWatcher
+
+
+class Importer:
+    """Callback that moves good files away and leaves bad ones, like import_files"""
+
+    def __init__(self, processed):
+        self.processed = processed
+        self.calls = []
+
+    def __call__(self, paths):
+        self.calls.append(sorted(path.name for path in paths))
+        for path in paths:
+            if "bad" not in path.read_text():
+                path.rename(self.processed / path.name)
+
+
+def scan_and_flush(watcher):
+    watcher._scan()
+    watcher._flush(time.monotonic() + watcher.debounce)
+
+
+def make_watcher(tmp_path, callback):
+    ready = tmp_path / "ready"
+    ready.mkdir()
+    return ReadyDirWatcher(ready, callback, suffix=(".md", ".jsonl"), debounce=0, use_inotify=False)
+
+
+def test_failed_files_are_skipped_until_they_change(tmp_path):
+    processed = tmp_path / "processed"
+    processed.mkdir()
+    importer = Importer(processed)
+    watcher = make_watcher(tmp_path, importer)
+    (watcher.directory / "good.md").write_text("fine")
+    (watcher.directory / "broken.md").write_text("bad front matter")
+    (watcher.directory / "notes.txt").write_text("not a post")
+
+    scan_and_flush(watcher)
+    assert importer.calls == [["broken.md", "good.md"]]
+
+    # Left behind unchanged: not handed over again
+    scan_and_flush(watcher)
+    assert importer.calls == [["broken.md", "good.md"]]
+
+    (watcher.directory / "broken.md").write_text("fixed now")
+    scan_and_flush(watcher)
+    assert importer.calls == [["broken.md", "good.md"], ["broken.md"]]
+    assert not watcher._failed
+
+
+def test_deleted_failures_are_forgotten(tmp_path):
+    importer = Importer(tmp_path)
+    watcher = make_watcher(tmp_path, importer)
+    (watcher.directory / "broken.md").write_text("bad")
+    scan_and_flush(watcher)
+    assert "broken.md" in watcher._failed
+
+    (watcher.directory / "broken.md").unlink()
+    watcher._scan()
+    assert not watcher._failed
+
+
+def test_files_are_retried_when_the_callback_raises(tmp_path):
+    calls = []
+
+    def failing_import(paths):
+        calls.append([path.name for path in paths])
+        raise RuntimeError("database is locked")
+
+    watcher = make_watcher(tmp_path, failing_import)
+    (watcher.directory / "post.md").write_text("fine")
+    scan_and_flush(watcher)
+    scan_and_flush(watcher)
+    assert calls == [["post.md"], ["post.md"]]
+    assert not watcher._failed
+
+
+def test_polling_watcher_hands_over_new_files(tmp_path):
+    received = []
+    watcher = make_watcher(tmp_path, received.extend)
+    watcher.poll_interval = 0.01
+    with watcher:
+        (watcher.directory / "post.md").write_text("fine")
+        deadline = time.monotonic() + 5
+        while not received and time.monotonic() < deadline:
+            time.sleep(0.01)
+    assert [path.name for path in received] == ["post.md"]
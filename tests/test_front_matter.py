@@ -0,0 +1,45 @@
+from datetime import datetime
+
+import pytest
+
+from front_matter import parse_timestamp, scheduling_fields, split_front_matter
+
+
+def test_front_matter_fields_and_body():
+    fields, body = split_front_matter("---\nPriority: 5\nsequence: launch\n---\nPost text\n")
+    assert fields == {"priority": 5, "sequence": "launch"}
+    assert body == "Post text\n"
+
+
+def test_empty_front_matter_block():
+    assert split_front_matter("---\n---\nPost text") == ({}, "Post text")
+
+
+@pytest.mark.parametrize("text", [
+    "Post text without front matter",
+    "---\nA post that opens with a horizontal rule",
+    "---\nintro\n---\nbody",
+    "---\n- a list\n---\nbody",
+    "---\nkey: [unclosed\n---\nbody",
+])
+def test_text_that_is_not_front_matter_is_left_alone(text):
+    assert split_front_matter(text) == ({}, text)
+
+
+def test_scheduling_fields():
+    scheduled_for, priority, sequence = scheduling_fields(
+        {"scheduled_for": "2026-11-02T09:30:00", "priority": "3", "sequence": 7}
+    )
+    assert (scheduled_for, priority, sequence) == (datetime(2026, 11, 2, 9, 30), 3, "7")
+    assert scheduling_fields({}) == (None, 0, None)
+
+
+def test_invalid_priority_is_an_error():
+    with pytest.raises(ValueError):
+        scheduling_fields({"priority": "high"})
+
+
+def test_utc_timestamp_becomes_naive_local_time():
+    timestamp = parse_timestamp("2026-11-02T09:30:00Z")
+    assert timestamp.tzinfo is None
+    assert timestamp == datetime.fromisoformat("2026-11-02T09:30:00+00:00").astimezone().replace(tzinfo=None)
@@ -0,0 +1,77 @@
+from datetime import datetime, timedelta
+
+from conftest import queue_posts
+
+
+def expire_leases(post_manager, worker_id):
+    """Backdate a worker's leases as if it had stopped heartbeating"""
+    with post_manager._get_db_connection() as conn:
+        conn.execute(
+            "UPDATE posts SET lease_expires_at = ? WHERE claimed_by = ?",
+            (datetime.now() - timedelta(seconds=1), worker_id)
+        )
+
+
+def statuses(post_manager):
+    conn = post_manager._get_db_connection()
+    return {row[0]: (row[1], row[2]) for row in conn.execute("SELECT id, status, claimed_by FROM posts")}
+
+
+def test_claims_do_not_overlap(post_manager):
+    ids = queue_posts(post_manager, 4)
+
+    first = post_manager.claim_batch(2, "worker-a", lease_seconds=60)
+    second = post_manager.claim_batch(10, "worker-b", lease_seconds=60)
+
+    assert [post.id for post in first] == ids[:2]
+    assert [post.id for post in second] == ids[2:]
+    assert post_manager.claim_batch(10, "worker-c", lease_seconds=60) == []
+
+
+def test_expired_lease_is_reclaimed(post_manager):
+    ids = queue_posts(post_manager, 3)
+    claimed = post_manager.claim_batch(2, "worker-a", lease_seconds=60)
+    expire_leases(post_manager, "worker-a")
+
+    reclaimed = post_manager.claim_batch(10, "worker-b", lease_seconds=60)
+
+    assert sorted(post.id for post in reclaimed) == ids
+    assert {post.id for post in claimed} <= {post.id for post in reclaimed}
+    assert all(claimed_by == "worker-b" for _, claimed_by in statuses(post_manager).values())
+
+
+def test_complete_batch_ignores_a_lost_lease(post_manager):
+    ids = queue_posts(post_manager, 1)
+    post_manager.claim_batch(1, "worker-a", lease_seconds=60)
+    expire_leases(post_manager, "worker-a")
+    post_manager.claim_batch(1, "worker-b", lease_seconds=60)
+
+    # The crashed worker comes back and reports a result it no longer owns
+    late = [(ids[0], "posted", datetime.now(), None, "at://late", "cid-late")]
+    assert post_manager.complete_batch(late, "worker-a") == 0
+    assert statuses(post_manager)[ids[0]] == ("in_progress", "worker-b")
+
+    done = [(ids[0], "posted", datetime.now(), None, "at://post", "cid")]
+    assert post_manager.complete_batch(done, "worker-b") == 1
+    assert statuses(post_manager)[ids[0]] == ("posted", None)
+
+
+def test_heartbeat_keeps_the_lease(post_manager):
+    queue_posts(post_manager, 2)
+    post_manager.claim_batch(2, "worker-a", lease_seconds=60)
+    expire_leases(post_manager, "worker-a")
+
+    assert post_manager.extend_leases("worker-a", lease_seconds=60) == 2
+    assert post_manager.claim_batch(10, "worker-b", lease_seconds=60) == []
+
+
+def test_unattempted_posts_go_back_to_ready(post_manager):
+    ids = queue_posts(post_manager, 2)
+    post_manager.claim_batch(2, "worker-a", lease_seconds=60)
+
+    results = [
+        (ids[0], "posted", datetime.now(), None, "at://post", "cid"),
+        (ids[1], "ready", None, None, None, None),
+    ]
+    assert post_manager.complete_batch(results, "worker-a") == 2
+    assert [post.id for post in post_manager.claim_batch(10, "worker-b", lease_seconds=60)] == [ids[1]]
@@ -0,0 +1,35 @@
+import urllib.request
+
+import metrics
+from conftest import queue_posts
+
+
+def test_scrapes_do_not_leave_connections_open(post_manager):
+    queue_posts(post_manager, 2)
+    open_before = len(post_manager._connections)
+    gauge = metrics.Gauge("test_queue_depth", "Posts in the queue, by status", labels=("status",))
+    gauge.set_function(post_manager.scrape_queue_status)
+    registry = metrics.Registry()
+    registry.register(gauge)
+    server = metrics.MetricsServer(port=0, registry=registry).start()
+    try:
+        for _ in range(20):
+            with urllib.request.urlopen(server.url) as response:
+                body = response.read().decode()
+    finally:
+        server.stop()
+
+    assert 'test_queue_depth{status="ready"} 2' in body
+    assert len(post_manager._connections) == open_before
+
+
+def test_histogram_buckets_are_cumulative():
+    histogram = metrics.Histogram("test_seconds", "Test durations", buckets=(0.1, 1))
+    for value in (0.05, 0.5, 5):
+        histogram.observe(value)
+
+    lines = histogram.expose()
+    assert 'test_seconds_bucket{le="0.1"} 1' in lines
+    assert 'test_seconds_bucket{le="1.0"} 2' in lines
+    assert 'test_seconds_bucket{le="+Inf"} 3' in lines
+    assert "test_seconds_count 3" in lines
@@ -0,0 +1,27 @@
+from conftest import baseline_database
+from db_setup import SCHEMA_VERSION, migrate
+
+
+def test_baseline_migrates_to_current_schema(tmp_path):
+    conn = baseline_database(tmp_path, [
+        ("First post", "2024-01-01 09:00:00", "2024-01-01 09:05:00", "posted"),
+        ("Second post", "2024-01-02 09:00:00", None, "failed"),
+        ("Third post", "2024-01-03 09:00:00", None, "ready"),
+    ])
+
+    assert migrate(conn) == SCHEMA_VERSION
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == SCHEMA_VERSION
+    rows = conn.execute(
+        "SELECT content, status, scheduled_for, priority, content_hash IS NOT NULL FROM posts ORDER BY id"
+    ).fetchall()
+    assert rows == [
+        ("First post", "posted", "2024-01-01 09:00:00", 0, 1),
+        ("Second post", "failed", "2024-01-02 09:00:00", 0, 1),
+        ("Third post", "ready", "2024-01-03 09:00:00", 0, 1),
+    ]
+    assert dict(conn.execute("SELECT status, count FROM queue_stats WHERE count > 0")) == {
+        "posted": 1, "failed": 1, "ready": 1
+    }
+    # Already current: nothing left to apply
+    assert migrate(conn) == 0
+
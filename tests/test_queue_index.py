@@ -0,0 +1,27 @@
+from datetime import datetime
+
+from conftest import baseline_database
+from db_setup import migrate
+from post_manager import SEQUENCE_HEAD
+
+
+def test_only_the_claim_order_indexes_remain(tmp_path):
+    conn = baseline_database(tmp_path, [])
+    migrate(conn)
+    indexes = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+    assert "idx_posts_status_created_at" not in indexes
+    assert "idx_posts_status_priority_scheduled_for" in indexes
+
+
+def test_next_ready_post_is_an_index_seek(post_manager):
+    conn = post_manager._get_db_connection()
+    plan = [row[3] for row in conn.execute(f'''
+        EXPLAIN QUERY PLAN
+        SELECT id FROM posts AS p
+        WHERE status = 'ready' AND +scheduled_for <= ? AND {SEQUENCE_HEAD}
+        ORDER BY priority DESC, scheduled_for, id
+        LIMIT 1
+    ''', (datetime.now(),))]
+    assert any("USING INDEX idx_posts_status_priority_scheduled_for (status=?)" in step for step in plan)
+    # Ordered by the index itself, with no sort step
+    assert not any("TEMP B-TREE" in step for step in plan)
@@ -0,0 +1,97 @@
+import pytest
+
+import rate_limiter
+from rate_limiter import CREATE_RECORD_POINTS, TokenBucket
+
+
+class FakeClock:
+    """Stands in for the time module so the tests control the clock"""
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def time(self):
+        # Wall clock 1000 s ahead of the monotonic one
+        return self.now + 1000
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeClock()
+    monkeypatch.setattr(rate_limiter, "time", clock)
+    return clock
+
+
+def test_burst_then_paced(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    assert [bucket.reserve() for _ in range(3)] == [0, 0, 0]
+    # Each further token is half a second after the one before
+    assert bucket.reserve() == pytest.approx(0.5)
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_tokens_refill_up_to_capacity(clock):
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.reserve()
+    bucket.reserve()
+    clock.now += 60
+    assert [bucket.reserve() for _ in range(2)] == [0, 0]
+    assert bucket.reserve() == pytest.approx(1.0)
+
+
+def test_delay_does_not_take_a_token(clock):
+    bucket = TokenBucket(rate=1, capacity=1)
+    assert bucket.delay() == 0
+    assert bucket.delay() == 0
+    bucket.reserve()
+    assert bucket.delay() == pytest.approx(1.0)
+
+
+def test_server_budget_is_spent_in_points(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    # Window ends 30 s from now
+    bucket.update_from_headers({"ratelimit-remaining": "7", "ratelimit-reset": str(clock.time() + 30)})
+    assert bucket.reserve(CREATE_RECORD_POINTS) == 0
+    assert bucket.reserve(CREATE_RECORD_POINTS) == 0
+    # One point left cannot cover a create: wait for the reset
+    assert bucket.delay(CREATE_RECORD_POINTS) == pytest.approx(30)
+    assert bucket.reserve(CREATE_RECORD_POINTS) == pytest.approx(30)
+    assert bucket.reserve(1) == 0
+
+
+def test_budget_is_forgotten_once_the_window_resets(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    bucket.update_from_headers({"ratelimit-remaining": "0", "ratelimit-reset": str(clock.time() + 10)})
+    assert bucket.reserve() == pytest.approx(10)
+    clock.now += 10
+    assert bucket.reserve() == 0
+
+
+def test_out_of_order_headers_keep_the_lowest_count(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    reset = str(clock.time() + 30)
+    bucket.update_from_headers({"ratelimit-remaining": "3", "ratelimit-reset": reset})
+    bucket.update_from_headers({"ratelimit-remaining": "9", "ratelimit-reset": reset})
+    assert bucket.reserve(3) == 0
+    assert bucket.reserve(1) == pytest.approx(30)
+
+
+def test_malformed_headers_are_ignored(clock):
+    bucket = TokenBucket(rate=0, capacity=1)
+    bucket.update_from_headers({"ratelimit-remaining": "many"})
+    bucket.update_from_headers({})
+    assert bucket.reserve(100) == 0
+
+
+def test_block_until_holds_everyone_back(clock):
+    bucket = TokenBucket(rate=10, capacity=10)
+    bucket.block_until(5)
+    assert bucket.delay() == pytest.approx(5)
+    assert bucket.acquire() == pytest.approx(5)
+    assert clock.now == pytest.approx(1005)
@@ -0,0 +1,67 @@
+from datetime import datetime
+
+import pytest
+from atproto.exceptions import (
+    BadRequestError, NetworkError, RateLimitExceededError, RequestException, UnauthorizedError
+)
+from atproto_client.request import Response
+
+from bluesky_poster import is_transient_error
+from conftest import queue_posts
+from post_manager import RetryPolicy
+
+
+def response(status_code):
+    return Response(success=False, status_code=status_code, content=None, headers={})
+
+
+@pytest.mark.parametrize("error, transient", [
+    (RateLimitExceededError(response(429)), True),
+    (RequestException(response(502)), True),
+    (RequestException(response(503)), True),
+    (NetworkError(), True),
+    (NetworkError(response(413)), False),
+    (BadRequestError(response(400)), False),
+    (UnauthorizedError(response(401)), False),
+    (TimeoutError(), True),
+    (ConnectionResetError(), True),
+    (ValueError("bad record"), False),
+])
+def test_is_transient_error(error, transient):
+    assert is_transient_error(error) is transient
+
+
+def test_backoff_doubles_with_jitter_up_to_the_cap():
+    policy = RetryPolicy(max_attempts=10, base_delay=60, max_delay=300)
+    for attempts, ceiling in [(1, 60), (2, 120), (3, 240), (4, 300), (9, 300)]:
+        delays = [policy.next_delay(attempts) for _ in range(200)]
+        assert all(ceiling / 2 <= delay <= ceiling for delay in delays)
+        assert max(delays) - min(delays) > 0
+
+
+def test_retries_end_dead_after_max_attempts(post_manager):
+    post_manager.retry_policy = RetryPolicy(max_attempts=3, base_delay=0, max_delay=0)
+    [post_id] = queue_posts(post_manager, 1)
+    conn = post_manager._get_db_connection()
+
+    for attempt in range(1, 4):
+        assert [post.id for post in post_manager.claim_batch(1, "worker")] == [post_id]
+        post_manager.complete_batch([(post_id, "retry", None, "HTTP 502", None, None)], "worker")
+        status, attempts, last_error = conn.execute(
+            "SELECT status, attempts, last_error FROM posts WHERE id = ?", (post_id,)
+        ).fetchone()
+        assert attempts == attempt
+        assert last_error == "HTTP 502"
+        assert status == ("dead" if attempt == 3 else "retry")
+
+
+def test_retry_is_not_claimed_before_its_backoff(post_manager):
+    post_manager.retry_policy = RetryPolicy(max_attempts=5, base_delay=3600, max_delay=3600)
+    [post_id] = queue_posts(post_manager, 1)
+    post_manager.claim_batch(1, "worker")
+    post_manager.complete_batch([(post_id, "retry", None, "timeout", None, None)], "worker")
+
+    assert post_manager.claim_batch(1, "worker") == []
+    with post_manager._get_db_connection() as conn:
+        conn.execute("UPDATE posts SET next_attempt_at = ? WHERE id = ?", (datetime.now(), post_id))
+    assert [post.id for post in post_manager.claim_batch(1, "worker")] == [post_id]
@@ -0,0 +1,50 @@
+import json
+
+from rich_text import detect_facets, mentioned_handles, render_record
+
+
+def test_links_mentions_and_tags_with_byte_offsets():
+    text = "Café news from @Alice.bsky.social: https://example.com/a. #launch"
+    facets = detect_facets(text)
+    data = text.encode()
+    assert [(kind, value) for _, _, kind, value in facets] == [
+        ("mention", "alice.bsky.social"), ("link", "https://example.com/a"), ("tag", "launch")
+    ]
+    # Offsets index the UTF-8 bytes ('é' is two of them)
+    assert [data[start:end].decode() for start, end, _, _ in facets] == [
+        "@Alice.bsky.social", "https://example.com/a", "#launch"
+    ]
+
+
+def test_link_keeps_balanced_parentheses():
+    facets = detect_facets("(see https://en.wikipedia.org/wiki/Python_(language))")
+    assert facets[0][3] == "https://en.wikipedia.org/wiki/Python_(language)"
+
+
+def test_tags_may_start_with_a_digit_but_not_be_all_digits():
+    tags = [value for _, _, kind, value in detect_facets("#1st #2024 #3dprinting ＃タグ #") if kind == "tag"]
+    assert tags == ["1st", "3dprinting", "タグ"]
+
+
+def test_tag_inside_a_word_is_not_a_tag():
+    assert detect_facets("issue#12 and a#b") == []
+
+
+def test_render_record():
+    text = "Hi @bob.test and @nobody.test #tag"
+    facets = detect_facets(text)
+    assert mentioned_handles(facets) == {"bob.test", "nobody.test"}
+
+    record = json.loads(render_record(text, facets, {"bob.test": "did:plc:bob", "nobody.test": None}, ["en"]))
+    assert record["$type"] == "app.bsky.feed.post"
+    assert record["text"] == text
+    assert record["langs"] == ["en"]
+    # The unresolved mention stays plain text
+    assert [facet["features"][0] for facet in record["facets"]] == [
+        {"$type": "app.bsky.richtext.facet#mention", "did": "did:plc:bob"},
+        {"$type": "app.bsky.richtext.facet#tag", "tag": "tag"},
+    ]
+
+
+def test_plain_text_record_has_no_facets():
+    assert render_record("Plain", [], {}) == '{"$type":"app.bsky.feed.post","text":"Plain"}'
@@ -0,0 +1,47 @@
+from thread_splitter import MAX_BYTES, fits, grapheme_count, split_thread
+
+
+def test_grapheme_count():
+    assert grapheme_count("hello") == 5
+    assert grapheme_count("line\r\nbreak") == 10
+    # An accented letter written as two code points, and a family emoji of five
+    assert grapheme_count("e\u0301") == 1
+    assert grapheme_count("\U0001F468\u200d\U0001F469\u200d\U0001F467") == 1
+
+
+def test_short_text_is_one_part():
+    assert split_thread("A short post.") == ["A short post."]
+
+
+def test_every_part_fits():
+    text = "\n\n".join(" ".join(f"Sentence {p}.{s} has a few words in it." for s in range(12)) for p in range(4))
+    parts = split_thread(text)
+    assert len(parts) > 1
+    assert all(grapheme_count(part) <= 300 and fits(part) for part in parts)
+    # Nothing is lost or reordered, only whitespace between parts changes
+    assert " ".join(" ".join(parts).split()) == " ".join(text.split())
+
+
+def test_prefers_sentence_boundaries():
+    first = "a" * 30 + " " + "b " * 80 + "end one."
+    second = "Second sentence starts here and " + "c " * 60 + "ends."
+    parts = split_thread(f"{first} {second}", limit=200)
+    assert parts == [first, second]
+
+
+def test_long_word_is_cut_at_grapheme_boundaries():
+    word = "é" * 450
+    parts = split_thread(word)
+    assert [grapheme_count(part) for part in parts] == [300, 150]
+    assert "".join(parts) == word
+
+
+def test_byte_limit_applies_to_wide_characters():
+    # Family emoji are one grapheme but 18 bytes: 200 of them fit the
+    # grapheme limit but not 3000 bytes
+    family = "\U0001F468\u200d\U0001F469\u200d\U0001F467"
+    text = " ".join([family * 5] * 40)
+    assert grapheme_count(text) <= 300 and len(text.encode()) > MAX_BYTES
+    parts = split_thread(text)
+    assert len(parts) == 2
+    assert all(len(part.encode()) <= MAX_BYTES for part in parts)
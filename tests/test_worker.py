@@ -0,0 +1,110 @@
+import asyncio
+import time
+from datetime import datetime
+
+from bluesky_poster import PostResult
+from conftest import queue_posts
+from worker import AsyncPostWorker, PostWorker
+
+
+class FakePoster:
+    """Publishes everything but the contents in fail, slowly enough for a heartbeat to fire"""
+
+    def __init__(self, seconds: float = 0.02, fail=()):
+        self.seconds = seconds
+        self.fail = set(fail)
+        self.published = []
+
+    def for_account(self, username):
+        return self
+
+    def post_content(self, content, record=None, reply=None, images=None):
+        time.sleep(self.seconds)
+        if content in self.fail:
+            return PostResult(False, "try again later", transient=True)
+        self.published.append(content)
+        return PostResult(True, "posted", uri=f"at://fake/{len(self.published)}", cid="cid")
+
+
+def test_heartbeats_do_not_leak_connections(post_manager):
+    queue_posts(post_manager, 10)
+    poster = FakePoster()
+    worker = PostWorker(post_manager, poster, batch_size=1, heartbeat_seconds=0.001)
+    extend_leases = post_manager.extend_leases
+    heartbeats = []
+
+    def counting_extend_leases(*args, **kwargs):
+        heartbeats.append(1)
+        return extend_leases(*args, **kwargs)
+
+    post_manager.extend_leases = counting_extend_leases
+    for _ in range(10):
+        assert worker.run_once() == 1
+
+    assert len(poster.published) == 10
+    assert heartbeats
+    # Only the calling thread's own connection is left
+    assert len(post_manager._connections) == 1
+
+
+def queue_sequence(post_manager, *contents, sequence="launch"):
+    for i, content in enumerate(contents):
+        (post_manager.ready_dir / f"seq-{i:04d}.md").write_text(
+            f"---\nsequence: {sequence}\n---\n{content}", encoding="utf-8"
+        )
+    post_manager.import_new_files()
+
+
+def post_statuses(post_manager):
+    conn = post_manager._get_db_connection()
+    return {row[0]: row[1] for row in conn.execute("SELECT content, status FROM posts")}
+
+
+def test_only_the_head_of_a_sequence_is_claimed(post_manager):
+    queue_sequence(post_manager, "First in sequence", "Second in sequence")
+    (post_manager.ready_dir / "other.md").write_text("Not in a sequence", encoding="utf-8")
+    post_manager.import_new_files()
+
+    claimed = post_manager.claim_batch(10, "worker-a", lease_seconds=60)
+    assert [post.content for post in claimed] == ["First in sequence", "Not in a sequence"]
+    # The second post waits while the first is in progress on another worker
+    assert post_manager.claim_batch(10, "worker-b", lease_seconds=60) == []
+
+
+def test_failed_post_holds_back_the_rest_of_its_sequence(post_manager):
+    queue_sequence(post_manager, "First in sequence", "Second in sequence")
+    worker = PostWorker(post_manager, FakePoster(seconds=0, fail={"First in sequence"}), batch_size=10)
+
+    assert worker.run_once() == 1
+    assert post_statuses(post_manager) == {"First in sequence": "retry", "Second in sequence": "ready"}
+    assert worker.run_once() == 0
+
+    worker.poster.fail.clear()
+    with post_manager._get_db_connection() as conn:
+        conn.execute("UPDATE posts SET next_attempt_at = ? WHERE status = 'retry'", (datetime.now(),))
+    assert worker.run_once() == 1
+    assert worker.run_once() == 1
+    assert worker.poster.published == ["First in sequence", "Second in sequence"]
+
+
+class AsyncFakePoster(FakePoster):
+    async def post_content(self, content, record=None, reply=None, images=None):
+        return FakePoster.post_content(self, content, record, reply, images)
+
+
+def test_async_worker_stops_a_chain_at_its_first_failure(post_manager):
+    long_post = " ".join(f"Sentence number {i} of a post long enough to become a thread." for i in range(12))
+    (post_manager.ready_dir / "thread.md").write_text(f"---\nsequence: launch\n---\n{long_post}", encoding="utf-8")
+    post_manager.import_new_files()
+    conn = post_manager._get_db_connection()
+    parts = [row[0] for row in conn.execute("SELECT content FROM posts ORDER BY thread_position, id")]
+    assert len(parts) > 2
+
+    poster = AsyncFakePoster(seconds=0, fail={parts[1]})
+    worker = AsyncPostWorker(post_manager, poster, batch_size=10)
+    assert asyncio.run(worker.run_once()) == len(parts)
+
+    assert poster.published == parts[:1]
+    statuses = post_statuses(post_manager)
+    assert statuses[parts[1]] == "retry"
+    assert all(statuses[part] == "pending" for part in parts[2:])